@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Achievement engine for Debattle.
+Compiles the conditions in the achievements collection into vectorized predicates and bulk-awards newly earned achievements and their XP.
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from columnar import StringPool
+from firestore_io import (ArrayUnion, BatchWriter, DEFAULT_PAGE_SIZE, Increment, Throughput, Through, advance_through,
+                          get_documents, is_new, iter_pages)
+from ratings import debate_winner
+
+STATE_COLLECTION = "system"
+STATE_DOC = "achievementEngine"
+
+USER_FIELDS = ["wins", "gamesPlayed", "bestWinStreak", "achievements",
+               "stats.categoryWins", "stats.achievementsThrough"]
+DEBATE_FIELDS = ["status", "winner", "judgment.winner", "participants", "topicId", "ended_at"]
+
+Predicate = Callable[["UserFeatures"], np.ndarray]
+
+_COMPILERS: Dict[str, Callable[[Dict[str, Any]], Predicate]] = {}
+
+
+def _condition(kind: str):
+    def register(compiler):
+        _COMPILERS[kind] = compiler
+        return compiler
+    return register
+
+
+@_condition("wins")
+def _wins(condition: Dict[str, Any]) -> Predicate:
+    value = condition["value"]
+    return lambda f: f.wins >= value
+
+
+@_condition("debates")
+def _debates(condition: Dict[str, Any]) -> Predicate:
+    value = condition["value"]
+    return lambda f: f.games >= value
+
+
+@_condition("win_rate")
+def _win_rate(condition: Dict[str, Any]) -> Predicate:
+    value, min_debates = condition["value"], condition.get("min_debates", 1)
+    return lambda f: (f.games >= max(1, min_debates)) & (100 * f.wins >= value * np.maximum(f.games, 1))
+
+
+@_condition("streak")
+def _streak(condition: Dict[str, Any]) -> Predicate:
+    value = condition["value"]
+    return lambda f: f.best_streak >= value
+
+
+@_condition("category_wins")
+def _category_wins(condition: Dict[str, Any]) -> Predicate:
+    value = condition["value"]
+    return lambda f: f.category_wins.max(axis=1, initial=0) >= value
+
+
+def compile_condition(condition: Dict[str, Any]) -> Predicate:
+    """Vectorized predicate for one achievement condition"""
+    kind = condition.get("type")
+    if kind not in _COMPILERS:
+        raise ValueError(f"unknown condition type {kind!r}")
+    if "value" not in condition:
+        raise ValueError(f"condition {kind!r} has no value")
+    return _COMPILERS[kind](condition)
+
+
+class UserFeatures:
+    """The per-user counters achievement conditions read, one array entry per user"""
+
+    def __init__(self, uids: List[str], wins: np.ndarray, games: np.ndarray, best_streak: np.ndarray,
+                 category_wins: np.ndarray, held: List[List[str]]):
+        self.uids = uids
+        self.wins = wins
+        self.games = games
+        self.best_streak = best_streak
+        self.category_wins = category_wins  # (users, categories)
+        self.held = held
+
+    def __len__(self) -> int:
+        return len(self.uids)
+
+
+class AchievementEngine:
+    """Active achievements compiled once, evaluated against any number of users at a time"""
+
+    def __init__(self, achievements: Iterable[Dict[str, Any]]):
+        self.ids: List[str] = []
+        self.predicates: List[Predicate] = []
+        rewards = []
+        self.needs_category_wins = False
+        for achievement in achievements:
+            if not achievement.get("isActive", True):
+                continue
+            condition = achievement.get("condition") or {}
+            try:
+                predicate = compile_condition(condition)
+            except ValueError as e:
+                print(f"    ℹ️  Skipping achievement {achievement.get('id')}: {e}")
+                continue
+            self.ids.append(achievement["id"])
+            self.predicates.append(predicate)
+            rewards.append(int(achievement.get("xpReward", 0)))
+            self.needs_category_wins |= condition.get("type") == "category_wins"
+        self.rewards = np.array(rewards, dtype=np.int64)
+        self._column = {achievement_id: i for i, achievement_id in enumerate(self.ids)}
+
+    def earned(self, features: UserFeatures) -> np.ndarray:
+        """(users, achievements) matrix of conditions currently met"""
+        earned = np.zeros((len(features), len(self.ids)), dtype=bool)
+        for column, predicate in enumerate(self.predicates):
+            earned[:, column] = predicate(features)
+        return earned
+
+    def held(self, features: UserFeatures) -> np.ndarray:
+        held = np.zeros((len(features), len(self.ids)), dtype=bool)
+        for row, achievement_ids in enumerate(features.held):
+            for achievement_id in achievement_ids:
+                column = self._column.get(achievement_id)
+                if column is not None:
+                    held[row, column] = True
+        return held
+
+    def awards(self, features: UserFeatures) -> List[Tuple[int, List[str], int]]:
+        """(user row, newly earned achievement ids, XP reward) for every user with something new"""
+        new = self.earned(features) & ~self.held(features)
+        xp = new.astype(np.int64) @ self.rewards
+        return [(row, [self.ids[c] for c in np.flatnonzero(new[row])], int(xp[row]))
+                for row in np.flatnonzero(new.any(axis=1))]
+
+
+def load_achievements(db) -> List[Dict[str, Any]]:
+    return [dict(snap.to_dict(), id=snap.id) for snap in db.collection("achievements").stream()]
+
+
+def load_topic_categories(db, page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, str]:
+    query = db.collection("topics").select(["category"]).order_by("__name__")
+    return {snap.id: (snap.to_dict() or {}).get("category")
+            for page in iter_pages(query, page_size) for snap in page}
+
+
+def _debate_wins(debate: Dict[str, Any], categories: Dict[str, str]) -> Tuple[Optional[str], Optional[str], List[str]]:
+    """(winner uid, category, participant uids) of a completed debate"""
+    participants = [p.get("userId") for p in debate.get("participants") or []]
+    if debate.get("status") != "completed":
+        return None, None, []
+    return debate_winner(debate), categories.get(debate.get("topicId")), participants
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _stored_stats(user: Dict[str, Any]) -> Tuple[Dict[str, int], Optional[Through]]:
+    stats = user.get("stats") or {}
+    return dict(stats.get("categoryWins") or {}), Through.from_stored(stats.get("achievementsThrough"))
+
+
+def _features(uids: List[str], users: List[Dict[str, Any]], category_rows: List[Dict[str, int]],
+              pool: StringPool) -> UserFeatures:
+    for counts in category_rows:
+        for category in counts:
+            pool.code(category)
+    category_wins = np.zeros((len(uids), len(pool)), dtype=np.int32)
+    for row, counts in enumerate(category_rows):
+        for category, count in counts.items():
+            category_wins[row, pool.find(category)] = count
+    return UserFeatures(
+        uids,
+        np.array([u.get("wins", 0) for u in users], dtype=np.int64),
+        np.array([u.get("gamesPlayed", 0) for u in users], dtype=np.int64),
+        np.array([u.get("bestWinStreak", 0) for u in users], dtype=np.int64),
+        category_wins,
+        [u.get("achievements") or [] for u in users])
+
+
+def _write_awards(writer: Optional[BatchWriter], engine: AchievementEngine, features: UserFeatures,
+                  stats_updates: Dict[int, Dict[str, Any]]) -> Tuple[int, int]:
+    """One update per changed user: ArrayUnion keeps awarding idempotent across re-runs"""
+    awarded = xp_total = 0
+    updates = {row: dict(fields) for row, fields in stats_updates.items()}
+    for row, achievement_ids, xp in engine.awards(features):
+        awarded += len(achievement_ids)
+        xp_total += xp
+        update = updates.setdefault(row, {})
+        update["achievements"] = ArrayUnion(achievement_ids)
+        if xp:
+            update["xp"] = Increment(xp)
+    if writer:
+        for row, update in updates.items():
+            writer.update("users", features.uids[row], update)
+    return awarded, xp_total
+
+
+def load_state(db) -> Dict[str, Any]:
+    snap = db.collection(STATE_COLLECTION).document(STATE_DOC).get()
+    return (snap.to_dict() or {}) if snap.exists else {}
+
+
+def save_watermark(db, watermark: Optional[datetime], ids: List[str], **fields):
+    """Newest ended_at folded, the ids of the debates folded at exactly that time, and any extra state"""
+    if watermark is not None:
+        db.collection(STATE_COLLECTION).document(STATE_DOC).set({
+            "watermark": watermark,
+            "watermarkIds": sorted(ids),
+            **fields
+        }, merge=True)
+
+
+def evaluate_all(db, engine: AchievementEngine, page_size: int = DEFAULT_PAGE_SIZE, dry_run: bool = False,
+                 max_in_flight: int = 8) -> Dict[str, Any]:
+    """
+    Evaluate every user; category wins are recounted from the whole debates history.
+
+    Only users whose counts changed are written, each with a marker of the newest
+    ended_at counted and every debate at that time. The same marker is saved in
+    system/achievementEngine as recountedThrough and covers every other user.
+    """
+    print("🏅 Evaluating achievements for all users...")
+    progress = Throughput("users", report_every=5.0)
+    uids: List[str] = []
+    users: List[Dict[str, Any]] = []
+    stored: List[Dict[str, int]] = []
+    query = db.collection("users").select(USER_FIELDS).order_by("__name__")
+    for page in iter_pages(query, page_size):
+        for snap in page:
+            user = snap.to_dict() or {}
+            uids.append(snap.id)
+            users.append(user)
+            stored.append(_stored_stats(user)[0])
+        progress.add(len(page))
+    print(f"    ✓ Loaded {len(uids):,} users")
+
+    pool = StringPool()
+    counts = stored
+    watermark, at_watermark, newest = None, [], None
+    stats_updates: Dict[int, Dict[str, Any]] = {}
+    if engine.needs_category_wins:
+        categories = load_topic_categories(db, page_size)
+        row_of = {uid: row for row, uid in enumerate(uids)}
+        counts = [{} for _ in uids]
+        query = db.collection("debates").select(DEBATE_FIELDS).order_by("__name__")
+        for page in iter_pages(query, page_size):
+            for snap in page:
+                debate = snap.to_dict() or {}
+                winner, category, _ = _debate_wins(debate, categories)
+                row = row_of.get(winner)
+                if row is not None and category:
+                    counts[row][category] = counts[row].get(category, 0) + 1
+                ended = debate.get("ended_at")
+                if not isinstance(ended, datetime):
+                    continue
+                ended = _utc(ended)
+                if watermark is None or ended > watermark:
+                    watermark, at_watermark = ended, []
+                if ended == watermark:
+                    at_watermark.append(snap.id)
+        newest = {"endedAt": watermark, "debateIds": sorted(at_watermark)} if watermark else None
+        for row, (old, new) in enumerate(zip(stored, counts)):
+            if old != new:
+                stats_updates[row] = {"stats.categoryWins": new, "stats.achievementsThrough": newest}
+
+    features = _features(uids, users, counts, pool)
+    writer = None if dry_run else BatchWriter(db, max_in_flight=max_in_flight, label="achievements")
+    awarded, xp = _write_awards(writer, engine, features, stats_updates)
+    if writer:
+        writer.close()
+        save_watermark(db, watermark, at_watermark, recountedThrough=newest)
+    summary = {"users": len(uids), "awarded": awarded, "xp": xp, "stats_updated": len(stats_updates),
+               "seconds": round(progress.elapsed, 3)}
+    print(f"    ✓ Awarded {awarded:,} achievements worth {xp:,} XP; "
+          f"refreshed category wins for {len(stats_updates):,} users")
+    return summary
+
+
+def evaluate_incremental(db, engine: AchievementEngine, since: Optional[datetime] = None,
+                         page_size: int = DEFAULT_PAGE_SIZE, dry_run: bool = False,
+                         max_in_flight: int = 8) -> Dict[str, Any]:
+    """
+    Evaluate only the users who played debates that ended since the watermark.
+
+    Debates ending exactly at the watermark are re-read and skipped by id. Each
+    user keeps the newest ended_at folded into its stats.categoryWins with the ids
+    of the wins at that time, and the last full recount's marker covers the rest,
+    so re-running over the same debates never double counts and a win written
+    late at a marker's time is still counted.
+    """
+    state = load_state(db)
+    recounted = Through.from_stored(state.get("recountedThrough"))
+    if since is None:
+        since, seen = state.get("watermark"), state.get("watermarkIds", [])
+    else:
+        seen = []
+    if since is None:
+        print("    ℹ️  No watermark yet; running a full evaluation")
+        return evaluate_all(db, engine, page_size, dry_run, max_in_flight)
+    since = _utc(since)
+
+    print(f"🏅 Evaluating achievements for debates ended since {since.isoformat()}...")
+    categories = load_topic_categories(db, page_size) if engine.needs_category_wins else {}
+    query = (db.collection("debates").select(DEBATE_FIELDS).where("ended_at", ">=", since)
+             .order_by("ended_at").order_by("__name__"))
+    new_wins: Dict[str, List[Tuple[Tuple[datetime, str], str]]] = {}
+    touched = set()
+    skip = set(seen)
+    watermark, at_watermark = since, list(seen)
+    debates = 0
+    for page in iter_pages(query, page_size):
+        for snap in page:
+            if snap.id in skip:
+                continue
+            debate = snap.to_dict() or {}
+            winner, category, participants = _debate_wins(debate, categories)
+            touched.update(uid for uid in participants if uid)
+            ended = _utc(debate["ended_at"])
+            if winner and category:
+                new_wins.setdefault(winner, []).append(((ended, snap.id), category))
+            if ended > watermark:
+                watermark, at_watermark = ended, []
+            at_watermark.append(snap.id)
+            debates += 1
+    print(f"    ✓ {debates:,} new debates touch {len(touched):,} users")
+
+    uids: List[str] = []
+    users: List[Dict[str, Any]] = []
+    counts: List[Dict[str, int]] = []
+    stats_updates: Dict[int, Dict[str, Any]] = {}
+    for snap in get_documents(db, "users", sorted(touched), USER_FIELDS):
+        if not snap.exists:
+            continue
+        user = snap.to_dict() or {}
+        stored, through = _stored_stats(user)
+        row = len(uids)
+        uids.append(snap.id)
+        users.append(user)
+        fresh = [(key, category) for key, category in new_wins.get(snap.id, [])
+                 if is_new(key, through, recounted)]
+        for _, category in fresh:
+            stored[category] = stored.get(category, 0) + 1
+        counts.append(stored)
+        if fresh:
+            stats_updates[row] = {"stats.categoryWins": stored,
+                                  "stats.achievementsThrough": advance_through(through, (key for key, _ in fresh))}
+
+    features = _features(uids, users, counts, StringPool())
+    writer = None if dry_run else BatchWriter(db, max_in_flight=max_in_flight, label="achievements")
+    awarded, xp = _write_awards(writer, engine, features, stats_updates)
+    if writer:
+        writer.close()
+        save_watermark(db, watermark, at_watermark)
+    print(f"    ✓ Awarded {awarded:,} achievements worth {xp:,} XP to touched users")
+    return {"debates": debates, "users": len(uids), "awarded": awarded, "xp": xp,
+            "stats_updated": len(stats_updates), "watermark": watermark}
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Award Debattle achievements from their conditions")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only evaluate users in debates that ended after the stored watermark")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="override the watermark (ISO timestamp)")
+    parser.add_argument("--dry-run", action="store_true", help="report awards without writing them")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    args = parser.parse_args(argv)
+
+    from initialize_firestore import connect
+    db = connect(args.emulator)
+    engine = AchievementEngine(load_achievements(db))
+    print(f"    ✓ Compiled {len(engine.ids)} achievement conditions")
+    if args.incremental or args.since:
+        evaluate_incremental(db, engine, args.since, args.page_size, args.dry_run, args.max_in_flight)
+    else:
+        evaluate_all(db, engine, args.page_size, args.dry_run, args.max_in_flight)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Achievement evaluation failed: {e}")
+        sys.exit(1)
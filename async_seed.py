@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Asyncio seeding mode for Debattle.
+Seeds every collection concurrently through one async Firestore client with a bounded number of batches in flight.
+"""
+
+import asyncio
+import os
+import random
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from firestore_io import BatchWriteError, MAX_BATCH_OPS, Throughput, keyed_records
+
+
+def connect_async(emulator: Optional[str] = None, project_id: Optional[str] = None):
+    """Async Firestore client; one client shares a single gRPC channel pool across all tasks"""
+    if emulator:
+        from google.cloud import firestore
+        os.environ["FIRESTORE_EMULATOR_HOST"] = emulator
+        print(f"✓ Connected to Firestore emulator at {emulator} (async)")
+        return firestore.AsyncClient(project=project_id)
+    from firebase_admin import firestore_async
+    from initialize_firestore import initialize_firebase
+    initialize_firebase()
+    print("✓ Connected to Firestore (async)")
+    return firestore_async.client()
+
+
+class AsyncSeeder:
+    """Commits write batches from many producers with at most `concurrency` commits in flight"""
+
+    def __init__(self, client, concurrency: int = 16, batch_size: int = MAX_BATCH_OPS,
+                 max_retries: int = 5, base_delay: float = 0.5):
+        self.client = client
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.progress = Throughput("seed", report_every=5.0)
+        self.batches = 0
+        self.retries = 0
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: List[asyncio.Task] = []
+
+    async def _commit(self, ops: List[Tuple[str, str, Dict[str, Any]]]):
+        attempt = 0
+        try:
+            while True:
+                batch = self.client.batch()
+                for collection, doc_id, data in ops:
+                    batch.set(self.client.collection(collection).document(doc_id), data)
+                try:
+                    await batch.commit()
+                    break
+                except Exception as e:
+                    attempt += 1
+                    if attempt > self.max_retries:
+                        raise BatchWriteError(f"batch of {len(ops)} ops failed after {self.max_retries} retries: {e}") from e
+                    self.retries += 1
+                    delay = self.base_delay * (2 ** (attempt - 1))
+                    await asyncio.sleep(delay + random.uniform(0, delay))
+        finally:
+            self._slots.release()
+        self.batches += 1
+        self.progress.add(len(ops))
+
+    async def _submit(self, ops: List[Tuple[str, str, Dict[str, Any]]]):
+        # Waiting for a slot here is what keeps producers, and memory, bounded
+        await self._slots.acquire()
+        done = [task for task in self._tasks if task.done()]
+        self._tasks = [task for task in self._tasks if not task.done()]
+        for task in done:
+            task.result()
+        self._tasks.append(asyncio.create_task(self._commit(ops)))
+
+    async def seed(self, collection: str, records: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """Produce batches of (id, data) records for one collection; runs concurrently with the others"""
+        ops: List[Tuple[str, str, Dict[str, Any]]] = []
+        count = 0
+        for doc_id, doc in records:
+            ops.append((collection, doc_id, doc))
+            count += 1
+            if len(ops) >= self.batch_size:
+                await self._submit(ops)
+                ops = []
+        if ops:
+            await self._submit(ops)
+        return count
+
+    async def drain(self):
+        tasks, self._tasks = self._tasks, []
+        await asyncio.gather(*tasks)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "docs": self.progress.count,
+            "batches": self.batches,
+            "retries": self.retries,
+            "seconds": round(self.progress.elapsed, 3),
+            "docs_per_sec": round(self.progress.rate, 1),
+        }
+
+
+async def async_setup_collections(client, dataset: Dict[str, Iterable[Dict[str, Any]]],
+                                  collections: List[Tuple[str, str]], settings_factory,
+                                  concurrency: int = 16, batch_size: int = MAX_BATCH_OPS) -> Dict[str, Any]:
+    """Seed every collection at once, then the system settings that depend on their counts"""
+    print(f"🔧 Setting up collections concurrently ({concurrency} batches in flight)...")
+    seeder = AsyncSeeder(client, concurrency, batch_size)
+    counts = await asyncio.gather(*(seeder.seed(name, keyed_records(dataset[name], id_field))
+                                    for name, id_field in collections))
+    counts = dict(zip((name for name, _ in collections), counts))
+    for name, count in counts.items():
+        print(f"  📝 {name}: queued {count:,} documents")
+    await seeder.seed("system", [("settings", settings_factory(counts))])
+    await seeder.drain()
+    stats = seeder.summary()
+    print(f"    ✓ Wrote {stats['docs']} documents in {stats['batches']} batches "
+          f"({stats['docs_per_sec']:,.0f} docs/sec, {stats['retries']} retries)")
+    return stats
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Sharded backfills for Debattle.
+Splits a collection into key ranges and runs a per-document transform over them in a process pool, one client per process.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from firestore_io import (BatchWriter, DEFAULT_PAGE_SIZE, RateLimiter, count_documents, format_eta, iter_pages,
+                          shard_bounds, shard_query)
+from memory_firestore import MemoryFirestore
+from migrations import DELETE, Migration, Transform
+from ratings import tier_for_rating
+
+STATE_COLLECTION = "system"
+STATE_DOC = "backfills"
+
+# Several shards per worker so a process that finishes early picks up more work
+SHARDS_PER_WORKER = 4
+
+BACKFILLS: Dict[str, Migration] = {}
+
+
+def backfill(name: str, collection: str, description: str = "", field_paths: Optional[List[str]] = None,
+             where: Optional[Callable[[Any], Any]] = None):
+    """
+    Register a transform as a named backfill.
+
+    Worker processes look transforms up by name, so they must be registered at
+    import time of a module the workers also import.
+    """
+    def register(transform: Transform) -> Transform:
+        BACKFILLS[name] = Migration(name, collection, transform, description, field_paths, where)
+        return transform
+    return register
+
+
+@backfill("win_rate", "users", "recompute win_rate from wins and gamesPlayed",
+          field_paths=["wins", "gamesPlayed", "win_rate"])
+def win_rate(doc_id: str, user: Dict[str, Any]):
+    games = user.get("gamesPlayed", 0)
+    rate = round(user.get("wins", 0) / games * 100, 1) if games else 0.0
+    return {"win_rate": rate} if user.get("win_rate") != rate else None
+
+
+@backfill("tier", "users", "recompute the leaderboard tier from rating", field_paths=["rating", "tier"])
+def tier(doc_id: str, user: Dict[str, Any]):
+    wanted = tier_for_rating(user.get("rating", 0))
+    return {"tier": wanted} if user.get("tier") != wanted else None
+
+
+@backfill("word_count", "debates", "recompute each argument's wordCount from its content", field_paths=["arguments"])
+def word_count(doc_id: str, debate: Dict[str, Any]):
+    arguments = debate.get("arguments") or []
+    # Same rule as the debate room: content.trim().split(' ').length
+    fixed = [{**arg, "wordCount": len((arg.get("content") or "").strip().split(" "))} for arg in arguments]
+    return {"arguments": fixed} if fixed != arguments else None
+
+
+def load_states(db) -> Dict[str, Dict[str, Any]]:
+    snap = db.collection(STATE_COLLECTION).document(STATE_DOC).get()
+    return (snap.to_dict() or {}) if snap.exists else {}
+
+
+def save_state(db, name: str, state: Dict[str, Any]):
+    db.collection(STATE_COLLECTION).document(STATE_DOC).set({name: state}, merge=True)
+
+
+# Set in each worker process by _init_worker: shared (processed, changed) counters
+_COUNTERS = None
+
+
+def _init_worker(counters):
+    global _COUNTERS
+    _COUNTERS = counters
+
+
+def run_shard(db, b: Migration, low: Optional[str], high: Optional[str], page_size: int = DEFAULT_PAGE_SIZE,
+              batch_size: int = 250, max_in_flight: int = 4, writes_per_sec: float = 0.0,
+              dry_run: bool = False, counters=None) -> Tuple[int, int]:
+    """Apply a backfill to the documents with low <= id < high; returns (processed, changed)"""
+    processed = changed = 0
+    limiter = RateLimiter(writes_per_sec)
+    writer = None if dry_run else BatchWriter(db, batch_size=batch_size, max_in_flight=max_in_flight,
+                                              label=b.name, report_every=0.0)
+    try:
+        for page in iter_pages(shard_query(db, b.collection, low, high, b.scan(db)), page_size):
+            page_changed = 0
+            for snap in page:
+                result = b.transform(snap.id, snap.to_dict() or {})
+                if result is None:
+                    continue
+                page_changed += 1
+                if writer:
+                    limiter.acquire()
+                    if result is DELETE:
+                        writer.delete(b.collection, snap.id)
+                    else:
+                        writer.update(b.collection, snap.id, result)
+            if writer:
+                writer.flush()
+            processed += len(page)
+            changed += page_changed
+            if counters:
+                for counter, n in zip(counters, (len(page), page_changed)):
+                    with counter.get_lock():
+                        counter.value += n
+    finally:
+        if writer:
+            writer.close()
+    return processed, changed
+
+
+def _run_shard_job(job: Tuple[str, Optional[str], int, Optional[str], Optional[str], Dict[str, Any]]):
+    """Process pool entry point: each worker opens its own client"""
+    name, emulator, index, low, high, options = job
+    from initialize_firestore import connect
+    return index, run_shard(connect(emulator), BACKFILLS[name], low, high, counters=_COUNTERS, **options)
+
+
+def run_backfill(db, b: Migration, workers: int = 1, shards: Optional[int] = None, emulator: Optional[str] = None,
+                 page_size: int = DEFAULT_PAGE_SIZE, batch_size: int = 250, max_in_flight: int = 4,
+                 writes_per_sec: float = 0.0, dry_run: bool = False, restart: bool = False) -> Dict[str, Any]:
+    """
+    Run a backfill over key-range shards, `workers` processes at a time.
+
+    Shard bounds and finished shards are saved in system/backfills, so a rerun
+    resumes with the unfinished shards; an interrupted shard is redone, which is
+    safe because transforms return the same updates for already-fixed documents.
+    writes_per_sec is the total across workers. The in-memory backend runs the
+    shards in turn in this process.
+    """
+    state = {} if restart else load_states(db).get(b.name, {})
+    if state.get("status") != "running":
+        shards = shards or max(1, workers) * SHARDS_PER_WORKER
+        state = {"status": "running", "bounds": shard_bounds(db, b.collection, shards), "done": [],
+                 "processed": 0, "changed": 0, "startedAt": datetime.now(timezone.utc)}
+        if not dry_run:
+            save_state(db, b.name, state)
+    bounds, done = state["bounds"], set(state["done"])
+    pending = [(i, bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1) if i not in done]
+    total = count_documents(b.query(db))
+    remaining = total - state["processed"]
+    print(f"🔧 Backfilling {b.collection}: {b.name} ({len(pending)} of {len(bounds) - 1} shards, "
+          f"~{max(remaining, 0):,} documents, {workers} worker(s))")
+
+    options = {"page_size": page_size, "batch_size": batch_size, "max_in_flight": max_in_flight,
+               "writes_per_sec": writes_per_sec / max(1, workers), "dry_run": dry_run}
+    counters = (multiprocessing.Value("q", 0), multiprocessing.Value("q", 0))
+    started = time.perf_counter()
+
+    def finish(index: int, processed: int, changed: int):
+        done.add(index)
+        state["done"] = sorted(done)
+        state["processed"] += processed
+        state["changed"] += changed
+        if not dry_run:
+            save_state(db, b.name, state)
+
+    if workers > 1 and not isinstance(db, MemoryFirestore):
+        jobs = [(b.name, emulator, i, low, high, options) for i, low, high in pending]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(counters,)) as pool:
+            futures = {pool.submit(_run_shard_job, job) for job in jobs}
+            last_report = started
+            while futures:
+                finished, futures = wait(futures, timeout=5.0, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index, (processed, changed) = future.result()
+                    finish(index, processed, changed)
+                if time.perf_counter() - last_report < 5.0:
+                    continue
+                last_report = time.perf_counter()
+                seen = counters[0].value
+                rate = seen / (time.perf_counter() - started)
+                print(f"    … {seen:,}/{remaining:,} docs, {counters[1].value:,} changed, "
+                      f"{len(done)}/{len(bounds) - 1} shards ({rate:,.0f} docs/sec, ETA {format_eta(remaining - seen, rate)})")
+    else:
+        for i, low, high in pending:
+            finish(i, *run_shard(db, b, low, high, counters=counters, **options))
+
+    state.update({"status": "done", "finishedAt": datetime.now(timezone.utc)})
+    if not dry_run:
+        save_state(db, b.name, state)
+    elapsed = time.perf_counter() - started
+    action = "Would change" if dry_run else "Changed"
+    print(f"    ✓ {action} {state['changed']:,} of {state['processed']:,} documents "
+          f"({counters[0].value / elapsed if elapsed > 0 else 0:,.0f} docs/sec)")
+    return state
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Run a sharded Debattle backfill in a process pool")
+    parser.add_argument("name", nargs="?", help=f"backfill to run ({', '.join(sorted(BACKFILLS))})")
+    parser.add_argument("--list", action="store_true", help="show registered backfills and their status")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shards", type=int, help=f"key ranges (default {SHARDS_PER_WORKER} per worker)")
+    parser.add_argument("--restart", action="store_true", help="ignore saved progress and start over")
+    parser.add_argument("--dry-run", action="store_true", help="count changes without writing")
+    parser.add_argument("--writes-per-sec", type=float, default=0.0, help="total write rate limit (0 for none)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--batch-size", type=int, default=250)
+    parser.add_argument("--max-in-flight", type=int, default=4, help="concurrent batch commits per worker")
+    parser.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    args = parser.parse_args(argv)
+
+    from initialize_firestore import connect
+    db = connect(args.emulator)
+    if args.list or not args.name:
+        states = load_states(db)
+        for name, b in sorted(BACKFILLS.items()):
+            state = states.get(name, {})
+            print(f"    • {name} [{state.get('status', 'never run')}] {b.collection}: {b.description}")
+        return
+    if args.name not in BACKFILLS:
+        raise ValueError(f"Unknown backfill {args.name!r}; expected one of {', '.join(sorted(BACKFILLS))}")
+    run_backfill(db, BACKFILLS[args.name], args.workers, args.shards, args.emulator, args.page_size,
+                 args.batch_size, args.max_in_flight, args.writes_per_sec, args.dry_run, args.restart)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Backfill failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Debattle seeding and verification pipeline.
+Runs the initializer stages at several dataset scales and records wall time, docs/sec, peak RSS and RPC counts.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from instrumentation import InstrumentedClient
+from synthetic_data import SCALES
+
+RESULTS_DIR = "bench_results"
+DEFAULT_SCALES = ["tiny", "small"]
+
+
+class RssSampler:
+    """Samples resident set size on a background thread to find a stage's peak"""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def current() -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            # ru_maxrss is the process-wide peak (KiB on Linux, bytes on macOS)
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == "darwin" else peak * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def clear_emulator(host: str, project_id: str):
+    """Delete every document in the emulator between scales"""
+    url = f"http://{host}/emulator/v1/projects/{project_id}/databases/(default)/documents"
+    urllib.request.urlopen(urllib.request.Request(url, method="DELETE")).read()
+
+
+def run_stage(name: str, client: InstrumentedClient, fn: Callable[[], Any],
+              verbose: bool = False) -> Dict[str, Any]:
+    """
+    Time one stage; fn returns the number of documents it processed.
+
+    Verification stages return (documents, passed) instead, so a failed check is
+    recorded as verified False next to its real document count.
+    """
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with RssSampler() as rss, output, client.stage(name):
+        started = time.perf_counter()
+        outcome = fn()
+        seconds = time.perf_counter() - started
+    docs, verified = outcome if isinstance(outcome, tuple) else (outcome or 0, None)
+    totals = client.metrics.totals(name)
+    return {
+        "stage": name,
+        "seconds": round(seconds, 4),
+        "docs": docs,
+        "verified": verified,
+        "docs_per_sec": round(docs / seconds, 1) if seconds > 0 else 0.0,
+        "peak_rss_mb": round(rss.peak / 2 ** 20, 1),
+        "rpcs": client.metrics.rpc_counts(name),
+        "reads": totals.get("reads", 0),
+        "writes": totals.get("writes", 0),
+    }
+
+
+def benchmark_scale(db_factory: Callable[[], Any], scale: str, seed: int = 0,
+                    snapshot_dir: Optional[str] = None, verbose: bool = False) -> List[Dict[str, Any]]:
+    """Run every stage at one scale against a freshly emptied database"""
+    import initialize_firestore as init
+    from deep_verify import deep_verify
+    from leaderboard_rebuild import rebuild_leaderboard
+    from snapshot_io import export_snapshot
+
+    num_users, num_topics, num_debates = SCALES[scale]
+    total = num_users * 2 + num_topics + num_debates + len(init.create_sample_achievements()) + 1
+    client = InstrumentedClient(db_factory())
+    now = datetime(2025, 1, 1)
+
+    def generate():
+        dataset = init.create_synthetic_dataset(num_users, num_topics, num_debates, seed, now)
+        return sum(1 for docs in dataset.values() for _ in docs)
+
+    def setup():
+        init.setup_collections(client, init.create_synthetic_dataset(num_users, num_topics, num_debates, seed, now))
+        return total
+
+    def export():
+        if not snapshot_dir:
+            return 0
+        counts = export_snapshot(client, os.path.join(snapshot_dir, scale))
+        return sum(counts.values())
+
+    stages = [
+        ("generate", generate),
+        ("setup_collections", setup),
+        ("verify_setup", lambda: (total, init.verify_setup(client))),
+        ("deep_verify", lambda: (num_users * 2 + num_topics + num_debates, deep_verify(client))),
+        ("rebuild_leaderboard", lambda: rebuild_leaderboard(client)["ranked"]),
+        ("export_snapshot", export),
+    ]
+    results = []
+    for name, fn in stages:
+        result = run_stage(name, client, fn, verbose)
+        result["scale"] = scale
+        results.append(result)
+        print(f"    {scale:>6} {name:<20} {result['seconds']:>9.3f}s {result['docs_per_sec']:>12,.0f} docs/s "
+              f"{result['peak_rss_mb']:>8.1f} MB  rpcs={sum(result['rpcs'].values())}"
+              + ("  ❌ verification failed" if result["verified"] is False else ""))
+    return results
+
+
+def write_results(results: List[Dict[str, Any]], backend: str, out_dir: str = RESULTS_DIR) -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    commit = git_commit()
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(out_dir, f"{stamp}-{commit}.json")
+    with open(path, "w") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": stamp,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": backend,
+            "results": results
+        }, f, indent=2)
+    return path
+
+
+def compare_results(baseline_path: str, candidate_path: str, threshold: float = 0.10) -> int:
+    """Print per-stage changes between two result files; returns the number of regressions"""
+    with open(baseline_path) as f:
+        baseline = {(r["scale"], r["stage"]): r for r in json.load(f)["results"]}
+    with open(candidate_path) as f:
+        candidate = json.load(f)["results"]
+    regressions = 0
+    for row in candidate:
+        base = baseline.get((row["scale"], row["stage"]))
+        if not base or not base["seconds"]:
+            continue
+        ratio = row["seconds"] / base["seconds"]
+        rpc_delta = sum(row["rpcs"].values()) - sum(base["rpcs"].values())
+        failed = row.get("verified") is False
+        flag = "❌" if ratio > 1 + threshold or rpc_delta > 0 or failed else "✓"
+        regressions += flag == "❌"
+        print(f"    {flag} {row['scale']:>6} {row['stage']:<20} {ratio:>6.2f}x time  "
+              f"{rpc_delta:+d} rpcs  {row['peak_rss_mb'] - base['peak_rss_mb']:+.1f} MB"
+              + ("  verification failed" if failed else ""))
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark the Debattle seeding pipeline")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run")
+    run.add_argument("--backend", choices=["emulator", "memory"],
+                     help="defaults to the emulator when a host is given, otherwise the in-memory store")
+    run.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    run.add_argument("--project", default="demo-debattle-bench")
+    run.add_argument("--scales", nargs="+", default=DEFAULT_SCALES, choices=list(SCALES))
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--snapshot-dir", help="also benchmark snapshot export into this directory")
+    run.add_argument("--out-dir", default=RESULTS_DIR)
+    run.add_argument("--verbose", action="store_true", help="show the stages' own output")
+    compare = sub.add_parser("compare")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        sys.exit(1 if compare_results(args.baseline, args.candidate, args.threshold) else 0)
+
+    backend = args.backend or ("emulator" if args.emulator else "memory")
+    if backend == "emulator":
+        if not args.emulator:
+            parser.error("the emulator backend needs --emulator or FIRESTORE_EMULATOR_HOST")
+        from initialize_firestore import connect_emulator
+
+        def db_factory():
+            clear_emulator(args.emulator, args.project)
+            return connect_emulator(args.emulator, args.project)
+        print(f"⏱️  Benchmarking scales {', '.join(args.scales)} against the emulator at {args.emulator}")
+    else:
+        from memory_firestore import MemoryFirestore
+
+        def db_factory():
+            return MemoryFirestore(args.project)
+        print(f"⏱️  Benchmarking scales {', '.join(args.scales)} against the in-memory store")
+
+    results = []
+    for scale in args.scales:
+        results.extend(benchmark_scale(db_factory, scale, args.seed, args.snapshot_dir, args.verbose))
+    path = write_results(results, backend, args.out_dir)
+    print(f"✓ Results written to {path}")
+    failed = [f"{r['scale']}/{r['stage']}" for r in results if r["verified"] is False]
+    if failed:
+        print(f"❌ Verification failed in {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
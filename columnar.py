@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Columnar analytics loader for Debattle.
+Flattens users, topics, debates, judgment scores and per-argument ai_feedback into typed NumPy columns with interned strings.
+"""
+
+import argparse
+import os
+import sys
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ratings import debate_winner
+
+CRITERIA = ["logic", "evidence", "clarity", "rebuttal", "engagement", "total"]
+
+# participants.result: the player's score times two, so it fits an int8
+LOSS, DRAWN, WIN = 0, 1, 2
+
+_TYPECODES = {np.dtype(np.int8): "b", np.dtype(np.uint8): "B", np.dtype(np.int16): "h",
+              np.dtype(np.int32): "i", np.dtype(np.int64): "q", np.dtype(np.float32): "f",
+              np.dtype(np.float64): "d", np.dtype(np.bool_): "B"}
+
+USER_SCHEMA = {
+    "uid": np.int32, "rating": np.int16, "provisional": np.bool_, "games": np.int32, "wins": np.int32,
+    "losses": np.int32, "draws": np.int32, "win_streak": np.int16, "best_win_streak": np.int16,
+    "win_rate": np.float32, "xp": np.int32, "level": np.int16, "tier": np.int16, "debate_style": np.int16,
+    "created_at": np.float64, "last_active": np.float64, "arguments_posted": np.int32,
+    "average_response_time": np.float32,
+}
+USER_LISTS = {"achievements": "achievement", "preferred_topics": "category", "strongest_categories": "category"}
+
+TOPIC_SCHEMA = {"id": np.int32, "category": np.int16, "difficulty": np.int16, "usage_count": np.int32,
+                "trending": np.bool_, "average_rating": np.float32, "created_at": np.float64}
+TOPIC_LISTS = {"tags": "tag"}
+
+DEBATE_SCHEMA = {"id": np.int32, "topic": np.int32, "status": np.int16, "format": np.int16, "winner": np.int32,
+                 "created_at": np.float64, "ended_at": np.float64, "confidence": np.float32,
+                 "debate_quality": np.float32, "duration": np.int32}
+
+PARTICIPANT_SCHEMA = {"debate": np.int32, "user": np.int32, "stance": np.int16, "rating": np.int16,
+                      "rating_change": np.int16, "result": np.int8,
+                      **{criterion: np.uint8 for criterion in CRITERIA}}
+
+ARGUMENT_SCHEMA = {"debate": np.int32, "user": np.int32, "type": np.int16, "side": np.int16, "round": np.int8,
+                   "word_count": np.int16, "timestamp": np.float64, "strength": np.float32,
+                   "clarity": np.float32, "evidence": np.float32}
+
+
+def _epoch(value: Any) -> float:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float("nan")
+
+
+class StringPool:
+    """Interns strings to dense integer codes; -1 stands for a missing value"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def find(self, value: str) -> int:
+        return self._codes.get(value, -1)
+
+    def decode(self, codes: Iterable[int]) -> List[Optional[str]]:
+        return [self.values[c] if c >= 0 else None for c in codes]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class Table:
+    """Equal-length typed columns plus multi-valued columns stored as (offsets, codes)"""
+
+    def __init__(self, columns: Dict[str, np.ndarray], lists: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        self.columns = columns
+        self.lists = lists
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def list_rows(self, name: str) -> np.ndarray:
+        """Owning row of every value in a multi-valued column"""
+        offsets, _ = self.lists[name]
+        return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+    @property
+    def nbytes(self) -> int:
+        return (sum(c.nbytes for c in self.columns.values())
+                + sum(o.nbytes + v.nbytes for o, v in self.lists.values()))
+
+
+class _TableBuilder:
+    """Appends rows into compact array buffers; no per-row Python objects are kept"""
+
+    def __init__(self, schema: Dict[str, Any], lists: Sequence[str] = ()):
+        self.schema = {name: np.dtype(dtype) for name, dtype in schema.items()}
+        self._columns = {name: array(_TYPECODES[dtype]) for name, dtype in self.schema.items()}
+        self._lists = {name: (array("q", [0]), array("i")) for name in lists}
+
+    def append(self, row: Dict[str, Any], lists: Optional[Dict[str, List[int]]] = None):
+        for name, column in self._columns.items():
+            column.append(row[name])
+        for name, codes in (lists or {}).items():
+            offsets, values = self._lists[name]
+            values.extend(codes)
+            offsets.append(len(values))
+
+    def build(self) -> Table:
+        # Typecodes match the column itemsizes, so the buffers are reinterpreted rather than converted
+        columns = {name: np.frombuffer(column, dtype=self.schema[name]).copy()
+                   for name, column in self._columns.items()}
+        lists = {name: (np.frombuffer(offsets, dtype=np.int64).copy(), np.frombuffer(values, dtype=np.int32).copy())
+                 for name, (offsets, values) in self._lists.items()}
+        return Table(columns, lists)
+
+
+def _clamp(value: Any, dtype: np.dtype, default: int = 0) -> Any:
+    """Fit a stored number into its column type instead of failing on one bad document"""
+    if value is None or isinstance(value, (str, dict, list)):
+        return default
+    if dtype.kind in "iu":
+        info = np.iinfo(dtype)
+        return int(min(info.max, max(info.min, int(value))))
+    return float(value)
+
+
+class Columns:
+    """Users, topics, debates, participants and arguments as columnar tables sharing string pools"""
+
+    POOLS = ["uid", "topic", "debate", "category", "tier", "style", "status", "format", "stance",
+             "argument_type", "achievement", "tag"]
+
+    def __init__(self):
+        self.pools = {name: StringPool() for name in self.POOLS}
+        self._users = _TableBuilder(USER_SCHEMA, list(USER_LISTS))
+        self._topics = _TableBuilder(TOPIC_SCHEMA, list(TOPIC_LISTS))
+        self._debates = _TableBuilder(DEBATE_SCHEMA)
+        self._participants = _TableBuilder(PARTICIPANT_SCHEMA)
+        self._arguments = _TableBuilder(ARGUMENT_SCHEMA)
+        self._debate_rows = 0
+        self.users: Optional[Table] = None
+        self.topics: Optional[Table] = None
+        self.debates: Optional[Table] = None
+        self.participants: Optional[Table] = None
+        self.arguments: Optional[Table] = None
+
+    def _fit(self, schema: Dict[str, Any], name: str, value: Any, default: int = 0) -> Any:
+        return _clamp(value, np.dtype(schema[name]), default)
+
+    def add_user(self, user: Dict[str, Any]):
+        pools = self.pools
+        stats = user.get("stats") or {}
+        u = lambda name, value: self._fit(USER_SCHEMA, name, value)
+        self._users.append({
+            "uid": pools["uid"].code(user.get("uid")),
+            "rating": u("rating", user.get("rating", 1200)),
+            "provisional": bool(user.get("provisionalRating")),
+            "games": u("games", user.get("gamesPlayed")),
+            "wins": u("wins", user.get("wins")),
+            "losses": u("losses", user.get("losses")),
+            "draws": u("draws", user.get("draws")),
+            "win_streak": u("win_streak", user.get("winStreak")),
+            "best_win_streak": u("best_win_streak", user.get("bestWinStreak")),
+            "win_rate": u("win_rate", user.get("win_rate")),
+            "xp": u("xp", user.get("xp")),
+            "level": u("level", user.get("level", 1)),
+            "tier": pools["tier"].code(user.get("tier")),
+            "debate_style": pools["style"].code(user.get("debate_style")),
+            "created_at": _epoch(user.get("created_at")),
+            "last_active": _epoch(user.get("last_active")),
+            "arguments_posted": u("arguments_posted", stats.get("totalArgumentsPosted")),
+            "average_response_time": u("average_response_time", stats.get("averageResponseTime")),
+        }, {
+            "achievements": [pools["achievement"].code(a) for a in user.get("achievements") or []],
+            "preferred_topics": [pools["category"].code(c) for c in user.get("preferred_topics") or []],
+            "strongest_categories": [pools["category"].code(c) for c in stats.get("strongestCategories") or []],
+        })
+
+    def add_topic(self, topic: Dict[str, Any]):
+        pools = self.pools
+        t = lambda name, value: self._fit(TOPIC_SCHEMA, name, value)
+        self._topics.append({
+            "id": pools["topic"].code(topic.get("id")),
+            "category": pools["category"].code(topic.get("category")),
+            "difficulty": t("difficulty", topic.get("difficulty")),
+            "usage_count": t("usage_count", topic.get("usageCount")),
+            "trending": bool(topic.get("trending")),
+            "average_rating": t("average_rating", topic.get("averageRating")),
+            "created_at": _epoch(topic.get("created_at") or topic.get("createdAt")),
+        }, {"tags": [pools["tag"].code(tag) for tag in topic.get("tags") or []]})
+
+    def add_debate(self, debate_id: str, debate: Dict[str, Any]):
+        pools = self.pools
+        row = self._debate_rows
+        self._debate_rows += 1
+        judgment = debate.get("judgment") or {}
+        winner = debate_winner(debate)
+        metadata = debate.get("metadata") or {}
+        d = lambda name, value: self._fit(DEBATE_SCHEMA, name, value)
+        self._debates.append({
+            "id": pools["debate"].code(debate_id),
+            "topic": pools["topic"].code(debate.get("topicId")),
+            "status": pools["status"].code(debate.get("status")),
+            "format": pools["format"].code(debate.get("format")),
+            "winner": pools["uid"].code(winner) if winner else -1,
+            "created_at": _epoch(debate.get("created_at") or debate.get("createdAt")),
+            "ended_at": _epoch(debate.get("ended_at")),
+            "confidence": d("confidence", judgment.get("confidence")),
+            "debate_quality": d("debate_quality", judgment.get("debate_quality")),
+            "duration": d("duration", metadata.get("debate_duration")),
+        })
+
+        scores = judgment.get("scores") or {}
+        changes = debate.get("ratingChanges") or {}
+        completed = debate.get("status") == "completed"
+        for participant in debate.get("participants") or []:
+            uid = participant.get("userId")
+            if winner is None:
+                result = DRAWN if completed else -1
+            else:
+                result = WIN if winner == uid else LOSS
+            own = scores.get(uid) or {}
+            p = lambda name, value: self._fit(PARTICIPANT_SCHEMA, name, value)
+            self._participants.append({
+                "debate": row,
+                "user": pools["uid"].code(uid),
+                "stance": pools["stance"].code(participant.get("stance")),
+                "rating": p("rating", participant.get("rating")),
+                "rating_change": p("rating_change", changes.get(uid)),
+                "result": result,
+                **{criterion: p(criterion, own.get(criterion)) for criterion in CRITERIA},
+            })
+
+        for argument in debate.get("arguments") or []:
+            feedback = argument.get("ai_feedback") or {}
+            nan = float("nan")
+            self._arguments.append({
+                "debate": row,
+                "user": pools["uid"].code(argument.get("userId")),
+                "type": pools["argument_type"].code(argument.get("type")),
+                "side": pools["stance"].code(argument.get("side")),
+                "round": self._fit(ARGUMENT_SCHEMA, "round", argument.get("round")),
+                "word_count": self._fit(ARGUMENT_SCHEMA, "word_count", argument.get("wordCount")),
+                "timestamp": _epoch(argument.get("timestamp")),
+                "strength": float(feedback.get("strength_score", nan)),
+                "clarity": float(feedback.get("clarity_score", nan)),
+                "evidence": float(feedback.get("evidence_score", nan)),
+            })
+
+    def build(self) -> "Columns":
+        """Freeze the appended rows into NumPy arrays"""
+        self.users = self._users.build()
+        self.topics = self._topics.build()
+        self.debates = self._debates.build()
+        self.participants = self._participants.build()
+        self.arguments = self._arguments.build()
+        return self
+
+    @classmethod
+    def from_records(cls, users: Iterable[Dict[str, Any]], topics: Iterable[Dict[str, Any]],
+                     debates: Iterable[Tuple[str, Dict[str, Any]]]) -> "Columns":
+        columns = cls()
+        for user in users:
+            columns.add_user(user)
+        for topic in topics:
+            columns.add_topic(topic)
+        for debate_id, debate in debates:
+            columns.add_debate(debate_id, debate)
+        return columns.build()
+
+    @classmethod
+    def from_snapshot(cls, snapshot_dir: str) -> "Columns":
+        from snapshot_io import read_collection
+        return cls.from_records((dict(data, uid=doc_id) for doc_id, data in read_collection(snapshot_dir, "users")),
+                                (dict(data, id=doc_id) for doc_id, data in read_collection(snapshot_dir, "topics")),
+                                read_collection(snapshot_dir, "debates"))
+
+    @classmethod
+    def from_firestore(cls, db, page_size: int = 1000) -> "Columns":
+        from firestore_io import iter_documents
+        return cls.from_records((dict(s.to_dict(), uid=s.id) for s in iter_documents(db, "users", page_size)),
+                                (dict(s.to_dict(), id=s.id) for s in iter_documents(db, "topics", page_size)),
+                                ((s.id, s.to_dict()) for s in iter_documents(db, "debates", page_size)))
+
+    # Joins
+
+    def user_rows(self, uid_codes: np.ndarray) -> np.ndarray:
+        """users row for each uid code, -1 when the user has no document"""
+        lookup = np.full(len(self.pools["uid"]) + 1, -1, dtype=np.int64)
+        lookup[self.users["uid"]] = np.arange(len(self.users))
+        return lookup[uid_codes]
+
+    def debate_category(self) -> np.ndarray:
+        """Category code of every debate through topicId, -1 when the topic is unknown"""
+        lookup = np.full(len(self.pools["topic"]) + 1, -1, dtype=np.int32)
+        lookup[self.topics["id"]] = self.topics["category"]
+        return lookup[self.debates["topic"]]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(t.nbytes for t in (self.users, self.topics, self.debates, self.participants, self.arguments))
+
+
+def group_mean(groups: np.ndarray, values: np.ndarray, n_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Mean of values per group code, ignoring NaNs and negative (missing) codes; returns (means, counts)"""
+    keep = (groups >= 0) & ~np.isnan(values)
+    counts = np.bincount(groups[keep], minlength=n_groups)
+    sums = np.bincount(groups[keep], weights=values[keep], minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts, counts
+
+
+def category_records(columns: Columns, user_mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(games, wins, draws) per category, summed over all users or the users rows selected by user_mask"""
+    n_categories = len(columns.pools["category"])
+    participants = columns.participants
+    users = columns.user_rows(participants["user"])
+    categories = columns.debate_category()[participants["debate"]]
+    keep = (users >= 0) & (categories >= 0) & (participants["result"] >= 0)
+    if user_mask is not None:
+        keep &= user_mask[np.maximum(users, 0)]
+    categories = categories[keep]
+    result = participants["result"][keep]
+    games = np.bincount(categories, minlength=n_categories)
+    wins = np.bincount(categories[result == WIN], minlength=n_categories)
+    draws = np.bincount(categories[result == DRAWN], minlength=n_categories)
+    return games, wins, draws
+
+
+def win_rate_by_category(columns: Columns, user_mask: Optional[np.ndarray] = None) -> Dict[str, Dict[str, float]]:
+    """Games and win rate per topic category, over all users or a masked subset (e.g. one tier)"""
+    games, wins, draws = category_records(columns, user_mask)
+    return {category: {"games": int(games[c]), "wins": int(wins[c]), "draws": int(draws[c]),
+                       "win_rate": round(100 * wins[c] / games[c], 1) if games[c] else 0.0}
+            for c, category in enumerate(columns.pools["category"].values)}
+
+
+def average_feedback_by_style(columns: Columns, score: str = "clarity") -> Dict[str, Dict[str, float]]:
+    """Mean per-argument ai_feedback score grouped by the author's debate_style"""
+    users = columns.user_rows(columns.arguments["user"])
+    styles = np.where(users >= 0, columns.users["debate_style"][np.maximum(users, 0)], -1)
+    means, counts = group_mean(styles, columns.arguments[score].astype(np.float64), len(columns.pools["style"]))
+    return {style: {"arguments": int(counts[s]), f"average_{score}": round(float(means[s]), 3) if counts[s] else 0.0}
+            for s, style in enumerate(columns.pools["style"].values)}
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Load Debattle data into columns and run sample aggregations")
+    parser.add_argument("--snapshot", metavar="DIR", help="load a snapshot_io snapshot")
+    parser.add_argument("--scale", choices=["tiny", "small", "medium", "large", "xl"],
+                        help="load a synthetic dataset of this size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    parser.add_argument("--tier", help="restrict win rates by category to one tier")
+    args = parser.parse_args(argv)
+
+    print("📊 Loading columns...")
+    if args.snapshot:
+        columns = Columns.from_snapshot(args.snapshot)
+    elif args.scale:
+        from synthetic_data import SCALES, generate_debates, generate_topics, generate_users
+        n_users, n_topics, n_debates = SCALES[args.scale]
+        columns = Columns.from_records(generate_users(n_users, args.seed), generate_topics(n_topics, args.seed),
+                                       ((d["id"], d) for d in generate_debates(n_debates, n_users, n_topics, args.seed)))
+    else:
+        from initialize_firestore import connect
+        columns = Columns.from_firestore(connect(args.emulator))
+    print(f"    ✓ {len(columns.users):,} users, {len(columns.debates):,} debates, "
+          f"{len(columns.arguments):,} arguments in {columns.nbytes / 2 ** 20:,.1f} MiB")
+
+    mask = None
+    if args.tier:
+        mask = columns.users["tier"] == columns.pools["tier"].find(args.tier)
+    print(f"🏷️  Win rate by category{f' ({args.tier})' if args.tier else ''}:")
+    for category, row in sorted(win_rate_by_category(columns, mask).items(), key=lambda kv: -kv[1]["win_rate"]):
+        print(f"    {category:<14} {row['win_rate']:>5.1f}% of {row['games']:,} games")
+    print("🗣️  Average clarity score by debate style:")
+    for style, row in sorted(average_feedback_by_style(columns).items()):
+        print(f"    {style:<14} {row['average_clarity']:.2f} over {row['arguments']:,} arguments")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Columnar load failed: {e}")
+        sys.exit(1)
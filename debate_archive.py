@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Debate archival for Debattle.
+Moves old completed debates into compressed chunks in an archive subcollection and leaves a slim summary doc behind.
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from firestore_io import BatchWriter, Throughput, get_documents, iter_pages
+from snapshot_io import decode_record, encode_record
+
+STATE_COLLECTION = "system"
+STATE_DOC = "debateArchive"
+
+ARCHIVE_SUBCOLLECTION = "archive"
+ARCHIVE_VERSION = 1
+# Well under the 1 MiB document limit, and CHUNKS_PER_BATCH of them stay under the 10 MiB request limit
+CHUNK_BYTES = 512 * 1024
+CHUNKS_PER_BATCH = 16
+
+# What the history page reads; everything else only lives in the archive
+SUMMARY_FIELDS = ["topic", "topicId", "format", "category", "participants", "status", "created_at", "started_at",
+                  "ended_at", "winner", "ratingChanges", "metadata"]
+SUMMARY_JUDGMENT_FIELDS = ["winner", "confidence", "scores", "debate_quality"]
+
+DEFAULT_MIN_AGE_DAYS = 90
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def archive_path(debate_id: str) -> str:
+    return f"debates/{debate_id}/{ARCHIVE_SUBCOLLECTION}"
+
+
+def pack(debate_id: str, debate: Dict[str, Any]) -> Tuple[List[bytes], Dict[str, Any]]:
+    """Compressed chunks of the full debate and the archive descriptor stored on its summary"""
+    raw = encode_record(debate_id, debate).encode("utf-8")
+    blob = zlib.compress(raw, 9)
+    chunks = [blob[i:i + CHUNK_BYTES] for i in range(0, len(blob), CHUNK_BYTES)] or [b""]
+    return chunks, {
+        "version": ARCHIVE_VERSION,
+        "codec": "zlib",
+        "chunks": len(chunks),
+        "bytes": len(blob),
+        "rawBytes": len(raw),
+        "sha256": hashlib.sha256(blob).hexdigest()
+    }
+
+
+def summarize(debate: Dict[str, Any], archive: Dict[str, Any], archived_at: datetime) -> Dict[str, Any]:
+    """The slim document that replaces an archived debate"""
+    summary = {field: debate[field] for field in SUMMARY_FIELDS if field in debate}
+    judgment = debate.get("judgment") or {}
+    summary["judgment"] = {field: judgment[field] for field in SUMMARY_JUDGMENT_FIELDS if field in judgment}
+    summary["archive"] = {**archive, "archivedAt": archived_at}
+    return summary
+
+
+def unpack(chunks: List[bytes], archive: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    blob = b"".join(chunks)
+    if len(chunks) != archive["chunks"] or hashlib.sha256(blob).hexdigest() != archive["sha256"]:
+        raise ValueError("archive chunks are missing or corrupt")
+    return decode_record(zlib.decompress(blob).decode("utf-8"))
+
+
+def read_archive(db, debate_id: str, archive: Dict[str, Any]) -> Dict[str, Any]:
+    """Full debate from its chunks, given the archive descriptor already read from its summary"""
+    snaps = db.collection(archive_path(debate_id)).order_by("__name__").stream()
+    _, debate = unpack([bytes((s.to_dict() or {})["data"]) for s in snaps], archive)
+    return debate
+
+
+def load_archived(db, debate_id: str) -> Dict[str, Any]:
+    """Full debate as it was before archival"""
+    summary = db.collection("debates").document(debate_id).get()
+    archive = (summary.to_dict() or {}).get("archive") if summary.exists else None
+    if not archive:
+        raise ValueError(f"debate {debate_id} is not archived")
+    return read_archive(db, debate_id, archive)
+
+
+def restore(db, debate_id: str):
+    """Put an archived debate back in place and drop its chunks"""
+    debate = load_archived(db, debate_id)
+    chunks = [s.id for s in db.collection(archive_path(debate_id)).select([]).stream()]
+    db.collection("debates").document(debate_id).set(debate)
+    with BatchWriter(db, label="archive cleanup") as writer:
+        for chunk_id in chunks:
+            writer.delete(archive_path(debate_id), chunk_id)
+
+
+def load_cursor(db) -> Optional[str]:
+    snap = db.collection(STATE_COLLECTION).document(STATE_DOC).get()
+    return (snap.to_dict() or {}).get("cursor") if snap.exists else None
+
+
+def save_cursor(db, cursor: Optional[str], totals: Dict[str, int]):
+    db.collection(STATE_COLLECTION).document(STATE_DOC).set({
+        "cursor": cursor,
+        "updatedAt": datetime.now(timezone.utc),
+        **totals
+    }, merge=True)
+
+
+def _candidates(db, cutoff: datetime, page_size: int, start_after) -> Iterator[Tuple[Any, List[str]]]:
+    """Pages of old debates as (last snapshot, ids still to archive); archived ones are read slim"""
+    query = (db.collection("debates").select(["status", "archive"]).where("ended_at", "<", cutoff)
+             .order_by("ended_at").order_by("__name__"))
+    for page in iter_pages(query, page_size, start_after):
+        ids = [s.id for s in page if (s.to_dict() or {}).get("status") == "completed"
+               and not (s.to_dict() or {}).get("archive")]
+        yield page[-1], ids
+
+
+def archive_debates(db, cutoff: datetime, page_size: int = 100, max_in_flight: int = 4, dry_run: bool = False,
+                    restart: bool = False) -> Dict[str, int]:
+    """
+    Archive completed debates that ended before the cutoff, one page at a time.
+
+    Each page writes every chunk and waits for them to commit before any summary
+    replaces a full debate, so an interruption never leaves a debate without its
+    archive. The page cursor is saved after the summaries; a rerun resumes there
+    and skips debates that already carry an archive descriptor.
+    """
+    cutoff = _utc(cutoff)
+    cursor_id = None if restart else load_cursor(db)
+    start_after = None
+    if cursor_id:
+        snap = db.collection("debates").document(cursor_id).get()
+        start_after = snap if snap.exists else None
+        print(f"    ℹ️  Resuming after debate {cursor_id}")
+
+    print(f"🗄️  Archiving completed debates that ended before {cutoff.isoformat()}...")
+    progress = Throughput("debates", report_every=5.0)
+    totals = {"archived": 0, "bytesBefore": 0, "bytesAfter": 0}
+    chunk_writer = None if dry_run else BatchWriter(db, batch_size=CHUNKS_PER_BATCH, max_in_flight=max_in_flight,
+                                                    label="archive chunks")
+    summary_writer = None if dry_run else BatchWriter(db, max_in_flight=max_in_flight, label="debate summaries")
+    try:
+        for last, ids in _candidates(db, cutoff, page_size, start_after):
+            summaries = []
+            archived_at = datetime.now(timezone.utc)
+            for snap in get_documents(db, "debates", ids):
+                if not snap.exists:
+                    continue
+                debate = snap.to_dict() or {}
+                chunks, archive = pack(snap.id, debate)
+                summary = summarize(debate, archive, archived_at)
+                totals["archived"] += 1
+                totals["bytesBefore"] += archive["rawBytes"]
+                totals["bytesAfter"] += len(encode_record(snap.id, summary))
+                if chunk_writer:
+                    for i, chunk in enumerate(chunks):
+                        chunk_writer.set(archive_path(snap.id), f"{i:04d}", {"index": i, "data": chunk})
+                summaries.append((snap.id, summary))
+            if not dry_run:
+                # Barrier: chunks must be durable before the full debates are replaced
+                chunk_writer.flush()
+                for debate_id, summary in summaries:
+                    summary_writer.set("debates", debate_id, summary)
+                summary_writer.flush()
+                save_cursor(db, last.id, {})
+            progress.add(len(ids))
+    finally:
+        for writer in (chunk_writer, summary_writer):
+            if writer:
+                writer.close()
+    if not dry_run:
+        save_cursor(db, None, {"lastRunArchived": totals["archived"]})
+
+    ratio = totals["bytesBefore"] / totals["bytesAfter"] if totals["bytesAfter"] else 0
+    action = "Would archive" if dry_run else "Archived"
+    print(f"    ✓ {action} {totals['archived']:,} debates: {totals['bytesBefore'] / 1e6:,.1f} MB of debate docs "
+          f"→ {totals['bytesAfter'] / 1e6:,.1f} MB of summaries ({ratio:,.1f}x)")
+    return totals
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Archive old Debattle debates into compressed chunks")
+    parser.add_argument("--older-than", type=float, default=DEFAULT_MIN_AGE_DAYS, metavar="DAYS",
+                        help="archive debates that ended more than this many days ago")
+    parser.add_argument("--restore", metavar="DEBATE_ID", help="restore one archived debate instead")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved cursor and scan from the start")
+    parser.add_argument("--dry-run", action="store_true", help="report sizes without writing")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    args = parser.parse_args(argv)
+
+    from initialize_firestore import connect
+    db = connect(args.emulator)
+    if args.restore:
+        restore(db, args.restore)
+        print(f"    ✓ Restored debate {args.restore}")
+        return
+    cutoff = datetime.now(timezone.utc) - timedelta(days=args.older_than)
+    archive_debates(db, cutoff, args.page_size, args.max_in_flight, args.dry_run, args.restart)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Debate archival failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Deep verification of the seeded Debattle collections.
+Pages through each collection with cursors and checks schema invariants one document at a time.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+from firestore_io import DEFAULT_PAGE_SIZE, Throughput, iter_pages
+from ratings import DRAW, TIER_THRESHOLDS
+
+VALID_TIERS = {tier for _, tier in TIER_THRESHOLDS}
+
+# Only the first problems are kept so memory stays constant on a broken collection
+MAX_REPORTED_PROBLEMS = 20
+
+
+def _win_rate(wins: int, games: int) -> float:
+    return round(wins / games * 100, 1) if games else 0.0
+
+
+def check_user(doc_id: str, user: Dict[str, Any]) -> List[str]:
+    problems = []
+    games = user.get("gamesPlayed", 0)
+    wins, losses, draws = user.get("wins", 0), user.get("losses", 0), user.get("draws", 0)
+    if wins + losses + draws != games:
+        problems.append(f"wins+losses+draws={wins + losses + draws} but gamesPlayed={games}")
+    if abs(user.get("win_rate", 0.0) - _win_rate(wins, games)) > 0.1:
+        problems.append(f"win_rate={user.get('win_rate')} but wins/gamesPlayed={_win_rate(wins, games)}")
+    if user.get("winStreak", 0) > user.get("bestWinStreak", 0):
+        problems.append("winStreak is greater than bestWinStreak")
+    if user.get("tier") not in VALID_TIERS:
+        problems.append(f"unknown tier {user.get('tier')!r}")
+    if user.get("uid", doc_id) != doc_id:
+        problems.append(f"uid {user.get('uid')!r} does not match document id")
+    return problems
+
+
+def check_topic(doc_id: str, topic: Dict[str, Any]) -> List[str]:
+    problems = []
+    if not 1 <= topic.get("difficulty", 0) <= 10:
+        problems.append(f"difficulty {topic.get('difficulty')} outside 1-10")
+    if topic.get("usageCount", 0) < 0:
+        problems.append("negative usageCount")
+    return problems
+
+
+def check_debate(doc_id: str, debate: Dict[str, Any]) -> List[str]:
+    problems = []
+    participants = {p.get("userId") for p in debate.get("participants", [])}
+    if debate.get("status") != "completed":
+        return problems
+    winner = debate.get("winner")
+    if winner not in participants and winner != DRAW:
+        problems.append(f"winner {winner!r} is not a participant")
+    judged = (debate.get("judgment") or {}).get("winner")
+    if judged is not None and judged != winner:
+        problems.append(f"judgment winner {judged!r} differs from winner {winner!r}")
+    changes = debate.get("ratingChanges") or {}
+    if set(changes) - participants:
+        problems.append(f"ratingChanges for non-participants {sorted(set(changes) - participants)}")
+    return problems
+
+
+class LeaderboardChecker:
+    """Checks rows arrive in rank order with contiguous ranks and non-increasing ratings"""
+
+    def __init__(self):
+        self.last_rank = 0
+        self.last_rating: Optional[float] = None
+
+    def __call__(self, doc_id: str, entry: Dict[str, Any]) -> List[str]:
+        problems = []
+        rank, rating = entry.get("rank"), entry.get("rating", 0)
+        if rank != self.last_rank + 1:
+            problems.append(f"rank {rank} follows rank {self.last_rank}")
+        if self.last_rating is not None and rating > self.last_rating:
+            problems.append(f"rating {rating} is above the previous rank's {self.last_rating}")
+        games = entry.get("gamesPlayed", 0)
+        if abs(entry.get("winRate", 0.0) - _win_rate(entry.get("wins", 0), games)) > 0.1:
+            problems.append(f"winRate={entry.get('winRate')} disagrees with wins/gamesPlayed")
+        self.last_rank = rank if isinstance(rank, int) else self.last_rank + 1
+        self.last_rating = rating
+        return problems
+
+
+def deep_checks() -> Dict[str, Any]:
+    """Collection name -> (order_by field, checker); checkers may keep state across documents"""
+    return {
+        "users": ("__name__", check_user),
+        "topics": ("__name__", check_topic),
+        "debates": ("__name__", check_debate),
+        "leaderboard": ("rank", LeaderboardChecker()),
+    }
+
+
+def verify_collection(db, collection: str, order_by: str, check: Callable[[str, Dict[str, Any]], List[str]],
+                      page_size: int = DEFAULT_PAGE_SIZE, report_every: float = 5.0) -> Dict[str, Any]:
+    """Stream one collection page by page and run its checker on every document"""
+    query = db.collection(collection).order_by(order_by)
+    if order_by != "__name__":
+        # Tie-break on the document id so cursors never skip or repeat documents
+        query = query.order_by("__name__")
+    progress = Throughput(collection, report_every)
+    failed = 0
+    problems: List[str] = []
+    for page in iter_pages(query, page_size):
+        for snap in page:
+            found = check(snap.id, snap.to_dict())
+            if found:
+                failed += 1
+                if len(problems) < MAX_REPORTED_PROBLEMS:
+                    problems.extend(f"{snap.id}: {problem}" for problem in found)
+        progress.add(len(page))
+    return {
+        "checked": progress.count,
+        "failed": failed,
+        "problems": problems[:MAX_REPORTED_PROBLEMS],
+        "seconds": round(progress.elapsed, 3),
+        "docs_per_sec": round(progress.rate, 1),
+    }
+
+
+def deep_verify(db, page_size: int = DEFAULT_PAGE_SIZE, collections: Optional[List[str]] = None) -> bool:
+    """Run every collection's invariant checks; returns True when nothing failed"""
+    print("🔬 Deep-verifying collections...")
+    ok = True
+    for collection, (order_by, check) in deep_checks().items():
+        if collections and collection not in collections:
+            continue
+        result = verify_collection(db, collection, order_by, check, page_size)
+        status = "✓" if not result["failed"] else "❌"
+        print(f"    {status} {collection}: {result['checked']:,} checked, {result['failed']:,} failed "
+              f"({result['docs_per_sec']:,.0f} docs/sec)")
+        for problem in result["problems"]:
+            print(f"        • {problem}")
+        ok = ok and not result["failed"]
+    return ok
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+ELO replay engine for Debattle.
+Replays the debates history in chronological order to recompute ratings, provisional flags, streaks and ratingChanges.
+"""
+
+import argparse
+import os
+import sys
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from firestore_io import BatchWriter, DEFAULT_PAGE_SIZE, Throughput, iter_pages
+from ratings import debate_winner
+from settings import EloSettings, Settings, get_settings
+
+DEFAULT_ELO_SETTINGS = asdict(EloSettings())
+
+DEBATE_FIELDS = ["status", "participants", "winner", "judgment.winner", "ended_at", "created_at", "ratingChanges"]
+USER_FIELDS = ["rating", "provisionalRating", "winStreak", "bestWinStreak"]
+
+
+def load_elo_settings(db) -> Dict[str, Any]:
+    """Validated elo_settings from the cached system/settings, over the defaults"""
+    return asdict(get_settings(db).elo)
+
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return 0.0
+
+
+class DebateHistory:
+    """Completed 1v1 debates as flat arrays, sorted chronologically"""
+
+    def __init__(self, debate_ids: List[str], user_ids: List[str], player_a: np.ndarray, player_b: np.ndarray,
+                 score_a: np.ndarray, played_at: np.ndarray, stored_a: np.ndarray, stored_b: np.ndarray):
+        order = np.lexsort((np.arange(len(played_at)), played_at))
+        self.debate_ids = [debate_ids[i] for i in order]
+        self.user_ids = user_ids
+        self.player_a = player_a[order]
+        self.player_b = player_b[order]
+        self.score_a = score_a[order]
+        self.played_at = played_at[order]
+        # Stored ratingChanges, or the int32 minimum when a debate has none
+        self.stored_a = stored_a[order]
+        self.stored_b = stored_b[order]
+
+    def __len__(self) -> int:
+        return len(self.debate_ids)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[str, Dict[str, Any]]]) -> "DebateHistory":
+        """Build from (debate id, debate) pairs; keeps only the fields the replay needs"""
+        index: Dict[str, int] = {}
+        debate_ids, a, b, score, played, stored_a, stored_b = [], [], [], [], [], [], []
+        missing = np.iinfo(np.int32).min
+        for debate_id, debate in records:
+            participants = debate.get("participants") or []
+            if debate.get("status") != "completed" or len(participants) != 2:
+                continue
+            uid_a, uid_b = participants[0].get("userId"), participants[1].get("userId")
+            winner = debate_winner(debate)
+            changes = debate.get("ratingChanges") or {}
+            debate_ids.append(debate_id)
+            a.append(index.setdefault(uid_a, len(index)))
+            b.append(index.setdefault(uid_b, len(index)))
+            score.append(1.0 if winner == uid_a else 0.0 if winner == uid_b else 0.5)
+            played.append(_timestamp(debate.get("ended_at") or debate.get("created_at")))
+            stored_a.append(changes.get(uid_a, missing))
+            stored_b.append(changes.get(uid_b, missing))
+        return cls(debate_ids, list(index), np.array(a, dtype=np.int32), np.array(b, dtype=np.int32),
+                   np.array(score, dtype=np.float64), np.array(played, dtype=np.float64),
+                   np.array(stored_a, dtype=np.int32), np.array(stored_b, dtype=np.int32))
+
+    @classmethod
+    def from_firestore(cls, db, page_size: int = DEFAULT_PAGE_SIZE) -> "DebateHistory":
+        query = db.collection("debates").select(DEBATE_FIELDS).order_by("__name__")
+        progress = Throughput("debates", report_every=5.0)
+
+        def records():
+            for page in iter_pages(query, page_size):
+                for snap in page:
+                    yield snap.id, snap.to_dict()
+                progress.add(len(page))
+
+        return cls.from_records(records())
+
+    def waves(self) -> List[np.ndarray]:
+        """
+        Group games into waves of mutually independent games.
+
+        A game lands one wave after the latest earlier game of either player, so
+        no player appears twice in a wave and each player's games stay in order.
+        """
+        last = [-1] * len(self.user_ids)
+        levels = []
+        for a, b in zip(self.player_a.tolist(), self.player_b.tolist()):
+            w = max(last[a], last[b]) + 1
+            levels.append(w)
+            last[a] = last[b] = w
+        level = np.array(levels, dtype=np.int64)
+        order = np.argsort(level, kind="stable")
+        bounds = np.flatnonzero(np.diff(level[order])) + 1
+        return np.split(order, bounds)
+
+
+def _js_round(values: np.ndarray) -> np.ndarray:
+    return np.floor(values + 0.5)
+
+
+class ReplayResult:
+    """Final per-user state and per-game rating changes, one row per K-factor"""
+
+    def __init__(self, k_factors: np.ndarray, ratings: np.ndarray, games: np.ndarray, streak: np.ndarray,
+                 best_streak: np.ndarray, change_a: np.ndarray, change_b: np.ndarray, expected_a: np.ndarray):
+        self.k_factors = k_factors
+        self.ratings = ratings
+        self.games = games
+        self.streak = streak
+        self.best_streak = best_streak
+        self.change_a = change_a
+        self.change_b = change_b
+        self.expected_a = expected_a
+
+
+def replay(history: DebateHistory, settings: Dict[str, Any],
+           k_factors: Optional[Sequence[float]] = None) -> ReplayResult:
+    """
+    Replay every game wave by wave with vectorized expected scores.
+
+    Several K-factors can be replayed at once; ratings then carry one row per K.
+    """
+    ks = np.asarray(k_factors if k_factors is not None else [settings["k_factor"]], dtype=np.float64)
+    n_users, n_games = len(history.user_ids), len(history)
+    ratings = np.full((len(ks), n_users), float(settings["starting_rating"]))
+    games = np.zeros(n_users, dtype=np.int64)
+    streak = np.zeros(n_users, dtype=np.int64)
+    best_streak = np.zeros(n_users, dtype=np.int64)
+    change_a = np.zeros((len(ks), n_games), dtype=np.int32)
+    change_b = np.zeros((len(ks), n_games), dtype=np.int32)
+    expected_a = np.zeros((len(ks), n_games), dtype=np.float64)
+    lo, hi = settings["min_rating"], settings["max_rating"]
+
+    for wave in history.waves():
+        a, b = history.player_a[wave], history.player_b[wave]
+        s = history.score_a[wave]
+        ra, rb = ratings[:, a], ratings[:, b]
+        e = 1.0 / (1.0 + 10.0 ** ((rb - ra) / 400.0))
+        k = ks[:, None]
+        new_a = np.clip(_js_round(ra + k * (s - e)), lo, hi)
+        new_b = np.clip(_js_round(rb + k * ((1 - s) - (1 - e))), lo, hi)
+        change_a[:, wave] = new_a - ra
+        change_b[:, wave] = new_b - rb
+        expected_a[:, wave] = e
+        ratings[:, a], ratings[:, b] = new_a, new_b
+
+        games[a] += 1
+        games[b] += 1
+        for players, won in ((a, s == 1.0), (b, s == 0.0)):
+            streak[players] = np.where(won, streak[players] + 1, 0)
+            best_streak[players] = np.maximum(best_streak[players], streak[players])
+
+    return ReplayResult(ks, ratings, games, streak, best_streak, change_a, change_b, expected_a)
+
+
+def evaluate_k_factors(history: DebateHistory, settings: Dict[str, Any],
+                       k_factors: Sequence[float]) -> List[Dict[str, float]]:
+    """Log loss and Brier score of the pre-game predictions for each candidate K-factor"""
+    result = replay(history, settings, k_factors)
+    s = history.score_a[None, :]
+    p = np.clip(result.expected_a, 1e-9, 1 - 1e-9)
+    log_loss = -(s * np.log(p) + (1 - s) * np.log(1 - p)).mean(axis=1)
+    brier = ((p - s) ** 2).mean(axis=1)
+    return [{"k_factor": float(k), "log_loss": float(l), "brier": float(b)}
+            for k, l, b in zip(result.k_factors, log_loss, brier)]
+
+
+def user_updates(history: DebateHistory, result: ReplayResult, settings: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Recomputed user fields from the first K-factor of a replay"""
+    updates = {}
+    for i, uid in enumerate(history.user_ids):
+        updates[uid] = {
+            "rating": int(result.ratings[0, i]),
+            "provisionalRating": bool(result.games[i] < settings["provisional_games"]),
+            "winStreak": int(result.streak[i]),
+            "bestWinStreak": int(result.best_streak[i])
+        }
+    return updates
+
+
+def drifted_rating_changes(history: DebateHistory, result: ReplayResult) -> Iterable[Tuple[str, Dict[str, int]]]:
+    """(debate id, ratingChanges) for debates whose stored changes differ from the replay"""
+    drifted = np.flatnonzero((history.stored_a != result.change_a[0]) | (history.stored_b != result.change_b[0]))
+    for g in drifted.tolist():
+        uid_a = history.user_ids[history.player_a[g]]
+        uid_b = history.user_ids[history.player_b[g]]
+        yield history.debate_ids[g], {uid_a: int(result.change_a[0, g]), uid_b: int(result.change_b[0, g])}
+
+
+def apply_replay(db, history: DebateHistory, result: ReplayResult, settings: Dict[str, Any],
+                 page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, int]:
+    """Write back only the users and debates whose stored values drifted from the replay"""
+    updates = user_updates(history, result, settings)
+    users_written = debates_written = 0
+    with BatchWriter(db, label="elo repair") as writer:
+        query = db.collection("users").select(USER_FIELDS).order_by("__name__")
+        for page in iter_pages(query, page_size):
+            for snap in page:
+                wanted = updates.get(snap.id)
+                current = snap.to_dict()
+                if wanted and any(current.get(field) != value for field, value in wanted.items()):
+                    writer.update("users", snap.id, wanted)
+                    users_written += 1
+        for debate_id, changes in drifted_rating_changes(history, result):
+            writer.update("debates", debate_id, {"ratingChanges": changes})
+            debates_written += 1
+    return {"users": users_written, "debates": debates_written}
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Replay the Debattle debates history through ELO")
+    parser.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    parser.add_argument("--snapshot", metavar="DIR", help="replay a snapshot_io snapshot instead of Firestore")
+    parser.add_argument("--k", type=float, nargs="+", help="K-factors to evaluate (tuning mode)")
+    parser.add_argument("--apply", action="store_true", help="write drifted ratings and ratingChanges back")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    args = parser.parse_args(argv)
+
+    print("♟️  Replaying debate history...")
+    if args.snapshot:
+        from snapshot_io import read_collection
+        db = None
+        settings = dict(DEFAULT_ELO_SETTINGS)
+        for doc_id, data in read_collection(args.snapshot, "system"):
+            if doc_id == "settings":
+                settings = asdict(Settings.from_dict(data).elo)
+        history = DebateHistory.from_records(read_collection(args.snapshot, "debates"))
+    else:
+        from initialize_firestore import connect
+        db = connect(args.emulator)
+        settings = load_elo_settings(db)
+        history = DebateHistory.from_firestore(db, args.page_size)
+    print(f"    ✓ Loaded {len(history):,} completed debates between {len(history.user_ids):,} users")
+
+    if args.k:
+        for row in evaluate_k_factors(history, settings, args.k):
+            print(f"    • K={row['k_factor']:g}: log loss {row['log_loss']:.4f}, Brier {row['brier']:.4f}")
+        return
+
+    result = replay(history, settings)
+    drifted = sum(1 for _ in drifted_rating_changes(history, result))
+    print(f"    ✓ Replayed with K={settings['k_factor']}: {drifted:,} debates have drifted ratingChanges")
+    if args.apply and db is not None:
+        written = apply_replay(db, history, result, settings, args.page_size)
+        print(f"    ✓ Repaired {written['users']:,} users and {written['debates']:,} debates")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"\n❌ ELO replay failed: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Firestore index definitions for Debattle.
+Generates a deployable firestore.indexes.json and checks the app's query shapes against it.
+"""
+
+import argparse
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+CONTAINS = "CONTAINS"
+
+EQUALITY_OPS = {"==", "in"}
+ARRAY_OPS = {"array-contains", "array-contains-any"}
+RANGE_OPS = {"<", "<=", ">", ">=", "!=", "not-in"}
+
+INDEXES_FILE = "firestore.indexes.json"
+
+
+@dataclass(frozen=True)
+class IndexField:
+    field_path: str
+    order: str = ASCENDING  # ASCENDING, DESCENDING or CONTAINS
+
+    def to_json(self) -> Dict[str, str]:
+        if self.order == CONTAINS:
+            return {"fieldPath": self.field_path, "arrayConfig": CONTAINS}
+        return {"fieldPath": self.field_path, "order": self.order}
+
+
+@dataclass(frozen=True)
+class CompositeIndex:
+    collection: str
+    fields: Tuple[IndexField, ...]
+    purpose: str = ""
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "collectionGroup": self.collection,
+            "queryScope": "COLLECTION",
+            "fields": [f.to_json() for f in self.fields]
+        }
+
+    def describe(self) -> str:
+        fields = ", ".join(f"{f.field_path}" + ("" if f.order == ASCENDING else f" ({f.order.lower()})")
+                           for f in self.fields)
+        return f"{self.collection}: {fields} - {self.purpose}"
+
+
+@dataclass(frozen=True)
+class FieldOverride:
+    """Single-field index settings; no orders means the field is exempt from indexing"""
+    collection: str
+    field_path: str
+    orders: Tuple[str, ...] = ()
+    purpose: str = ""
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "collectionGroup": self.collection,
+            "fieldPath": self.field_path,
+            "indexes": [IndexField(self.field_path, order).to_json() | {"queryScope": "COLLECTION"}
+                        for order in self.orders]
+        }
+
+    def describe(self) -> str:
+        if not self.orders:
+            return f"{self.collection}.{self.field_path}: exempt from indexing - {self.purpose}"
+        return f"{self.collection}.{self.field_path}: {', '.join(o.lower() for o in self.orders)} only - {self.purpose}"
+
+
+def _index(collection: str, purpose: str, *fields: Tuple[str, str]) -> CompositeIndex:
+    return CompositeIndex(collection, tuple(IndexField(path, order) for path, order in fields), purpose)
+
+
+COMPOSITE_INDEXES = [
+    _index("debates", "for debate queries", ("status", ASCENDING), ("created_at", DESCENDING)),
+    _index("debates", "for a user's recent debates", ("participants", CONTAINS), ("createdAt", DESCENDING)),
+    _index("topics", "for topic filtering", ("category", ASCENDING), ("difficulty", ASCENDING)),
+    _index("topics", "for popular topics by category", ("category", ASCENDING), ("usageCount", DESCENDING)),
+    _index("topics", "for popular topics by difficulty", ("difficulty", ASCENDING), ("usageCount", DESCENDING)),
+    _index("topics", "for trending topics", ("trending", ASCENDING), ("usageCount", DESCENDING)),
+    _index("achievements", "for achievement filtering", ("category", ASCENDING), ("difficulty", ASCENDING)),
+    _index("user_achievements", "for a user's achievements", ("userId", ASCENDING), ("unlockedAt", DESCENDING)),
+    _index("notifications", "for a user's notifications", ("userId", ASCENDING), ("createdAt", DESCENDING)),
+    _index("notifications", "for a user's notification feed", ("userId", ASCENDING), ("timestamp", DESCENDING)),
+    _index("challenges", "for expiring pending challenges", ("status", ASCENDING), ("expiresAt", ASCENDING)),
+    _index("matchmakingQueue", "for rating-window matchmaking",
+           ("topicId", ASCENDING), ("matchFound", ASCENDING), ("userId", ASCENDING), ("rating", ASCENDING)),
+    _index("queue", "for difficulty-window opponent search",
+           ("userId", ASCENDING), ("preferences.difficulty", ASCENDING)),
+]
+
+# Large maps and arrays that are never filtered on; exempting them cuts index writes per document
+FIELD_OVERRIDES = [
+    FieldOverride("debates", "arguments", purpose="argument text is never queried"),
+    FieldOverride("debates", "judgment", purpose="judgment details are never queried"),
+    FieldOverride("users", "bio", purpose="free text is never queried"),
+    FieldOverride("users", "preferences", purpose="preferences are read per user only"),
+    FieldOverride("ratingHistory", "ratings", purpose="packed rating series is read whole by user id"),
+    FieldOverride("ratingHistory", "times", purpose="packed game times are read whole by user id"),
+    FieldOverride("ratingHistory", "results", purpose="result string is read whole by user id"),
+    FieldOverride("headToHead", "results", purpose="result string is read whole by pair id"),
+]
+
+# Single-field indexes Firestore maintains automatically; listed for documentation
+SINGLE_FIELD_NOTES = [
+    "users: rating (descending) - for leaderboards",
+    "users: last_active (descending) - for active users",
+    "debates: participants (array) - for user debate history",
+    "topics: usageCount (descending) - for popular topics",
+    "leaderboard: rating (descending) - for global rankings",
+]
+
+
+@dataclass
+class QueryShape:
+    """A query the app runs: filters are (field, op, example value), orders are (field, direction)"""
+    collection: str
+    filters: List[Tuple[str, str, Any]] = field(default_factory=list)
+    orders: List[Tuple[str, str]] = field(default_factory=list)
+    source: str = ""
+
+
+APP_QUERIES = [
+    QueryShape("users", orders=[("rating", DESCENDING)], source="src/stores/leaderboardStore.ts"),
+    QueryShape("topics", filters=[("title", ">=", "Is"), ("title", "<=", "Is")], source="src/stores/debateStore.ts"),
+    QueryShape("topics", orders=[("createdAt", DESCENDING)], source="src/stores/topicsStore.ts"),
+    QueryShape("topics", filters=[("category", "==", "technology")], orders=[("usageCount", DESCENDING)],
+               source="src/stores/topicsStore.ts"),
+    QueryShape("topics", filters=[("difficulty", "==", 5)], orders=[("usageCount", DESCENDING)],
+               source="src/stores/topicsStore.ts"),
+    QueryShape("topics", filters=[("trending", "==", True)], orders=[("usageCount", DESCENDING)],
+               source="src/stores/topicsStore.ts"),
+    QueryShape("topics", orders=[("usageCount", DESCENDING)], source="src/pages/FindDebatePage.tsx"),
+    QueryShape("debates", orders=[("createdAt", DESCENDING)], source="src/pages/ProfilePage.tsx"),
+    QueryShape("debates", filters=[("status", "==", "active")], source="src/pages/LandingPage.tsx"),
+    QueryShape("debates", filters=[("participants", "array-contains", "user1")], source="src/lib/firestoreService.ts"),
+    QueryShape("debates", filters=[("participants", "array-contains", {"userId": "user1"})],
+               orders=[("createdAt", DESCENDING)], source="src/pages/DashboardPage.tsx"),
+    QueryShape("debates", filters=[("status", "==", "completed")], orders=[("created_at", DESCENDING)],
+               source="initialize_firestore.py create_indexes"),
+    QueryShape("user_achievements", filters=[("userId", "==", "user1")], orders=[("unlockedAt", DESCENDING)],
+               source="src/lib/api.ts"),
+    QueryShape("notifications", filters=[("userId", "==", "user1")], orders=[("createdAt", DESCENDING)],
+               source="src/stores/notificationStore.ts"),
+    QueryShape("notifications", filters=[("userId", "==", "user1")], orders=[("timestamp", DESCENDING)],
+               source="src/lib/firestoreService.ts"),
+    QueryShape("challenges", filters=[("status", "==", "pending"), ("expiresAt", "<=", 0)],
+               source="src/services/challenge/ChallengeService.ts"),
+    QueryShape("matchmakingQueue", filters=[("userId", "!=", "user1"), ("topicId", "==", "topic1"),
+                                            ("rating", ">=", 1100), ("rating", "<=", 1300),
+                                            ("matchFound", "==", False)],
+               source="src/services/debate/matchmaking.ts"),
+    QueryShape("matchmakingQueue", filters=[("userId", "==", "user1"), ("matchFound", "==", False)],
+               source="src/services/debate/matchmaking.ts"),
+    QueryShape("queue", filters=[("userId", "!=", "user1"), ("preferences.difficulty", ">=", 4),
+                                 ("preferences.difficulty", "<=", 6)],
+               source="src/stores/debateStore.ts"),
+]
+
+
+def required_index(shape: QueryShape) -> Optional[Tuple[frozenset, Tuple[IndexField, ...]]]:
+    """
+    The composite index a query needs, or None when single-field indexes suffice.
+
+    Returned as (equality/array prefix as a set, ordered suffix): equality fields
+    may appear in any order at the front of an index, range and order-by fields
+    must follow in query order.
+    """
+    equality = {f for f, op, _ in shape.filters if op in EQUALITY_OPS}
+    contains = {f for f, op, _ in shape.filters if op in ARRAY_OPS}
+    suffix: List[IndexField] = []
+    for f, direction in shape.orders:
+        if f not in {s.field_path for s in suffix}:
+            suffix.append(IndexField(f, direction))
+    # Range fields without an explicit order-by are implicitly ordered ascending
+    for f, op, _ in shape.filters:
+        if op in RANGE_OPS and f not in {s.field_path for s in suffix}:
+            suffix.append(IndexField(f, ASCENDING))
+
+    fields = equality | contains | {s.field_path for s in suffix}
+    if len(fields) <= 1:
+        return None
+    if not suffix:
+        # Equality and array-contains filters alone are served by merging single-field indexes
+        return None
+    prefix = frozenset(IndexField(f) for f in equality) | frozenset(IndexField(f, CONTAINS) for f in contains)
+    return prefix, tuple(suffix)
+
+
+def satisfies(index: CompositeIndex, shape: QueryShape) -> bool:
+    need = required_index(shape)
+    if need is None:
+        return True
+    prefix, suffix = need
+    if index.collection != shape.collection or len(index.fields) != len(prefix) + len(suffix):
+        return False
+    head, tail = index.fields[:len(prefix)], index.fields[len(prefix):]
+    return frozenset(head) == prefix and tuple(tail) == suffix
+
+
+def missing_indexes(queries: List[QueryShape] = APP_QUERIES,
+                    indexes: List[CompositeIndex] = COMPOSITE_INDEXES) -> List[Tuple[QueryShape, CompositeIndex]]:
+    """Queries no defined index can serve, with the index they would need"""
+    missing = []
+    for shape in queries:
+        need = required_index(shape)
+        if need is None or any(satisfies(index, shape) for index in indexes):
+            continue
+        prefix, suffix = need
+        fields = tuple(sorted(prefix, key=lambda f: (f.order == CONTAINS, f.field_path))) + suffix
+        missing.append((shape, CompositeIndex(shape.collection, fields, f"needed by {shape.source}")))
+    return missing
+
+
+def indexes_json() -> Dict[str, Any]:
+    return {
+        "indexes": [index.to_json() for index in COMPOSITE_INDEXES],
+        "fieldOverrides": [override.to_json() for override in FIELD_OVERRIDES]
+    }
+
+
+def write_indexes_file(path: str = INDEXES_FILE):
+    with open(path, "w") as f:
+        json.dump(indexes_json(), f, indent=2)
+        f.write("\n")
+
+
+def build_query(db, shape: QueryShape):
+    query = db.collection(shape.collection)
+    for f, op, value in shape.filters:
+        query = query.where(f, op, value)
+    for f, direction in shape.orders:
+        query = query.order_by(f, direction=direction)
+    return query.limit(1)
+
+
+def execute_queries(db, queries: List[QueryShape] = APP_QUERIES) -> List[Tuple[QueryShape, str]]:
+    """
+    Run every query shape once; a live project rejects queries whose index is missing.
+
+    The emulator never enforces composite indexes, so there this only shows that
+    the queries are well formed.
+    """
+    failures = []
+    for shape in queries:
+        try:
+            list(build_query(db, shape).stream())
+        except Exception as e:
+            failures.append((shape, str(e)))
+    return failures
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Generate and check Debattle Firestore indexes")
+    parser.add_argument("command", choices=["write", "check"])
+    parser.add_argument("--out", default=INDEXES_FILE)
+    parser.add_argument("--execute", action="store_true",
+                        help="also run every query shape against the live project (the emulator "
+                             "does not enforce composite indexes)")
+    parser.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    args = parser.parse_args(argv)
+
+    if args.command == "write":
+        write_indexes_file(args.out)
+        print(f"✓ Wrote {len(COMPOSITE_INDEXES)} composite indexes and {len(FIELD_OVERRIDES)} field overrides to {args.out}")
+        return
+
+    print(f"🔍 Checking {len(APP_QUERIES)} query shapes...")
+    problems = 0
+    for shape, index in missing_indexes():
+        problems += 1
+        print(f"    ❌ missing index {index.describe()}")
+    if args.execute:
+        if args.emulator:
+            print("    ℹ️  The emulator does not enforce composite indexes; --execute only checks the queries run")
+        from initialize_firestore import connect
+        for shape, error in execute_queries(connect(args.emulator)):
+            problems += 1
+            print(f"    ❌ {shape.collection} query from {shape.source} failed: {error}")
+    if problems:
+        sys.exit(1)
+    print("    ✓ Every query shape is served by an index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Shared Firestore I/O helpers for the Debattle data scripts.
+Batched, parallel writes with retries so bulk loads are not bound by one round trip per document.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    from google.cloud.firestore import ArrayUnion, Increment
+except ImportError:
+    # Without the client library only the in-memory backend can run; it accepts its own transforms
+    from memory_firestore import ArrayUnion, Increment
+
+# Firestore rejects write batches with more than 500 operations
+MAX_BATCH_OPS = 500
+
+DEFAULT_PAGE_SIZE = 1000
+
+# Document references per get_all call
+GET_ALL_CHUNK = 300
+
+# (kind, collection, document id, data, merge)
+WriteOp = Tuple[str, str, str, Optional[Dict[str, Any]], bool]
+
+
+class BatchWriteError(Exception):
+    """Raised when a batch still fails after all retries"""
+
+
+class Throughput:
+    """Tracks a running document count and reports docs/sec"""
+
+    def __init__(self, label: str = "", report_every: float = 0.0):
+        self.label = label
+        self.report_every = report_every
+        self.count = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+        self._lock = threading.Lock()
+
+    def add(self, n: int = 1):
+        with self._lock:
+            self.count += n
+            now = time.perf_counter()
+            if self.report_every and now - self._last_report >= self.report_every:
+                self._last_report = now
+                print(f"    … {self.label}: {self.count:,} docs ({self.rate:,.0f} docs/sec)")
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self) -> float:
+        elapsed = self.elapsed
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+
+def format_eta(remaining: int, rate: float) -> str:
+    """Time left at the current rate, e.g. 4m05s or 2h13m"""
+    if rate <= 0:
+        return "?"
+    seconds = int(remaining / rate)
+    return f"{seconds // 3600}h{seconds // 60 % 60:02d}m" if seconds >= 3600 else f"{seconds // 60}m{seconds % 60:02d}s"
+
+
+class RateLimiter:
+    """Token bucket that blocks callers so operations average at most `rate` per second"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._last = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: float = 1):
+        if not self.rate or self.rate <= 0:
+            return
+        with self._lock:
+            now = time.perf_counter()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= n
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+class BatchWriter:
+    """
+    Buffers set/update/delete operations into Firestore write batches.
+
+    Full batches are committed on a thread pool so that up to `max_in_flight`
+    commits run at once. A failed batch is retried with exponential backoff and
+    jitter; set and delete operations are idempotent so replaying a batch is safe.
+    Updates carrying Increment transforms are not: a commit that failed after
+    reaching the server may be applied twice.
+    """
+
+    def __init__(self, db, batch_size: int = MAX_BATCH_OPS, max_in_flight: int = 8,
+                 max_retries: int = 5, base_delay: float = 0.5, label: str = "writes",
+                 report_every: float = 5.0):
+        if not 0 < batch_size <= MAX_BATCH_OPS:
+            raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_OPS}")
+        self.db = db
+        self.batch_size = batch_size
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.progress = Throughput(label, report_every)
+        self.batches = 0
+        self.retries = 0
+        self._pending: List[WriteOp] = []
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def set(self, collection: str, doc_id: str, data: Dict[str, Any], merge: bool = False):
+        self._add(("set", collection, doc_id, data, merge))
+
+    def update(self, collection: str, doc_id: str, data: Dict[str, Any]):
+        self._add(("update", collection, doc_id, data, False))
+
+    def delete(self, collection: str, doc_id: str):
+        self._add(("delete", collection, doc_id, None, False))
+
+    def _add(self, op: WriteOp):
+        self._pending.append(op)
+        if len(self._pending) >= self.batch_size:
+            self._submit()
+
+    def _submit(self):
+        if not self._pending:
+            return
+        ops, self._pending = self._pending, []
+        # Blocks once max_in_flight batches are outstanding so memory stays bounded
+        self._slots.acquire()
+        future = self._executor.submit(self._commit_with_retry, ops)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+        self._reap()
+
+    def _reap(self):
+        done = [f for f in self._futures if f.done()]
+        self._futures = [f for f in self._futures if not f.done()]
+        for future in done:
+            future.result()
+
+    def _commit_with_retry(self, ops: List[WriteOp]):
+        attempt = 0
+        while True:
+            try:
+                self._commit(ops)
+                break
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise BatchWriteError(f"batch of {len(ops)} ops failed after {self.max_retries} retries: {e}") from e
+                with self._lock:
+                    self.retries += 1
+                delay = self.base_delay * (2 ** (attempt - 1))
+                time.sleep(delay + random.uniform(0, delay))
+        with self._lock:
+            self.batches += 1
+        self.progress.add(len(ops))
+
+    def _commit(self, ops: List[WriteOp]):
+        batch = self.db.batch()
+        for kind, collection, doc_id, data, merge in ops:
+            ref = self.db.collection(collection).document(doc_id)
+            if kind == "set":
+                batch.set(ref, data, merge=merge)
+            elif kind == "update":
+                batch.update(ref, data)
+            else:
+                batch.delete(ref)
+        batch.commit()
+
+    def flush(self):
+        """Commit everything buffered so far and wait for all in-flight batches"""
+        self._submit()
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "docs": self.progress.count,
+            "batches": self.batches,
+            "retries": self.retries,
+            "seconds": round(self.progress.elapsed, 3),
+            "docs_per_sec": round(self.progress.rate, 1),
+        }
+
+
+def keyed_records(docs: Iterable[Dict[str, Any]], id_field: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Pair each document with the id stored in one of its fields"""
+    for doc in docs:
+        yield doc[id_field], doc
+
+
+def iter_pages(query, page_size: int = DEFAULT_PAGE_SIZE, start_after=None) -> Iterator[List[Any]]:
+    """
+    Yield a query's results one page at a time using cursors.
+
+    The query must have a total order (end with an order_by on a unique field or
+    the document id) so that start_after resumes exactly after the last page.
+    """
+    cursor = start_after
+    while True:
+        page_query = query.limit(page_size)
+        if cursor is not None:
+            page_query = page_query.start_after(cursor)
+        page = list(page_query.stream())
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        cursor = page[-1]
+
+
+def iter_documents(db, collection: str, page_size: int = DEFAULT_PAGE_SIZE,
+                   start_after=None) -> Iterator[Any]:
+    """Stream every document of a collection in document id order, one page in memory at a time"""
+    query = db.collection(collection).order_by("__name__")
+    for page in iter_pages(query, page_size, start_after):
+        yield from page
+
+
+def get_documents(db, collection: str, doc_ids: Iterable[str], field_paths: Optional[List[str]] = None,
+                  chunk_size: int = GET_ALL_CHUNK) -> Iterator[Any]:
+    """Fetch many documents by id with one batched get_all per chunk instead of one read each"""
+    ids = list(doc_ids)
+    for start in range(0, len(ids), chunk_size):
+        refs = [db.collection(collection).document(doc_id) for doc_id in ids[start:start + chunk_size]]
+        yield from db.get_all(refs, field_paths=field_paths)
+
+
+def count_documents(query) -> int:
+    """Server-side count aggregation; only the number crosses the wire"""
+    result = query.count(alias="count").get()
+    return int(result[0][0].value)
+
+
+def shard_bounds(db, collection: str, shards: int, page_size: int = DEFAULT_PAGE_SIZE) -> List[Optional[str]]:
+    """
+    Document ids that split a collection into `shards` key ranges of about equal size.
+
+    Returns shards + 1 bounds with None for the open ends. Finding them costs one
+    keys-only pass over the ids, much less than reading the documents themselves.
+    """
+    query = db.collection(collection).select([]).order_by("__name__")
+    total = count_documents(query)
+    step = max(1, -(-total // max(1, shards)))
+    bounds: List[Optional[str]] = [None]
+    seen = 0
+    for page in iter_pages(query, page_size):
+        for snap in page:
+            if seen and seen % step == 0 and len(bounds) < shards:
+                bounds.append(snap.id)
+            seen += 1
+    return bounds + [None]
+
+
+def shard_query(db, collection: str, low: Optional[str], high: Optional[str], query=None):
+    """Documents with low <= id < high, ordered by id; query narrows the collection (select, where)"""
+    query = (query if query is not None else db.collection(collection)).order_by("__name__")
+    if low is not None:
+        query = query.start_at({"__name__": db.collection(collection).document(low)})
+    if high is not None:
+        query = query.end_before({"__name__": db.collection(collection).document(high)})
+    return query
+
+
+class Through(NamedTuple):
+    """
+    How far an incremental job has folded debates into one document: the newest
+    ended_at folded and the ids of every debate folded at exactly that time.
+
+    Ordering on (ended_at, id) would skip a debate written later with the same
+    ended_at and a smaller id; checking membership in `ids` does not.
+    """
+    ended_at: datetime
+    ids: FrozenSet[str]
+    # Markers stored as a single {endedAt, debateId} cover every id up to that one
+    upto: Optional[str] = None
+
+    @classmethod
+    def from_stored(cls, stored: Any) -> Optional["Through"]:
+        """Parse a stored {endedAt, debateIds} map (or an older {endedAt, debateId} map or bare timestamp)"""
+        if isinstance(stored, datetime):
+            return cls(_utc(stored), frozenset(), "\uffff")
+        stored = stored or {}
+        if not stored.get("endedAt"):
+            return None
+        return cls(_utc(stored["endedAt"]), frozenset(stored.get("debateIds") or ()), stored.get("debateId"))
+
+    def covers(self, ended_at: datetime, debate_id: str) -> bool:
+        """Whether the debate was folded already"""
+        if ended_at != self.ended_at:
+            return ended_at < self.ended_at
+        return debate_id in self.ids or (self.upto is not None and debate_id <= self.upto)
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def is_new(key: Tuple[datetime, str], *markers: Optional[Through]) -> bool:
+    """Whether an (ended_at, debate id) is covered by none of the markers"""
+    return not any(m is not None and m.covers(*key) for m in markers)
+
+
+def advance_through(through: Optional[Through], keys: Iterable[Tuple[datetime, str]]) -> Dict[str, Any]:
+    """The stored marker after also folding these (ended_at, debate id) keys"""
+    ended_at = through.ended_at if through else None
+    ids = set(through.ids) if through else set()
+    upto = through.upto if through else None
+    for key_ended, debate_id in keys:
+        if ended_at is None or key_ended > ended_at:
+            ended_at, ids, upto = key_ended, set(), None
+        if key_ended == ended_at:
+            ids.add(debate_id)
+    stored = {"endedAt": ended_at, "debateIds": sorted(ids)}
+    if upto is not None:
+        stored["debateId"] = upto
+    return stored
@@ -6,15 +6,41 @@ This script sets up the complete database structure with collections and sample
 
 import os
 import sys
-import firebase_admin
-from firebase_admin import credentials, firestore
+import argparse
+import asyncio
 from datetime import datetime, timedelta
 import uuid
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any, Optional, Tuple
 import json
 
+from async_seed import async_setup_collections, connect_async
+from deep_verify import deep_verify
+from firestore_indexes import COMPOSITE_INDEXES, FIELD_OVERRIDES, SINGLE_FIELD_NOTES, missing_indexes
+from firestore_io import BatchWriter, DEFAULT_PAGE_SIZE, MAX_BATCH_OPS, count_documents
+from instrumentation import DEFAULT_SAMPLE_INTERVAL, instrument, print_summary, stage
+from migrations import run_pending
+from seed_manifest import SeedManifest
+from synthetic_data import SCALES, generate_dataset
+
+DEFAULT_PROJECT_ID = "sid-debattle"
+
+# Where the scripts read and write: the live project, a local emulator, or an in-process store
+BACKENDS = ["firestore", "emulator", "memory"]
+
+# Seeded collections and the field that holds each document id
+SEED_COLLECTIONS = [
+    ('users', 'uid'),
+    ('topics', 'id'),
+    ('achievements', 'id'),
+    ('debates', 'id'),
+    ('leaderboard', 'userId')
+]
+
 def initialize_firebase():
     """Initialize Firebase Admin SDK"""
+    # Imported here so the emulator and in-memory backends need neither firebase_admin nor credentials
+    import firebase_admin
+    from firebase_admin import credentials
     try:
         # Check if Firebase is already initialized
         firebase_admin.get_app()
@@ -31,8 +57,43 @@ def initialize_firebase():
         firebase_admin.initialize_app(cred)
         print("✓ Firebase initialized successfully")
 
-def create_sample_users() -> List[Dict[str, Any]]:
+def connect_emulator(host: str, project_id: str = DEFAULT_PROJECT_ID):
+    """Connect to a local Firestore emulator without credentials"""
+    # The Firestore client switches to an insecure channel and anonymous
+    # credentials whenever FIRESTORE_EMULATOR_HOST is set
+    from google.cloud import firestore
+    os.environ["FIRESTORE_EMULATOR_HOST"] = host
+    db = firestore.Client(project=project_id)
+    print(f"✓ Connected to Firestore emulator at {host}")
+    return db
+
+def resolve_backend(backend: Optional[str], emulator: Optional[str] = None) -> str:
+    """The emulator when a host is given and no backend was chosen, otherwise the live project"""
+    backend = backend or ("emulator" if emulator else "firestore")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    if backend == "emulator" and not emulator:
+        raise ValueError("The emulator backend needs --emulator HOST:PORT or FIRESTORE_EMULATOR_HOST")
+    return backend
+
+def connect(emulator: Optional[str] = None, project_id: str = DEFAULT_PROJECT_ID, backend: Optional[str] = None):
+    """Firestore client for the chosen backend"""
+    backend = resolve_backend(backend, emulator)
+    if backend == "memory":
+        from memory_firestore import MemoryFirestore
+        print("✓ Using the in-memory Firestore stand-in")
+        return MemoryFirestore(project_id)
+    if backend == "emulator":
+        return connect_emulator(emulator, project_id)
+    initialize_firebase()
+    from firebase_admin import firestore
+    db = firestore.client()
+    print("✓ Connected to Firestore")
+    return db
+
+def create_sample_users(now: Optional[datetime] = None) -> List[Dict[str, Any]]:
     """Create sample users for testing"""
+    now = now or datetime.utcnow()
     users = [
         {
             "uid": "user1",
@@ -53,8 +114,8 @@ def create_sample_users() -> List[Dict[str, Any]]:
             "xp": 1250,
             "level": 8,
             "tier": "silver",
-            "created_at": datetime.utcnow() - timedelta(days=30),
-            "last_active": datetime.utcnow() - timedelta(hours=2),
+            "created_at": now - timedelta(days=30),
+            "last_active": now - timedelta(hours=2),
             "preferred_topics": ["politics", "technology", "environment"],
             "debate_style": "analytical",
             "bio": "Passionate debater with a focus on evidence-based arguments.",
@@ -98,8 +159,8 @@ def create_sample_users() -> List[Dict[str, Any]]:
             "xp": 850,
             "level": 5,
             "tier": "bronze",
-            "created_at": datetime.utcnow() - timedelta(days=25),
-            "last_active": datetime.utcnow() - timedelta(hours=1),
+            "created_at": now - timedelta(days=25),
+            "last_active": now - timedelta(hours=1),
             "preferred_topics": ["sports", "technology", "education"],
             "debate_style": "persuasive",
             "bio": "Love a good debate and learning new perspectives.",
@@ -143,8 +204,8 @@ def create_sample_users() -> List[Dict[str, Any]]:
             "xp": 2100,
             "level": 12,
             "tier": "gold",
-            "created_at": datetime.utcnow() - timedelta(days=45),
-            "last_active": datetime.utcnow() - timedelta(minutes=30),
+            "created_at": now - timedelta(days=45),
+            "last_active": now - timedelta(minutes=30),
             "preferred_topics": ["philosophy", "science", "ethics"],
             "debate_style": "logical",
             "bio": "Philosophy student who enjoys rigorous logical discussions.",
@@ -172,8 +233,9 @@ def create_sample_users() -> List[Dict[str, Any]]:
     ]
     return users
 
-def create_sample_topics() -> List[Dict[str, Any]]:
+def create_sample_topics(now: Optional[datetime] = None) -> List[Dict[str, Any]]:
     """Create sample debate topics"""
+    now = now or datetime.utcnow()
     topics = [
         {
             "id": "topic1",
@@ -186,7 +248,7 @@ def create_sample_topics() -> List[Dict[str, Any]]:
             "usageCount": 8,
             "averageRating": 4.2,
             "isOfficial": True,
-            "created_at": datetime.utcnow() - timedelta(days=10)
+            "created_at": now - timedelta(days=10)
         },
         {
             "id": "topic2",
@@ -199,7 +261,7 @@ def create_sample_topics() -> List[Dict[str, Any]]:
             "usageCount": 12,
             "averageRating": 4.0,
             "isOfficial": True,
-            "created_at": datetime.utcnow() - timedelta(days=15)
+            "created_at": now - timedelta(days=15)
         },
         {
             "id": "topic3",
@@ -212,7 +274,7 @@ def create_sample_topics() -> List[Dict[str, Any]]:
             "usageCount": 15,
             "averageRating": 4.5,
             "isOfficial": True,
-            "created_at": datetime.utcnow() - timedelta(days=20)
+            "created_at": now - timedelta(days=20)
         },
         {
             "id": "topic4",
@@ -225,7 +287,7 @@ def create_sample_topics() -> List[Dict[str, Any]]:
             "usageCount": 20,
             "averageRating": 4.3,
             "isOfficial": True,
-            "created_at": datetime.utcnow() - timedelta(days=5)
+            "created_at": now - timedelta(days=5)
         },
         {
             "id": "topic5",
@@ -238,13 +300,14 @@ def create_sample_topics() -> List[Dict[str, Any]]:
             "usageCount": 6,
             "averageRating": 4.7,
             "isOfficial": True,
-            "created_at": datetime.utcnow() - timedelta(days=12)
+            "created_at": now - timedelta(days=12)
         }
     ]
     return topics
 
-def create_sample_achievements() -> List[Dict[str, Any]]:
+def create_sample_achievements(now: Optional[datetime] = None) -> List[Dict[str, Any]]:
     """Create sample achievements"""
+    now = now or datetime.utcnow()
     achievements = [
         {
             "id": "first_win",
@@ -256,7 +319,7 @@ def create_sample_achievements() -> List[Dict[str, Any]]:
             "xpReward": 50,
             "condition": {"type": "wins", "value": 1},
             "isActive": True,
-            "created_at": datetime.utcnow()
+            "created_at": now
         },
         {
             "id": "debate_veteran",
@@ -268,7 +331,7 @@ def create_sample_achievements() -> List[Dict[str, Any]]:
             "xpReward": 100,
             "condition": {"type": "debates", "value": 10},
             "isActive": True,
-            "created_at": datetime.utcnow()
+            "created_at": now
         },
         {
             "id": "logic_master",
@@ -280,7 +343,7 @@ def create_sample_achievements() -> List[Dict[str, Any]]:
             "xpReward": 200,
             "condition": {"type": "win_rate", "value": 70, "min_debates": 15},
             "isActive": True,
-            "created_at": datetime.utcnow()
+            "created_at": now
         },
         {
             "id": "persuasion_expert",
@@ -292,7 +355,7 @@ def create_sample_achievements() -> List[Dict[str, Any]]:
             "xpReward": 150,
             "condition": {"type": "streak", "value": 5},
             "isActive": True,
-            "created_at": datetime.utcnow()
+            "created_at": now
         },
         {
             "id": "topic_specialist",
@@ -304,13 +367,14 @@ def create_sample_achievements() -> List[Dict[str, Any]]:
             "xpReward": 120,
             "condition": {"type": "category_wins", "value": 10},
             "isActive": True,
-            "created_at": datetime.utcnow()
+            "created_at": now
         }
     ]
     return achievements
 
-def create_sample_debates() -> List[Dict[str, Any]]:
+def create_sample_debates(now: Optional[datetime] = None) -> List[Dict[str, Any]]:
     """Create sample debates"""
+    now = now or datetime.utcnow()
     debates = [
         {
             "id": "debate1",
@@ -332,9 +396,9 @@ def create_sample_debates() -> List[Dict[str, Any]]:
                 }
             ],
             "status": "completed",
-            "created_at": datetime.utcnow() - timedelta(days=3),
-            "started_at": datetime.utcnow() - timedelta(days=3),
-            "ended_at": datetime.utcnow() - timedelta(days=3, hours=1),
+            "created_at": now - timedelta(days=3),
+            "started_at": now - timedelta(days=3),
+            "ended_at": now - timedelta(days=3, hours=1),
             "winner": "user1",
             "arguments": [
                 {
@@ -343,7 +407,7 @@ def create_sample_debates() -> List[Dict[str, Any]]:
                     "type": "opening",
                     "side": "pro",
                     "content": "AI judges would eliminate human bias and provide consistent, data-driven decisions based purely on legal precedent and evidence.",
-                    "timestamp": datetime.utcnow() - timedelta(days=3, minutes=5),
+                    "timestamp": now - timedelta(days=3, minutes=5),
                     "round": 1,
                     "wordCount": 25,
                     "ai_feedback": {
@@ -359,7 +423,7 @@ def create_sample_debates() -> List[Dict[str, Any]]:
                     "type": "opening",
                     "side": "con",
                     "content": "Human judgment involves empathy, context understanding, and moral reasoning that AI cannot replicate, making it unsuitable for complex legal decisions.",
-                    "timestamp": datetime.utcnow() - timedelta(days=3, minutes=10),
+                    "timestamp": now - timedelta(days=3, minutes=10),
                     "round": 1,
                     "wordCount": 28,
                     "ai_feedback": {
@@ -471,49 +535,23 @@ def create_sample_leaderboard() -> List[Dict[str, Any]]:
     ]
     return leaderboard
 
-def setup_collections(db):
-    """Set up all collections with sample data"""
-    
-    print("🔧 Setting up collections...")
-    
-    # 1. Users Collection
-    print("  📝 Creating users collection...")
-    users = create_sample_users()
-    for user in users:
-        db.collection('users').document(user['uid']).set(user)
-    print(f"    ✓ Added {len(users)} sample users")
-    
-    # 2. Topics Collection
-    print("  📝 Creating topics collection...")
-    topics = create_sample_topics()
-    for topic in topics:
-        db.collection('topics').document(topic['id']).set(topic)
-    print(f"    ✓ Added {len(topics)} sample topics")
-    
-    # 3. Achievements Collection
-    print("  📝 Creating achievements collection...")
-    achievements = create_sample_achievements()
-    for achievement in achievements:
-        db.collection('achievements').document(achievement['id']).set(achievement)
-    print(f"    ✓ Added {len(achievements)} sample achievements")
-    
-    # 4. Debates Collection
-    print("  📝 Creating debates collection...")
-    debates = create_sample_debates()
-    for debate in debates:
-        db.collection('debates').document(debate['id']).set(debate)
-    print(f"    ✓ Added {len(debates)} sample debates")
-    
-    # 5. Leaderboard Collection
-    print("  📝 Creating leaderboard collection...")
-    leaderboard = create_sample_leaderboard()
-    for entry in leaderboard:
-        db.collection('leaderboard').document(entry['userId']).set(entry)
-    print(f"    ✓ Added {len(leaderboard)} leaderboard entries")
-    
-    # 6. System Settings Collection
-    print("  📝 Creating system settings...")
-    settings = {
+def seed_collection(writer: BatchWriter, collection: str, docs: Iterable[Dict[str, Any]], id_field: str,
+                    manifest: Optional[SeedManifest] = None) -> Tuple[int, int]:
+    """Queue the documents of a collection on the batch writer; returns (documents, writes)"""
+    count = written = 0
+    for doc in docs:
+        count += 1
+        if manifest is None or manifest.needs_write(collection, doc[id_field], doc):
+            writer.set(collection, doc[id_field], doc)
+            written += 1
+    return count, written
+
+def create_system_settings(total_users: int, total_topics: int, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Create the system/settings document"""
+    now = now or datetime.utcnow()
+    return {
+        # Bump whenever the settings below change so cached readers (settings.py) reload them
+        "settings_version": 1,
         "elo_settings": {
             "starting_rating": 1200,
             "k_factor": 32,
@@ -537,81 +575,221 @@ def setup_collections(db):
         },
         "app_info": {
             "version": "1.0.0",
-            "initialized_at": datetime.utcnow(),
-            "total_users": len(users),
-            "total_topics": len(topics)
+            "initialized_at": now,
+            "total_users": total_users,
+            "total_topics": total_topics
         }
     }
-    db.collection('system').document('settings').set(settings)
-    print("    ✓ Added system settings")
+
+def create_sample_dataset(now: Optional[datetime] = None) -> Dict[str, Iterable[Dict[str, Any]]]:
+    """Hand-written sample documents keyed by collection name"""
+    return {
+        'users': create_sample_users(now),
+        'topics': create_sample_topics(now),
+        'achievements': create_sample_achievements(now),
+        'debates': create_sample_debates(now),
+        'leaderboard': create_sample_leaderboard()
+    }
+
+def create_synthetic_dataset(num_users: int, num_topics: int, num_debates: int,
+                             seed: int = 0, now: Optional[datetime] = None) -> Dict[str, Iterable[Dict[str, Any]]]:
+    """Generated documents at load-test scale, streamed lazily"""
+    dataset = generate_dataset(num_users, num_topics, num_debates, seed, now)
+    dataset['achievements'] = create_sample_achievements(now)
+    return dataset
+
+def setup_collections(db, dataset: Optional[Dict[str, Iterable[Dict[str, Any]]]] = None,
+                      batch_size: int = MAX_BATCH_OPS, max_in_flight: int = 8,
+                      manifest: Optional[SeedManifest] = None, prune: bool = False):
+    """Set up all collections with sample data"""
+    
+    print("🔧 Setting up collections...")
+    now = manifest.anchor if manifest else None
+    dataset = dataset or create_sample_dataset(now)
+    writer = BatchWriter(db, batch_size=batch_size, max_in_flight=max_in_flight, label="seed")
+    
+    # 1-5. Users, Topics, Achievements, Debates and Leaderboard Collections
+    counts = {}
+    for collection, id_field in SEED_COLLECTIONS:
+        print(f"  📝 Creating {collection} collection...")
+        counts[collection], written = seed_collection(writer, collection, dataset[collection], id_field, manifest)
+        if manifest:
+            print(f"    ✓ {counts[collection]:,} documents, {written:,} new or changed")
+        else:
+            print(f"    ✓ Queued {counts[collection]:,} documents")
+    
+    # 6. System Settings Collection
+    print("  📝 Creating system settings...")
+    settings = create_system_settings(counts['users'], counts['topics'], now)
+    if manifest is None or manifest.needs_write('system', 'settings', settings):
+        writer.set('system', 'settings', settings)
+        print("    ✓ Queued system settings")
+    else:
+        print("    ✓ System settings unchanged")
+    
+    if manifest:
+        # Documents that left the desired state are deleted only on request
+        for collection, _ in SEED_COLLECTIONS + [('system', None)]:
+            removed = manifest.removed(collection)
+            if not removed:
+                continue
+            if prune:
+                for doc_id in removed:
+                    writer.delete(collection, doc_id)
+                manifest.forget(collection, removed)
+                print(f"    🗑️  Deleting {len(removed):,} stale {collection} documents")
+            else:
+                manifest.keep_removed(collection, removed)
+                print(f"    ℹ️  {len(removed):,} stale {collection} documents kept (use --prune to delete)")
+        # Record hashes only once the data they describe is committed
+        writer.flush()
+        manifest.save(writer)
+    
+    writer.close()
+    stats = writer.summary()
+    print(f"    ✓ Wrote {stats['docs']} documents in {stats['batches']} batches "
+          f"({stats['docs_per_sec']:,.0f} docs/sec, {stats['retries']} retries)")
 
 def create_indexes(db):
     """Create necessary indexes for efficient queries"""
     print("🔍 Setting up database indexes...")
     
-    # Note: Firestore indexes are typically created automatically or through the console
-    # But we can document the needed indexes here
-    
-    indexes_needed = [
-        "users: rating (descending) - for leaderboards",
-        "users: last_active (descending) - for active users",
-        "debates: status, created_at (descending) - for debate queries",
-        "debates: participants (array) - for user debate history",
-        "topics: category, difficulty - for topic filtering",
-        "topics: usageCount (descending) - for popular topics",
-        "leaderboard: rating (descending) - for global rankings",
-        "achievements: category, difficulty - for achievement filtering"
-    ]
+    # Firestore indexes are deployed from firestore.indexes.json (see firestore_indexes.py),
+    # single-field indexes are maintained automatically
+    print("  📋 Composite indexes in firestore.indexes.json:")
+    for index in COMPOSITE_INDEXES:
+        print(f"    • {index.describe()}")
+    for override in FIELD_OVERRIDES:
+        print(f"    • {override.describe()}")
+    print("  📋 Automatic single-field indexes:")
+    for note in SINGLE_FIELD_NOTES:
+        print(f"    • {note}")
     
-    print("  📋 Indexes that should be created in Firestore console:")
-    for index in indexes_needed:
-        print(f"    • {index}")
+    for shape, index in missing_indexes():
+        print(f"  ⚠️  Query in {shape.source} needs an undefined index: {index.describe()}")
     
-    print("  ℹ️  These will be created automatically as you use the app")
+    print("  ℹ️  Deploy them with: firebase deploy --only firestore:indexes")
 
-def verify_setup(db):
+def verify_setup(db, deep: bool = False, page_size: int = DEFAULT_PAGE_SIZE) -> bool:
     """Verify the database setup"""
     print("✅ Verifying database setup...")
     
-    # Check collections
+    # Check collections with server-side count aggregations instead of downloading documents
     collections = ['users', 'topics', 'achievements', 'debates', 'leaderboard', 'system']
+    ok = True
     for collection_name in collections:
-        docs = list(db.collection(collection_name).limit(1).stream())
-        if docs:
-            print(f"    ✓ {collection_name} collection created")
+        count = count_documents(db.collection(collection_name))
+        if count:
+            print(f"    ✓ {collection_name} collection created ({count:,} documents)")
         else:
             print(f"    ❌ {collection_name} collection not found")
+            ok = False
     
-    # Check sample data
-    user_count = len(list(db.collection('users').stream()))
-    topic_count = len(list(db.collection('topics').stream()))
-    debate_count = len(list(db.collection('debates').stream()))
-    
-    print(f"    ✓ {user_count} users created")
-    print(f"    ✓ {topic_count} topics created")
-    print(f"    ✓ {debate_count} debates created")
+    # Page through every document and check its invariants
+    if deep:
+        ok = deep_verify(db, page_size) and ok
+    return ok
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Initialize the Debattle Firestore database")
+    parser.add_argument("--emulator", metavar="HOST:PORT",
+                        default=os.environ.get("FIRESTORE_EMULATOR_HOST"),
+                        help="seed a local Firestore emulator instead of the live project")
+    parser.add_argument("--project", default=DEFAULT_PROJECT_ID,
+                        help="project id to use with the emulator")
+    parser.add_argument("--backend", choices=BACKENDS,
+                        help="where to seed; defaults to the emulator when a host is given, otherwise the live project")
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH_OPS,
+                        help=f"operations per write batch (max {MAX_BATCH_OPS})")
+    parser.add_argument("--max-in-flight", type=int, default=8,
+                        help="number of write batches committed concurrently")
+    parser.add_argument("--scale", choices=["sample"] + list(SCALES), default="sample",
+                        help="seed the hand-written samples or a generated dataset of this size")
+    parser.add_argument("--users", type=int, help="override the number of generated users")
+    parser.add_argument("--topics", type=int, help="override the number of generated topics")
+    parser.add_argument("--debates", type=int, help="override the number of generated debates")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for generated data")
+    parser.add_argument("--async", dest="async_mode", action="store_true",
+                        help="seed all collections concurrently with the async Firestore client")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="write batches in flight in --async mode")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only write documents whose content changed since the last seed")
+    parser.add_argument("--prune", action="store_true",
+                        help="with --incremental, delete seeded documents that are no longer generated")
+    parser.add_argument("--deep-verify", action="store_true",
+                        help="page through every document and check schema invariants")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE,
+                        help="documents per page when deep-verifying")
+    parser.add_argument("--migrate", action="store_true",
+                        help="run pending data migrations (see migrations.py) after seeding")
+    parser.add_argument("--instrument", metavar="PATH",
+                        help="record reads, writes, bytes and latency per stage and collection and write them to "
+                             "PATH at exit (JSON, or Prometheus text for a .prom path); not with --async")
+    parser.add_argument("--profile", action="store_true",
+                        help="with --instrument, also sample Python stacks per stage")
+    return parser.parse_args(argv)
 
-def main():
+def dataset_from_args(args: argparse.Namespace, now: Optional[datetime] = None) -> Dict[str, Iterable[Dict[str, Any]]]:
+    """Pick the hand-written samples or a generated dataset from the CLI options"""
+    if args.scale == "sample" and not (args.users or args.topics or args.debates):
+        return create_sample_dataset(now)
+    users, topics, debates = SCALES.get(args.scale, SCALES["tiny"])
+    return create_synthetic_dataset(args.users or users, args.topics or topics,
+                                    args.debates or debates, args.seed, now)
+
+def main(argv: Optional[List[str]] = None):
     """Main initialization function"""
+    args = parse_args(argv)
     print("🚀 Initializing Firestore Database for Debattle")
     print("=" * 50)
     
     try:
-        # Initialize Firebase
-        initialize_firebase()
+        if args.async_mode and args.incremental:
+            raise ValueError("--incremental is not supported in --async mode")
+        if args.async_mode and args.instrument:
+            # The async client bypasses the instrumented wrapper, so seeding would go unrecorded
+            raise ValueError("--instrument is not supported in --async mode")
         
-        # Get Firestore client
-        db = firestore.client()
-        print("✓ Connected to Firestore")
+        # Initialize Firebase and get a Firestore client
+        db = connect(args.emulator, args.project, args.backend)
+        if args.instrument:
+            db = instrument(db, args.instrument, DEFAULT_SAMPLE_INTERVAL if args.profile else None)
         
         # Setup collections and data
-        setup_collections(db)
+        if args.async_mode:
+            if resolve_backend(args.backend, args.emulator) == "memory":
+                client = db.async_client()
+            else:
+                client = connect_async(args.emulator, args.project)
+            asyncio.run(async_setup_collections(
+                client, dataset_from_args(args), SEED_COLLECTIONS,
+                lambda counts: create_system_settings(counts['users'], counts['topics']),
+                concurrency=args.concurrency, batch_size=args.batch_size))
+        else:
+            with stage(db, "setup_collections"):
+                manifest = SeedManifest.load(db) if args.incremental else None
+                setup_collections(db, dataset_from_args(args, manifest.anchor if manifest else None),
+                                  batch_size=args.batch_size, max_in_flight=args.max_in_flight,
+                                  manifest=manifest, prune=args.prune)
+        
+        if args.migrate:
+            with stage(db, "migrations"):
+                run_pending(db)
         
         # Create indexes (documentation)
-        create_indexes(db)
+        with stage(db, "create_indexes"):
+            create_indexes(db)
         
         # Verify setup
-        verify_setup(db)
+        with stage(db, "verify_setup"):
+            verified = verify_setup(db, deep=args.deep_verify, page_size=args.page_size)
+        if args.instrument:
+            print_summary(db)
+        if not verified:
+            print("\n❌ Database verification failed; see the checks above")
+            sys.exit(1)
         
         print("\n" + "=" * 50)
         print("🎉 Database initialization completed successfully!")
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Firestore client instrumentation for the Debattle data scripts.
+Counts RPCs, documents, bytes and latency per named stage and collection, with optional stack sampling.
+"""
+
+import atexit
+import bisect
+import contextlib
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Prometheus-style latency bucket upper bounds, in seconds
+LATENCY_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# Firestore storage size rules: every document name costs 16 extra bytes, every document 32
+DOCUMENT_OVERHEAD = 32
+NUMERIC_SIZE = 8
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+# Frames kept per sampled stack, innermost last
+MAX_STACK_DEPTH = 40
+
+
+def value_size(value: Any) -> int:
+    """Approximate stored size of a field value using Firestore's size rules"""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime)):
+        return NUMERIC_SIZE
+    if isinstance(value, str):
+        return len(value.encode("utf-8")) + 1
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(k.encode("utf-8")) + 1 + value_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(value_size(v) for v in value)
+    # References, geo points and field transforms
+    return 16
+
+
+def document_size(data: Optional[Dict[str, Any]], name: str = "") -> int:
+    return DOCUMENT_OVERHEAD + len(name) + 1 + 16 + value_size(data or {})
+
+
+def collection_group(path: str) -> str:
+    """Collection path with document ids elided, e.g. debates/*/archive"""
+    segments = path.strip("/").split("/")
+    if len(segments) % 2 == 0:
+        segments = segments[:-1]
+    return "/".join("*" if i % 2 else segment for i, segment in enumerate(segments))
+
+
+class OpStats:
+    """Counters and a latency histogram for one (stage, collection, rpc)"""
+    __slots__ = ("calls", "docs", "bytes", "seconds", "buckets")
+
+    def __init__(self):
+        self.calls = self.docs = self.bytes = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(self, seconds: float, docs: int, nbytes: int):
+        self.calls += 1
+        self.docs += docs
+        self.bytes += nbytes
+        self.seconds += seconds
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th latency"""
+        if not self.calls:
+            return None
+        target, seen = q * self.calls, 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else float("inf")
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "docs": self.docs, "bytes": self.bytes, "seconds": round(self.seconds, 6),
+                "p50": self.quantile(0.5), "p99": self.quantile(0.99), "buckets": list(self.buckets)}
+
+
+class StackSampler:
+    """Samples the Python stacks of the other threads and counts them per stage, as folded stacks"""
+
+    def __init__(self, metrics: "Metrics", interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.metrics = metrics
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stage = self.metrics.stage
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[";".join([stage] + stack[::-1])] += 1
+
+    def folded(self, top: Optional[int] = None) -> List[str]:
+        """Lines of 'stage;frame;...;frame count', the input format of flamegraph tools"""
+        return [f"{stack} {n}" for stack, n in self.samples.most_common(top)]
+
+
+class Metrics:
+    """Thread-safe per-stage, per-collection RPC statistics"""
+
+    def __init__(self):
+        self.stage = "default"
+        self.ops: Dict[Tuple[str, str, str], OpStats] = {}
+        self.stage_seconds: Counter = Counter()
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, collection: str, rpc: str, seconds: float, docs: int = 0, nbytes: int = 0):
+        key = (self.stage, collection, rpc)
+        with self._lock:
+            stats = self.ops.get(key)
+            if stats is None:
+                stats = self.ops[key] = OpStats()
+            stats.record(seconds, docs, nbytes)
+
+    def add_documents(self, collection: str, rpc: str, docs: int, nbytes: int):
+        """Documents and bytes that belong to an RPC recorded under another collection"""
+        key = (self.stage, collection, rpc)
+        with self._lock:
+            stats = self.ops.get(key)
+            if stats is None:
+                stats = self.ops[key] = OpStats()
+            stats.docs += docs
+            stats.bytes += nbytes
+
+    def rpc_counts(self, stage: Optional[str] = None) -> Dict[str, int]:
+        counts: Counter = Counter()
+        with self._lock:
+            for (op_stage, _, rpc), stats in self.ops.items():
+                if stage is None or op_stage == stage:
+                    counts[rpc] += stats.calls
+        return dict(counts)
+
+    def totals(self, stage: Optional[str] = None) -> Dict[str, int]:
+        """Billable document reads and writes plus bytes moved"""
+        totals = Counter()
+        with self._lock:
+            for (op_stage, _, rpc), stats in self.ops.items():
+                if stage is not None and op_stage != stage:
+                    continue
+                kind = "writes" if rpc == "Commit" else "reads"
+                totals[kind] += stats.docs
+                totals[f"{kind[:-1]}_bytes"] += stats.bytes
+        return dict(totals)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            ops = sorted(self.ops.items())
+            stage_seconds = dict(self.stage_seconds)
+        stages: Dict[str, Any] = {stage: {"seconds": round(seconds, 6), "collections": {}}
+                                  for stage, seconds in stage_seconds.items()}
+        for (stage, collection, rpc), stats in ops:
+            stages.setdefault(stage, {"seconds": 0.0, "collections": {}})
+            stages[stage]["collections"].setdefault(collection, {})[rpc] = stats.to_dict()
+        for stage in stages:
+            stages[stage].update(self.totals(stage))
+        return {"seconds": round(time.perf_counter() - self.started, 6), "latency_buckets": LATENCY_BUCKETS,
+                "stages": stages, "totals": self.totals()}
+
+    def prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format"""
+        with self._lock:
+            ops = sorted(self.ops.items())
+            stage_seconds = sorted(self.stage_seconds.items())
+        lines = []
+        for name, kind, help_text in (("firestore_rpcs_total", "counter", "Firestore RPCs issued"),
+                                      ("firestore_documents_total", "counter", "Documents read or written"),
+                                      ("firestore_bytes_total", "counter", "Approximate document bytes moved"),
+                                      ("firestore_rpc_latency_seconds", "histogram", "Firestore RPC latency")):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for (stage, collection, rpc), stats in ops:
+                labels = f'stage="{stage}",collection="{collection}",rpc="{rpc}"'
+                if kind == "counter":
+                    value = {"firestore_rpcs_total": stats.calls, "firestore_documents_total": stats.docs,
+                             "firestore_bytes_total": stats.bytes}[name]
+                    lines.append(f"{name}{{{labels}}} {value}")
+                    continue
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS + ["+Inf"], stats.buckets):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {stats.seconds:.6f}")
+                lines.append(f"{name}_count{{{labels}}} {stats.calls}")
+        lines += ["# HELP debattle_stage_seconds Wall time per stage", "# TYPE debattle_stage_seconds gauge"]
+        lines += [f'debattle_stage_seconds{{stage="{stage}"}} {seconds:.6f}' for stage, seconds in stage_seconds]
+        return "\n".join(lines) + "\n"
+
+
+def _timed_stream(metrics: Metrics, collection: str, rpc: str, results, documents: bool = True) -> Iterator[Any]:
+    """Yield streamed results, timing only the waits on the server and not the caller's processing"""
+    docs = nbytes = 0
+    seconds = 0.0
+    iterator = iter(results)
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                seconds += time.perf_counter() - started
+            if documents:
+                docs += 1
+                nbytes += document_size(item.to_dict(), item.id)
+            yield item
+    finally:
+        # Empty queries and aggregations are still billed one read
+        metrics.record(collection, rpc, seconds, max(docs, 1), nbytes)
+
+
+def _unwrap(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _unwrap(v) for k, v in value.items()}
+    return getattr(value, "_target", value)
+
+
+class _Instrumented:
+    """Forwards to a Firestore reference or query, recording the calls that become RPCs"""
+
+    # Methods that return another query or reference
+    _CHAINED = {"where", "order_by", "limit", "limit_to_last", "start_after", "start_at",
+                "end_before", "end_at", "select", "offset", "collection", "document", "count"}
+    _WRITES = {"set", "create", "update", "delete"}
+
+    def __init__(self, target: Any, metrics: Metrics, collection: str, kind: str):
+        self._target = target
+        self._metrics = metrics
+        self._collection = collection
+        # "document", "query" or "aggregation"
+        self._kind = kind
+
+    def _chain(self, name: str, args: Tuple, result: Any) -> "_Instrumented":
+        if name == "document":
+            path = f"{self._collection}/{args[0]}" if args and args[0] else self._collection
+            return _Instrumented(result, self._metrics, collection_group(path), "document")
+        if name == "collection":
+            return _Instrumented(result, self._metrics, collection_group(f"{self._collection}/*/{args[0]}"), "query")
+        return _Instrumented(result, self._metrics, self._collection, "aggregation" if name == "count" else "query")
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if name in self._CHAINED:
+            return lambda *args, **kwargs: self._chain(name, args, attr(*[_unwrap(a) for a in args], **kwargs))
+        if name == "stream":
+            rpc = "RunAggregationQuery" if self._kind == "aggregation" else "RunQuery"
+            return lambda *args, **kwargs: _timed_stream(self._metrics, self._collection, rpc, attr(*args, **kwargs),
+                                                         documents=self._kind != "aggregation")
+        if name == "get":
+            def get(*args, **kwargs):
+                started = time.perf_counter()
+                result = attr(*args, **kwargs)
+                seconds = time.perf_counter() - started
+                if self._kind == "document":
+                    self._metrics.record(self._collection, "GetDocument", seconds, 1,
+                                         document_size(result.to_dict(), result.id) if result.exists else 0)
+                elif self._kind == "aggregation":
+                    self._metrics.record(self._collection, "RunAggregationQuery", seconds, 1)
+                else:
+                    self._metrics.record(self._collection, "RunQuery", seconds, max(1, len(result)),
+                                         sum(document_size(s.to_dict(), s.id) for s in result))
+                return result
+            return get
+        if name in self._WRITES and self._kind == "document":
+            def write(*args, **kwargs):
+                started = time.perf_counter()
+                result = attr(*args, **kwargs)
+                self._metrics.record(self._collection, "Commit", time.perf_counter() - started, 1,
+                                     document_size(args[0] if args else None, self._target.id))
+                return result
+            return write
+        return attr
+
+
+class _InstrumentedBatch:
+    def __init__(self, batch: Any, metrics: Metrics):
+        self._batch = batch
+        self._metrics = metrics
+        self._writes: Counter = Counter()
+        self._bytes: Counter = Counter()
+
+    def _add(self, ref, data=None):
+        collection = getattr(ref, "_collection", None) or collection_group(_unwrap(ref).path)
+        self._writes[collection] += 1
+        self._bytes[collection] += document_size(data, _unwrap(ref).id)
+
+    def set(self, ref, data, merge=False):
+        self._add(ref, data)
+        self._batch.set(_unwrap(ref), data, merge=merge)
+
+    def create(self, ref, data):
+        self._add(ref, data)
+        self._batch.create(_unwrap(ref), data)
+
+    def update(self, ref, data):
+        self._add(ref, data)
+        self._batch.update(_unwrap(ref), data)
+
+    def delete(self, ref):
+        self._add(ref)
+        self._batch.delete(_unwrap(ref))
+
+    def commit(self):
+        started = time.perf_counter()
+        result = self._batch.commit()
+        seconds = time.perf_counter() - started
+        # One commit is one RPC; its latency is recorded under the collection with the most writes
+        main = max(self._writes, key=self._writes.get) if self._writes else "(empty)"
+        self._metrics.record(main, "Commit", seconds, self._writes[main], self._bytes[main])
+        for collection, n in self._writes.items():
+            if collection != main:
+                self._metrics.add_documents(collection, "Commit", n, self._bytes[collection])
+        return result
+
+    def __len__(self):
+        return sum(self._writes.values())
+
+
+class InstrumentedClient:
+    """
+    Firestore client wrapper that records every RPC under the current stage.
+
+    Reads count the documents returned and their approximate stored size, writes
+    the documents committed; a stream is timed only while waiting on the server,
+    not while the caller processes its results.
+    """
+
+    def __init__(self, db: Any, sample_interval: Optional[float] = None):
+        self._db = db
+        self.metrics = Metrics()
+        self.sampler = StackSampler(self.metrics, sample_interval) if sample_interval else None
+        if self.sampler:
+            self.sampler.start()
+
+    @property
+    def rpcs(self) -> Dict[str, int]:
+        return self.metrics.rpc_counts()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Attribute the RPCs issued inside the block to a named stage"""
+        previous, self.metrics.stage = self.metrics.stage, name
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.metrics.stage_seconds[name] += time.perf_counter() - started
+            self.metrics.stage = previous
+
+    def collection(self, path: str):
+        return _Instrumented(self._db.collection(path), self.metrics, collection_group(path), "query")
+
+    def document(self, path: str):
+        return _Instrumented(self._db.document(path), self.metrics, collection_group(path), "document")
+
+    def batch(self):
+        return _InstrumentedBatch(self._db.batch(), self.metrics)
+
+    def get_all(self, refs, *args, **kwargs):
+        refs = list(refs)
+        collection = (getattr(refs[0], "_collection", None) or collection_group(_unwrap(refs[0]).path)) if refs \
+            else "(empty)"
+        return _timed_stream(self.metrics, collection, "BatchGetDocuments",
+                             self._db.get_all([_unwrap(ref) for ref in refs], *args, **kwargs))
+
+    def report(self, top_stacks: int = 50) -> Dict[str, Any]:
+        report = self.metrics.report()
+        if self.sampler:
+            report["stacks"] = self.sampler.folded(top_stacks)
+        return report
+
+    def write_report(self, path: str):
+        """JSON report, or Prometheus text when the path ends in .prom"""
+        if self.sampler:
+            self.sampler.stop()
+        with open(path, "w") as f:
+            if path.endswith(".prom"):
+                f.write(self.metrics.prometheus())
+            else:
+                json.dump(self.report(), f, indent=2)
+
+    def close(self):
+        if self.sampler:
+            self.sampler.stop()
+        close = getattr(self._db, "close", None)
+        if close:
+            close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._db, name)
+
+
+def stage(db: Any, name: str):
+    """client.stage(name) for an instrumented client, a no-op context otherwise"""
+    return db.stage(name) if isinstance(db, InstrumentedClient) else contextlib.nullcontext(db)
+
+
+def instrument(db: Any, report_path: Optional[str] = None, sample_interval: Optional[float] = None
+               ) -> InstrumentedClient:
+    """Wrap a client; with report_path the report is written when the process exits"""
+    client = InstrumentedClient(db, sample_interval)
+    if report_path:
+        def write():
+            client.write_report(report_path)
+            print(f"📈 Instrumentation report written to {report_path}")
+        atexit.register(write)
+    return client
+
+
+def print_summary(client: InstrumentedClient):
+    """One line per stage with its billable operations and time"""
+    report = client.metrics.report()
+    print("\n📈 Firestore usage by stage:")
+    for stage, row in report["stages"].items():
+        print(f"    • {stage:<20} {row['seconds']:>8.3f}s  {row.get('reads', 0):>10,} reads  "
+              f"{row.get('writes', 0):>10,} writes  {(row.get('read_bytes', 0) + row.get('write_bytes', 0)) / 1e6:>8.1f} MB")
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Judgment score analytics for Debattle.
+Folds judgment scores and argument ai_feedback into mergeable per-user and per-category distributions, sharded over debates.
+"""
+
+import argparse
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from achievement_engine import load_topic_categories
+from columnar import CRITERIA
+from debate_archive import read_archive
+from firestore_io import (BatchWriter, DEFAULT_PAGE_SIZE, Throughput, get_documents, iter_pages, shard_bounds,
+                          shard_query)
+from memory_firestore import MemoryFirestore
+from ratings import debate_winner
+
+STATE_COLLECTION = "system"
+STATE_DOC = "judgmentAnalytics"
+USER_COLLECTION = "userAnalytics"
+
+FEEDBACK = ["strength_score", "clarity_score", "evidence_score"]
+DEBATE_FIELDS = ["status", "participants", "winner", "judgment.winner", "judgment.confidence", "judgment.scores",
+                 "arguments", "topicId", "ended_at", "archive"]
+
+# Judgment criteria are scored 0-100, argument feedback 1-10 in half points
+SCALES = {"judgment": (0, 100, 1), "category": (0, 100, 1), "feedback": (0, 10, 0.5)}
+ALL_CATEGORIES = "all"
+# A category needs this many judged debates before it can be one of a user's strongest
+MIN_CATEGORY_DEBATES = 3
+STRONGEST_CATEGORIES = 2
+
+Key = Tuple[str, str]
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class Distribution:
+    """
+    Fixed-step histogram plus Welford moments for a bounded score.
+
+    Scores here are bounded and discrete, so the histogram is exact; two
+    distributions merge by adding bin counts and combining moments (Chan et al.).
+    """
+    __slots__ = ("lo", "hi", "step", "counts", "count", "mean", "m2")
+
+    def __init__(self, lo: float, hi: float, step: float):
+        self.lo, self.hi, self.step = lo, hi, step
+        self.counts: Dict[int, int] = {}
+        self.count, self.mean, self.m2 = 0, 0.0, 0.0
+
+    def add(self, value: float):
+        value = min(max(value, self.lo), self.hi)
+        b = int(round((value - self.lo) / self.step))
+        self.counts[b] = self.counts.get(b, 0) + 1
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other: "Distribution"):
+        for b, n in other.counts.items():
+            self.counts[b] = self.counts.get(b, 0) + n
+        total = self.count + other.count
+        if total:
+            delta = other.mean - self.mean
+            self.m2 += other.m2 + delta * delta * self.count * other.count / total
+            self.mean += delta * other.count / total
+            self.count = total
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for b in sorted(self.counts):
+            seen += self.counts[b]
+            if seen >= target:
+                return self.lo + b * self.step
+        return self.lo + max(self.counts) * self.step
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": {str(b): n for b, n in sorted(self.counts.items())},
+                "count": self.count, "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_dict(cls, group: str, data: Dict[str, Any]) -> "Distribution":
+        dist = cls(*SCALES[group])
+        dist.counts = {int(b): n for b, n in (data.get("counts") or {}).items()}
+        dist.count, dist.mean, dist.m2 = data.get("count", 0), data.get("mean", 0.0), data.get("m2", 0.0)
+        return dist
+
+
+def _dists_to_dict(dists: Dict[Key, Distribution]) -> Dict[str, Dict[str, Any]]:
+    nested: Dict[str, Dict[str, Any]] = {}
+    for (group, name), dist in dists.items():
+        nested.setdefault(group, {})[name] = dist.to_dict()
+    return nested
+
+
+def _dists_from_dict(nested: Dict[str, Dict[str, Any]]) -> Dict[Key, Distribution]:
+    return {(group, name): Distribution.from_dict(group, data)
+            for group, names in (nested or {}).items() if group in SCALES for name, data in names.items()}
+
+
+def _merge_into(target: Dict[Key, Distribution], source: Dict[Key, Distribution]):
+    for key, dist in source.items():
+        if key in target:
+            target[key].merge(dist)
+        else:
+            target[key] = dist
+
+
+class JudgmentStats:
+    """Mergeable per-user, per-category and judge-calibration aggregates over a set of debates"""
+
+    def __init__(self):
+        self.users: Dict[str, Dict[Key, Distribution]] = {}
+        self.categories: Dict[str, Dict[Key, Distribution]] = {}
+        # confidence bucket -> [decided debates, debates where the arguments' feedback agrees]
+        self.calibration: Dict[str, List[int]] = {}
+        self.debates = 0
+
+    def _add(self, table: Dict[str, Dict[Key, Distribution]], owner: str, key: Key, value: Any):
+        if not isinstance(value, (int, float)):
+            return
+        dists = table.setdefault(owner, {})
+        if key not in dists:
+            dists[key] = Distribution(*SCALES[key[0]])
+        dists[key].add(value)
+
+    def fold(self, debate: Dict[str, Any], category: Optional[str], users: Optional[Set[str]] = None,
+             shared: bool = True):
+        """Add one completed debate; users limits the per-user part, shared toggles categories and calibration"""
+        judgment = debate.get("judgment") or {}
+        buckets = [ALL_CATEGORIES] + ([category] if category else [])
+        wanted = (lambda uid: users is None or uid in users)
+        for uid, scores in (judgment.get("scores") or {}).items():
+            if not isinstance(scores, dict):
+                continue
+            for criterion in CRITERIA:
+                if wanted(uid):
+                    self._add(self.users, uid, ("judgment", criterion), scores.get(criterion))
+                if shared:
+                    for bucket in buckets:
+                        self._add(self.categories, bucket, ("judgment", criterion), scores.get(criterion))
+            if category and wanted(uid):
+                self._add(self.users, uid, ("category", category), scores.get("total"))
+
+        quality: Dict[str, List[float]] = {}
+        for argument in debate.get("arguments") or []:
+            uid, feedback = argument.get("userId"), argument.get("ai_feedback") or {}
+            values = [feedback[m] for m in FEEDBACK if isinstance(feedback.get(m), (int, float))]
+            if values:
+                quality.setdefault(uid, []).append(sum(values) / len(values))
+            for metric in FEEDBACK:
+                if wanted(uid):
+                    self._add(self.users, uid, ("feedback", metric), feedback.get(metric))
+                if shared:
+                    for bucket in buckets:
+                        self._add(self.categories, bucket, ("feedback", metric), feedback.get(metric))
+
+        if not shared:
+            return
+        self.debates += 1
+        winner, confidence = debate_winner(debate), judgment.get("confidence")
+        others = [uid for uid in quality if uid != winner]
+        if winner in quality and len(others) == 1 and isinstance(confidence, (int, float)):
+            mean = {uid: sum(v) / len(v) for uid, v in quality.items()}
+            bucket = f"{min(max(math.floor(confidence * 10) / 10, 0.5), 0.9):.1f}"
+            row = self.calibration.setdefault(bucket, [0, 0])
+            row[0] += 1
+            row[1] += mean[winner] > mean[others[0]]
+
+    def merge(self, other: "JudgmentStats"):
+        for table, theirs in ((self.users, other.users), (self.categories, other.categories)):
+            for owner, dists in theirs.items():
+                _merge_into(table.setdefault(owner, {}), dists)
+        for bucket, (decided, agree) in other.calibration.items():
+            row = self.calibration.setdefault(bucket, [0, 0])
+            row[0] += decided
+            row[1] += agree
+        self.debates += other.debates
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"users": {uid: _dists_to_dict(d) for uid, d in self.users.items()},
+                "categories": {c: _dists_to_dict(d) for c, d in self.categories.items()},
+                "calibration": {b: list(row) for b, row in self.calibration.items()},
+                "debates": self.debates}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "JudgmentStats":
+        stats = cls()
+        stats.users = {uid: _dists_from_dict(d) for uid, d in (data.get("users") or {}).items()}
+        stats.categories = {c: _dists_from_dict(d) for c, d in (data.get("categories") or {}).items()}
+        stats.calibration = {b: list(row) for b, row in (data.get("calibration") or {}).items()}
+        stats.debates = data.get("debates", 0)
+        return stats
+
+
+def strongest_categories(dists: Dict[Key, Distribution], n: int = STRONGEST_CATEGORIES) -> List[str]:
+    """Categories with the best mean judgment total, among those with enough debates"""
+    ranked = sorted(((dist.mean, name) for (group, name), dist in dists.items()
+                     if group == "category" and dist.count >= MIN_CATEGORY_DEBATES), reverse=True)
+    return [name for _, name in ranked[:n]]
+
+
+def _key(debate_id: str, debate: Dict[str, Any]) -> Tuple[datetime, str]:
+    return _utc(debate["ended_at"]), debate_id
+
+
+def _with_arguments(db, debate_id: str, debate: Dict[str, Any]) -> Dict[str, Any]:
+    """The debate itself, or for an archived summary (which drops arguments) the full debate from its chunks"""
+    if not debate.get("archive") or debate.get("status") != "completed":
+        return debate
+    return read_archive(db, debate_id, debate["archive"])
+
+
+def analyze_records(records: Iterable[Tuple[str, Dict[str, Any]]], categories: Dict[str, str]) -> Dict[str, Any]:
+    """Fold (debate id, debate) pairs; returns the stats and the newest debate key, ready for pickling"""
+    stats = JudgmentStats()
+    newest = None
+    for debate_id, debate in records:
+        if debate.get("status") != "completed" or not debate.get("ended_at"):
+            continue
+        stats.fold(debate, categories.get(debate.get("topicId")))
+        newest = max(newest, _key(debate_id, debate)) if newest else _key(debate_id, debate)
+    return {"stats": stats.to_dict(), "newest": newest}
+
+
+def _shard_records(db, low: Optional[str], high: Optional[str], page_size: int):
+    query = shard_query(db, "debates", low, high, db.collection("debates").select(DEBATE_FIELDS))
+    progress = Throughput(f"debates {low or '…'}-{high or '…'}", report_every=10.0)
+    for page in iter_pages(query, page_size):
+        for snap in page:
+            yield snap.id, _with_arguments(db, snap.id, snap.to_dict() or {})
+        progress.add(len(page))
+
+
+def _analyze_shard(job: Tuple[Optional[str], Optional[str], Optional[str], Dict[str, str], int]) -> Dict[str, Any]:
+    """Process pool entry point: each worker opens its own client"""
+    emulator, low, high, categories, page_size = job
+    from initialize_firestore import connect
+    return analyze_records(_shard_records(connect(emulator), low, high, page_size), categories)
+
+
+def _save_users(db, stats: JudgmentStats, through: Dict[str, Dict[str, Any]], current: Dict[str, List[str]]) -> int:
+    """Write each user's distributions and refresh stats.strongestCategories where it changed"""
+    changed = 0
+    now = datetime.now(timezone.utc)
+    with BatchWriter(db, label="user analytics") as writer:
+        for uid, dists in stats.users.items():
+            writer.set(USER_COLLECTION, uid, {"distributions": _dists_to_dict(dists), "through": through[uid],
+                                              "updatedAt": now})
+            strongest = strongest_categories(dists)
+            if uid in current and strongest and strongest != current[uid]:
+                writer.update("users", uid, {"stats.strongestCategories": strongest})
+                changed += 1
+    return changed
+
+
+def _current_strongest(db, uids: Iterable[str]) -> Dict[str, List[str]]:
+    return {snap.id: ((snap.to_dict() or {}).get("stats") or {}).get("strongestCategories") or []
+            for snap in get_documents(db, "users", sorted(uids), ["stats.strongestCategories"]) if snap.exists}
+
+
+def _save_state(db, stats: JudgmentStats, newest: Optional[Tuple[datetime, str]]):
+    db.collection(STATE_COLLECTION).document(STATE_DOC).set({
+        "categories": {c: _dists_to_dict(d) for c, d in stats.categories.items()},
+        "calibration": {b: list(row) for b, row in stats.calibration.items()},
+        "debates": stats.debates,
+        "watermark": newest[0] if newest else None,
+        "watermarkId": newest[1] if newest else None,
+        "updatedAt": datetime.now(timezone.utc)
+    })
+
+
+def analyze_full(db, shards: int = 1, workers: int = 1, emulator: Optional[str] = None,
+                 page_size: int = DEFAULT_PAGE_SIZE, dry_run: bool = False) -> JudgmentStats:
+    """
+    Rebuild every distribution from all debates, one key-range shard per task.
+
+    With workers > 1 the shards run in a process pool and each worker connects to
+    the emulator or live project on its own; the in-memory backend runs them in turn.
+    Archived debates are read back from their chunks, since their summaries drop arguments.
+    """
+    categories = load_topic_categories(db)
+    bounds = shard_bounds(db, "debates", shards)
+    ranges = list(zip(bounds, bounds[1:]))
+    print(f"⚖️  Analyzing judgments over {len(ranges)} shard(s) with {workers} worker(s)...")
+    if workers > 1 and not isinstance(db, MemoryFirestore):
+        jobs = [(emulator, low, high, categories, page_size) for low, high in ranges]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_analyze_shard, jobs))
+    else:
+        results = [analyze_records(_shard_records(db, low, high, page_size), categories) for low, high in ranges]
+
+    stats = JudgmentStats()
+    newest = None
+    for result in results:
+        stats.merge(JudgmentStats.from_dict(result["stats"]))
+        if result["newest"] and (newest is None or result["newest"] > newest):
+            newest = result["newest"]
+    print(f"    ✓ Folded {stats.debates:,} debates for {len(stats.users):,} users")
+    if not dry_run and newest:
+        marker = {"endedAt": newest[0], "debateId": newest[1]}
+        changed = _save_users(db, stats, {uid: marker for uid in stats.users}, _current_strongest(db, stats.users))
+        _save_state(db, stats, newest)
+        print(f"    ✓ Updated strongestCategories for {changed:,} users")
+    return stats
+
+
+def analyze_incremental(db, page_size: int = DEFAULT_PAGE_SIZE, dry_run: bool = False) -> JudgmentStats:
+    """
+    Fold only debates that ended after the stored watermark into the stored distributions.
+
+    Each userAnalytics doc carries the last debate folded into it, so users written
+    before an interrupted run finished are not counted twice; the shared state and
+    watermark are written last, in one document.
+    """
+    snap = db.collection(STATE_COLLECTION).document(STATE_DOC).get()
+    state = (snap.to_dict() or {}) if snap.exists else {}
+    if not state.get("watermark"):
+        raise ValueError("no judgment analytics yet; run a full pass first")
+    watermark = (_utc(state["watermark"]), state.get("watermarkId") or "")
+    shared = JudgmentStats.from_dict({"categories": state.get("categories"), "calibration": state.get("calibration"),
+                                      "debates": state.get("debates", 0)})
+    categories = load_topic_categories(db)
+
+    print(f"⚖️  Folding judgments of debates that ended after {watermark[0].isoformat()}...")
+    query = (db.collection("debates").select(DEBATE_FIELDS).where("ended_at", ">=", watermark[0])
+             .order_by("ended_at").order_by("__name__"))
+    fresh: List[Tuple[Tuple[datetime, str], Dict[str, Any], Optional[str]]] = []
+    for page in iter_pages(query, page_size):
+        for debate_snap in page:
+            debate = debate_snap.to_dict() or {}
+            key = _key(debate_snap.id, debate)
+            if key > watermark and debate.get("status") == "completed":
+                debate = _with_arguments(db, debate_snap.id, debate)
+                fresh.append((key, debate, categories.get(debate.get("topicId"))))
+    for _, debate, category in fresh:
+        shared.fold(debate, category, users=set())
+
+    touched: Dict[str, List[int]] = {}
+    for i, (_, debate, _) in enumerate(fresh):
+        for uid in {p.get("userId") for p in debate.get("participants") or []} - {None}:
+            touched.setdefault(uid, []).append(i)
+    users = JudgmentStats()
+    through: Dict[str, Dict[str, Any]] = {}
+    for user_snap in get_documents(db, USER_COLLECTION, sorted(touched)):
+        stored = (user_snap.to_dict() or {}) if user_snap.exists else {}
+        mark = stored.get("through") or {}
+        mark = (_utc(mark["endedAt"]), mark.get("debateId", "")) if mark.get("endedAt") else None
+        dists = _dists_from_dict(stored.get("distributions"))
+        folded = JudgmentStats()
+        for i in touched[user_snap.id]:
+            key, debate, category = fresh[i]
+            if mark is None or key > mark:
+                folded.fold(debate, category, users={user_snap.id}, shared=False)
+                mark = key
+        _merge_into(dists, folded.users.get(user_snap.id, {}))
+        if dists and mark:
+            users.users[user_snap.id] = dists
+            through[user_snap.id] = {"endedAt": mark[0], "debateId": mark[1]}
+
+    newest = fresh[-1][0] if fresh else watermark
+    print(f"    ✓ Folded {len(fresh):,} new debates for {len(users.users):,} users")
+    if not dry_run and fresh:
+        changed = _save_users(db, users, through, _current_strongest(db, users.users))
+        _save_state(db, shared, newest)
+        print(f"    ✓ Updated strongestCategories for {changed:,} users")
+    shared.users = users.users
+    return shared
+
+
+def calibration_report(stats: JudgmentStats) -> List[Dict[str, Any]]:
+    """Per confidence bucket: how often the judged winner also had the better argument feedback"""
+    return [{"confidence": bucket, "debates": decided, "agreement": round(agree / decided, 3) if decided else None}
+            for bucket, (decided, agree) in sorted(stats.calibration.items())]
+
+
+def print_report(stats: JudgmentStats):
+    overall = stats.categories.get(ALL_CATEGORIES, {})
+    print("\n📊 Judgment criteria (all debates): mean ± std, p10 / p50 / p90")
+    for criterion in CRITERIA:
+        dist = overall.get(("judgment", criterion))
+        if dist:
+            print(f"    • {criterion:<11} {dist.mean:5.1f} ± {dist.std:4.1f}   "
+                  f"{dist.quantile(0.1):g} / {dist.quantile(0.5):g} / {dist.quantile(0.9):g}")
+    print("\n🎯 Judge calibration: judged winner also had the higher mean argument feedback")
+    for row in calibration_report(stats):
+        print(f"    • confidence {row['confidence']}+: {row['agreement']:.1%} of {row['debates']:,} debates")
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Fold Debattle judgment scores into mergeable distributions")
+    parser.add_argument("--incremental", action="store_true", help="only fold debates since the last run")
+    parser.add_argument("--shards", type=int, default=1, help="key-range shards for a full pass")
+    parser.add_argument("--workers", type=int, default=1, help="processes for a full pass")
+    parser.add_argument("--dry-run", action="store_true", help="report without writing")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    args = parser.parse_args(argv)
+
+    from initialize_firestore import connect
+    db = connect(args.emulator)
+    if args.incremental:
+        stats = analyze_incremental(db, args.page_size, args.dry_run)
+    else:
+        stats = analyze_full(db, args.shards, args.workers, args.emulator, args.page_size, args.dry_run)
+    print_report(stats)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Judgment analytics failed: {e}")
+        sys.exit(1)
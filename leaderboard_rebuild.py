@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Offline leaderboard rebuild for Debattle.
+Derives the leaderboard collection from users in one rating-ordered pass and writes only the rows that changed.
+"""
+
+import argparse
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from firestore_io import BatchWriter, DEFAULT_PAGE_SIZE, Throughput, iter_pages
+from ratings import tier_for_rating
+
+LEADERBOARD_FIELDS = ["userId", "displayName", "rating", "rank", "change",
+                      "gamesPlayed", "tier", "wins", "losses", "winRate"]
+USER_FIELDS = ["displayName", "rating", "gamesPlayed", "wins", "losses"]
+
+
+def _fingerprint(row: Dict[str, Any]) -> int:
+    return hash(tuple(row.get(field) for field in LEADERBOARD_FIELDS))
+
+
+def load_previous(db, page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, Tuple[int, int]]:
+    """userId -> (rank, fingerprint) of the current leaderboard rows"""
+    previous = {}
+    query = db.collection("leaderboard").select(LEADERBOARD_FIELDS).order_by("__name__")
+    for page in iter_pages(query, page_size):
+        for snap in page:
+            row = snap.to_dict()
+            previous[snap.id] = (row.get("rank", 0), _fingerprint(row))
+    return previous
+
+
+def leaderboard_row(uid: str, user: Dict[str, Any], rank: int, previous_rank: Optional[int]) -> Dict[str, Any]:
+    """Leaderboard entry for a user at a rank"""
+    games = user.get("gamesPlayed", 0)
+    wins = user.get("wins", 0)
+    rating = user.get("rating", 0)
+    return {
+        "userId": uid,
+        "displayName": user.get("displayName", ""),
+        "rating": rating,
+        "rank": rank,
+        # Positive when the user moved up since the previous rebuild
+        "change": previous_rank - rank if previous_rank else 0,
+        "gamesPlayed": games,
+        "tier": tier_for_rating(rating),
+        "wins": wins,
+        "losses": user.get("losses", 0),
+        "winRate": round(wins / games * 100, 1) if games else 0.0
+    }
+
+
+def rebuild_leaderboard(db, page_size: int = DEFAULT_PAGE_SIZE, dry_run: bool = False,
+                        max_in_flight: int = 8) -> Dict[str, Any]:
+    """Recompute every rank in one sorted pass over users and write only changed rows"""
+    print("🏆 Rebuilding leaderboard...")
+    previous = load_previous(db, page_size)
+    print(f"    ✓ Loaded {len(previous):,} previous leaderboard rows")
+
+    query = (db.collection("users").select(USER_FIELDS)
+             .order_by("rating", direction="DESCENDING").order_by("__name__", direction="DESCENDING"))
+    progress = Throughput("users", report_every=5.0)
+    written = unchanged = 0
+    writer = None if dry_run else BatchWriter(db, max_in_flight=max_in_flight, label="leaderboard")
+    rank = 0
+    for page in iter_pages(query, page_size):
+        for snap in page:
+            rank += 1
+            previous_rank, previous_fingerprint = previous.pop(snap.id, (None, None))
+            row = leaderboard_row(snap.id, snap.to_dict(), rank, previous_rank)
+            if _fingerprint(row) == previous_fingerprint:
+                unchanged += 1
+                continue
+            written += 1
+            if writer:
+                writer.set("leaderboard", snap.id, row)
+        progress.add(len(page))
+
+    # Whatever is left belonged to users that no longer exist
+    deleted = len(previous)
+    if writer:
+        for uid in previous:
+            writer.delete("leaderboard", uid)
+        writer.close()
+
+    summary = {
+        "ranked": rank,
+        "written": written,
+        "unchanged": unchanged,
+        "deleted": deleted,
+        "seconds": round(progress.elapsed, 3),
+        "docs_per_sec": round(progress.rate, 1),
+    }
+    print(f"    ✓ Ranked {rank:,} users: {written:,} rows written, {unchanged:,} unchanged, "
+          f"{deleted:,} deleted ({summary['docs_per_sec']:,.0f} users/sec)")
+    return summary
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Rebuild the Debattle leaderboard from users")
+    parser.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--dry-run", action="store_true", help="compute the diff without writing")
+    args = parser.parse_args(argv)
+
+    from initialize_firestore import connect
+    db = connect(args.emulator)
+    rebuild_leaderboard(db, args.page_size, args.dry_run, args.max_in_flight)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"\n❌ Leaderboard rebuild failed: {str(e)}")
+        sys.exit(1)
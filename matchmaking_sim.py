@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Matchmaking simulator for Debattle.
+Replays queue arrivals from the user population through the app's pairing policy and reports wait times, rating gaps and throughput.
+"""
+
+import argparse
+import bisect
+import heapq
+import json
+import math
+import os
+import random
+import sys
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# findMatch in src/services/debate/matchmaking.ts pairs within ±100 rating on the same topic
+RATING_WINDOW = 100
+
+
+def _epoch(value: Any) -> float:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float(value or 0)
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class Population:
+    """Who joins the queue, how often, and for which topics"""
+
+    def __init__(self, uids: List[str], ratings: array, activity: List[float],
+                 preferred: List[Tuple[str, ...]], topics_by_category: Dict[str, Tuple[List[str], List[float]]]):
+        self.uids = uids
+        self.ratings = ratings
+        self.preferred = preferred
+        self.topics_by_category = topics_by_category
+        self._cum_activity = list(_accumulate(activity))
+        self._all_topics = [t for ids, _ in topics_by_category.values() for t in ids]
+
+    @classmethod
+    def from_records(cls, users: Iterable[Dict[str, Any]], topics: Iterable[Dict[str, Any]],
+                     activity_half_life_days: float = 2.0) -> "Population":
+        """Recently active users queue more often; popular topics are picked more often"""
+        uids: List[str] = []
+        ratings = array("i")
+        last_active = array("d")
+        preferred: List[Tuple[str, ...]] = []
+        for user in users:
+            uids.append(user["uid"])
+            ratings.append(int(user.get("rating", 1200)))
+            last_active.append(_epoch(user.get("last_active")))
+            preferred.append(tuple(user.get("preferred_topics") or ()))
+        if not uids:
+            raise ValueError("No users to simulate")
+        newest = max(last_active)
+        decay = math.log(2) / (activity_half_life_days * 86400)
+        activity = [math.exp(-decay * (newest - t)) for t in last_active]
+
+        topics_by_category: Dict[str, Tuple[List[str], List[float]]] = {}
+        for topic in topics:
+            ids, weights = topics_by_category.setdefault(topic.get("category", ""), ([], []))
+            ids.append(topic["id"])
+            weights.append(1 + topic.get("usageCount", 0))
+        if not topics_by_category:
+            raise ValueError("No topics to simulate")
+        topics_by_category = {category: (ids, list(_accumulate(weights)))
+                              for category, (ids, weights) in topics_by_category.items()}
+        return cls(uids, ratings, activity, preferred, topics_by_category)
+
+    def draw_user(self, rng: random.Random) -> int:
+        return bisect.bisect_right(self._cum_activity, rng.random() * self._cum_activity[-1])
+
+    def draw_topic(self, rng: random.Random, user: int) -> str:
+        categories = [c for c in self.preferred[user] if c in self.topics_by_category]
+        if not categories:
+            return rng.choice(self._all_topics)
+        ids, cum_weights = self.topics_by_category[rng.choice(categories)]
+        return ids[bisect.bisect_right(cum_weights, rng.random() * cum_weights[-1])]
+
+
+def _accumulate(values: Iterable[float]) -> Iterable[float]:
+    total = 0.0
+    for value in values:
+        total += value
+        yield total
+
+
+class QueueIndex:
+    """
+    Waiting entries bucketed by (topic, rating // window).
+
+    A match search touches at most three buckets, each a sorted list of
+    (rating, seq), instead of scanning the whole queue like the Firestore query.
+    """
+
+    def __init__(self, window: int = RATING_WINDOW):
+        self.window = window
+        self.buckets: Dict[Tuple[str, int], List[Tuple[int, int]]] = {}
+        self.size = 0
+
+    def add(self, topic: str, rating: int, seq: int):
+        bisect.insort(self.buckets.setdefault((topic, rating // self.window), []), (rating, seq))
+        self.size += 1
+
+    def remove(self, topic: str, rating: int, seq: int) -> bool:
+        key = (topic, rating // self.window)
+        bucket = self.buckets.get(key)
+        if not bucket:
+            return False
+        i = bisect.bisect_left(bucket, (rating, seq))
+        if i == len(bucket) or bucket[i] != (rating, seq):
+            return False
+        del bucket[i]
+        if not bucket:
+            del self.buckets[key]
+        self.size -= 1
+        return True
+
+    def closest(self, topic: str, rating: int) -> Optional[Tuple[int, int]]:
+        """Closest rating within the window; ties go to whoever has waited longest"""
+        low, high = max(0, rating - self.window), rating + self.window
+        best: Optional[Tuple[int, int]] = None
+        best_key: Optional[Tuple[int, int]] = None
+        for b in range(low // self.window, high // self.window + 1):
+            bucket = self.buckets.get((topic, b))
+            if not bucket:
+                continue
+            i = bisect.bisect_left(bucket, (rating, -1))
+            candidates = []
+            if i < len(bucket):
+                candidates.append(bucket[i])
+            if i > 0:
+                # Earliest arrival among the nearest lower rating
+                below = bucket[i - 1][0]
+                candidates.append(bucket[bisect.bisect_left(bucket, (below, -1))])
+            for entry in candidates:
+                r, seq = entry
+                if low <= r <= high:
+                    key = (abs(r - rating), seq)
+                    if best_key is None or key < best_key:
+                        best, best_key = entry, key
+        return best
+
+
+class MatchmakingSimulator:
+    """Discrete-event simulation of joinQueue/findMatch with Poisson arrivals and abandonment"""
+
+    def __init__(self, population: Population, arrival_rate: float, patience: float = 600.0,
+                 window: int = RATING_WINDOW, seed: int = 0):
+        self.population = population
+        self.arrival_rate = arrival_rate
+        self.patience = patience
+        self.rng = random.Random(seed)
+        self.index = QueueIndex(window)
+        self.waiting: Dict[int, Tuple[int, str, float]] = {}  # seq -> (user, topic, joined)
+        self.queued_users: set = set()
+        self.deadlines: List[Tuple[float, int]] = []
+        self.queue_waits = array("d")
+        self.rating_gaps = array("i")
+        self.arrivals = 0
+        self.instant_matches = 0
+        self.abandoned = 0
+        self.skipped = 0
+        self.peak_queue = 0
+        self._seq = 0
+
+    def _expire(self, now: float):
+        while self.deadlines and self.deadlines[0][0] <= now:
+            _, seq = heapq.heappop(self.deadlines)
+            entry = self.waiting.pop(seq, None)
+            if entry is None:
+                continue  # matched before giving up
+            user, topic, _ = entry
+            self.index.remove(topic, self.population.ratings[user], seq)
+            self.queued_users.discard(user)
+            self.abandoned += 1
+
+    def arrive(self, now: float):
+        user = self.population.draw_user(self.rng)
+        if user in self.queued_users:
+            # The app keeps one queue entry per user
+            self.skipped += 1
+            return
+        self.arrivals += 1
+        rating = self.population.ratings[user]
+        topic = self.population.draw_topic(self.rng, user)
+        match = self.index.closest(topic, rating)
+        if match is not None:
+            other_rating, seq = match
+            other, _, joined = self.waiting.pop(seq)
+            self.index.remove(topic, other_rating, seq)
+            self.queued_users.discard(other)
+            self.queue_waits.append(now - joined)
+            self.rating_gaps.append(abs(other_rating - rating))
+            self.instant_matches += 1
+            return
+        self._join(user, topic, now)
+
+    def _join(self, user: int, topic: str, now: float):
+        self._seq += 1
+        self.waiting[self._seq] = (user, topic, now)
+        self.index.add(topic, self.population.ratings[user], self._seq)
+        self.queued_users.add(user)
+        heapq.heappush(self.deadlines, (now + self.patience, self._seq))
+        self.peak_queue = max(self.peak_queue, self.index.size)
+
+    def seed_queue(self, size: int):
+        """
+        Put `size` distinct users in the queue at t=0 without matching them.
+
+        The backlog is held as configured and only later arrivals drain it, so
+        no 0-second waits enter the wait statistics.
+        """
+        size = min(size, len(self.population.uids))
+        while self.index.size < size:
+            user = self.population.draw_user(self.rng)
+            if user in self.queued_users:
+                continue
+            self.arrivals += 1
+            self._join(user, self.population.draw_topic(self.rng, user), 0.0)
+
+    def run(self, duration: float, initial_queue: int = 0) -> Dict[str, Any]:
+        started = time.perf_counter()
+        self.seed_queue(initial_queue)
+        now = 0.0
+        while True:
+            now += self.rng.expovariate(self.arrival_rate)
+            if now > duration:
+                break
+            self._expire(now)
+            self.arrive(now)
+        self._expire(duration)
+        return self.report(duration, time.perf_counter() - started)
+
+    def report(self, duration: float, wall_seconds: float) -> Dict[str, Any]:
+        waits = sorted(self.queue_waits)
+        gaps = sorted(self.rating_gaps)
+        matches = len(gaps)
+        return {
+            "arrivals": self.arrivals,
+            "matches": matches,
+            "abandoned": self.abandoned,
+            "still_waiting": self.index.size,
+            "skipped_already_queued": self.skipped,
+            "peak_queue": self.peak_queue,
+            "match_rate": round(2 * matches / self.arrivals, 4) if self.arrivals else 0.0,
+            "wait_p50": round(_percentile(waits, 0.50), 2),
+            "wait_p99": round(_percentile(waits, 0.99), 2),
+            "wait_mean": round(sum(waits) / matches, 2) if matches else 0.0,
+            "rating_gap_p50": _percentile(gaps, 0.50),
+            "rating_gap_p99": _percentile(gaps, 0.99),
+            "rating_gap_mean": round(sum(gaps) / matches, 2) if matches else 0.0,
+            "matches_per_sec": round(matches / duration, 3) if duration else 0.0,
+            "wall_seconds": round(wall_seconds, 3),
+            "events_per_sec": round((self.arrivals + self.skipped) / wall_seconds, 1) if wall_seconds else 0.0,
+        }
+
+
+def load_population(args: argparse.Namespace) -> Population:
+    """Users and topics from a snapshot, a database, or the synthetic generator"""
+    if args.snapshot:
+        from snapshot_io import read_collection
+        users = (data for _, data in read_collection(args.snapshot, "users"))
+        topics = (data for _, data in read_collection(args.snapshot, "topics"))
+        return Population.from_records(users, topics)
+    if args.emulator or args.backend == "firestore":
+        from firestore_io import iter_pages
+        from initialize_firestore import connect
+        db = connect(args.emulator, backend=args.backend)
+        fields = ["uid", "rating", "last_active", "preferred_topics"]
+
+        def docs(collection: str, select: List[str]):
+            query = db.collection(collection).select(select).order_by("__name__")
+            for page in iter_pages(query):
+                for snap in page:
+                    yield dict(snap.to_dict(), uid=snap.id, id=snap.id)
+        return Population.from_records(docs("users", fields), docs("topics", ["category", "usageCount"]))
+    from synthetic_data import SCALES, generate_topics, generate_users
+    num_users, num_topics, _ = SCALES[args.scale]
+    return Population.from_records(generate_users(args.users or num_users, args.seed),
+                                   generate_topics(args.topics or num_topics, args.seed))
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Simulate Debattle matchmaking under queue load")
+    parser.add_argument("--scale", default="small", choices=["tiny", "small", "medium", "large", "xl"],
+                        help="synthetic population size when no snapshot or database is given")
+    parser.add_argument("--users", type=int, help="override the number of generated users")
+    parser.add_argument("--topics", type=int, help="override the number of generated topics")
+    parser.add_argument("--snapshot", metavar="DIR", help="take the population from a snapshot_io snapshot")
+    parser.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    parser.add_argument("--backend", choices=["firestore", "emulator"], help="read the population from Firestore")
+    parser.add_argument("--rate", type=float, default=10.0, help="queue joins per second")
+    parser.add_argument("--duration", type=float, default=3600.0, help="simulated seconds")
+    parser.add_argument("--patience", type=float, default=600.0, help="seconds before a waiting user leaves the queue")
+    parser.add_argument("--initial-queue", type=int, default=0, help="users already queued at t=0")
+    parser.add_argument("--window", type=int, default=RATING_WINDOW, help="rating window for a match")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    print("👥 Loading population...")
+    population = load_population(args)
+    print(f"    ✓ {len(population.uids):,} users")
+    print(f"🎲 Simulating {args.duration:,.0f}s at {args.rate:,.1f} joins/sec...")
+    simulator = MatchmakingSimulator(population, args.rate, args.patience, args.window, args.seed)
+    report = simulator.run(args.duration, args.initial_queue)
+    print(f"    ✓ {report['matches']:,} matches from {report['arrivals']:,} joins "
+          f"({report['abandoned']:,} gave up, peak queue {report['peak_queue']:,})")
+    print(f"    ⏱️  queue wait p50 {report['wait_p50']:.1f}s, p99 {report['wait_p99']:.1f}s")
+    print(f"    📏 rating gap p50 {report['rating_gap_p50']}, p99 {report['rating_gap_p99']}")
+    print(f"    🚀 {report['matches_per_sec']:.2f} matches/sec simulated, "
+          f"{report['events_per_sec']:,.0f} events/sec wall clock")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Simulation failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,723 @@
+#!/usr/bin/env python3
+"""
+In-memory Firestore stand-in for Debattle.
+Implements the client surface the scripts use on plain dicts with lazily built field indexes, so runs need no network or credentials.
+"""
+
+import bisect
+import random
+import string
+import threading
+from datetime import datetime, timezone
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+DOCUMENT_ID = "__name__"
+
+# Firestore rejects larger batches; enforcing it here keeps local runs honest
+MAX_BATCH_WRITES = 500
+
+# Sorted query results kept per collection for cursor pagination
+QUERY_CACHE_SIZE = 8
+
+RANGE_OPS = {"<", "<=", ">", ">="}
+
+
+class NotFound(Exception):
+    """Update of a document that does not exist"""
+
+
+class AlreadyExists(Exception):
+    """Create of a document that already exists"""
+
+
+class Increment:
+    def __init__(self, value):
+        self.value = value
+
+
+class ArrayUnion:
+    def __init__(self, values):
+        self.values = list(values)
+
+
+class ArrayRemove:
+    def __init__(self, values):
+        self.values = list(values)
+
+
+class Sentinel:
+    def __init__(self, description: str):
+        self.description = description
+
+    def __repr__(self):
+        return f"Sentinel: {self.description}"
+
+
+SERVER_TIMESTAMP = Sentinel("Value used to set a document field to the server timestamp.")
+DELETE_FIELD = Sentinel("Value used to delete a field in a document.")
+
+
+def _transform(value: Any) -> Optional[str]:
+    """Name of the field transform a value requests; matches google.cloud.firestore's classes by shape too"""
+    name = type(value).__name__
+    if name in ("Increment", "Maximum", "Minimum", "ArrayUnion", "ArrayRemove"):
+        return name
+    if name == "Sentinel":
+        description = getattr(value, "description", "")
+        if "server timestamp" in description:
+            return "ServerTimestamp"
+        if "delete" in description:
+            return "DeleteField"
+    return None
+
+
+def _sort_key(value: Any) -> Tuple:
+    """Firestore's cross-type value ordering; also used as the hashable index key"""
+    if value is None:
+        return (0,)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (3, value)
+    if isinstance(value, str):
+        return (4, value)
+    if isinstance(value, bytes):
+        return (5, value)
+    if isinstance(value, DocumentReference):
+        return (6, value.path)
+    if isinstance(value, (list, tuple)):
+        return (8, tuple(_sort_key(v) for v in value))
+    if isinstance(value, dict):
+        return (9, tuple((k, _sort_key(v)) for k, v in sorted(value.items())))
+    raise TypeError(f"Cannot store value of type {type(value).__name__}")
+
+
+class _Desc:
+    """Inverts the order of a sort key for descending order-bys"""
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+
+def _stored(value: Any) -> Any:
+    """Copy a value into the store the way Firestore round-trips it"""
+    if isinstance(value, dict):
+        return {k: _stored(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_stored(v) for v in value]
+    if isinstance(value, datetime) and value.tzinfo is None:
+        # Firestore returns timestamps as UTC-aware datetimes
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+_MISSING = object()
+
+
+def _get_field(doc: Dict[str, Any], path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _apply(doc: Dict[str, Any], parts: List[str], value: Any, now: datetime):
+    """Write one field path into a (private, mutable) document, applying transforms"""
+    for part in parts[:-1]:
+        child = doc.get(part)
+        if not isinstance(child, dict):
+            child = doc[part] = {}
+        doc = child
+    leaf = parts[-1]
+    kind = _transform(value)
+    if kind is None:
+        doc[leaf] = _stored(value)
+    elif kind == "DeleteField":
+        doc.pop(leaf, None)
+    elif kind == "ServerTimestamp":
+        doc[leaf] = now
+    elif kind in ("Increment", "Maximum", "Minimum"):
+        current = doc.get(leaf)
+        if not isinstance(current, (int, float)) or isinstance(current, bool):
+            doc[leaf] = value.value
+        elif kind == "Increment":
+            doc[leaf] = current + value.value
+        else:
+            doc[leaf] = (max if kind == "Maximum" else min)(current, value.value)
+    else:
+        current = doc.get(leaf)
+        current = list(current) if isinstance(current, list) else []
+        keys = [_sort_key(v) for v in value.values]
+        if kind == "ArrayUnion":
+            present = {_sort_key(v) for v in current}
+            for item, key in zip(value.values, keys):
+                if key not in present:
+                    present.add(key)
+                    current.append(_stored(item))
+        else:
+            removed = set(keys)
+            current = [v for v in current if _sort_key(v) not in removed]
+        doc[leaf] = current
+
+
+def _merge(target: Dict[str, Any], data: Dict[str, Any], now: datetime):
+    """set(merge=True): nested maps merge field by field instead of replacing"""
+    for key, value in data.items():
+        if isinstance(value, dict) and _transform(value) is None:
+            child = target.get(key)
+            target[key] = child = dict(child) if isinstance(child, dict) else {}
+            _merge(child, value, now)
+        else:
+            _apply(target, [key], value, now)
+
+
+def _write(target: Dict[str, Any], data: Dict[str, Any], now: datetime):
+    """set() without merge: transforms may still appear anywhere in the new document"""
+    for key, value in data.items():
+        if isinstance(value, dict):
+            target[key] = {}
+            _write(target[key], value, now)
+        else:
+            _apply(target, [key], value, now)
+
+
+class _Collection:
+    """Documents of one collection plus the equality and array indexes built for it so far"""
+
+    def __init__(self):
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.times: Dict[str, Tuple[datetime, datetime]] = {}
+        self.indexes: Dict[str, Dict[Tuple, Set[str]]] = {}
+        self.array_indexes: Dict[str, Dict[Tuple, Set[str]]] = {}
+        # cache key -> (fields it depends on, sort keys, ids)
+        self.cache: Dict[Tuple, Tuple[Set[str], List[Tuple], List[str]]] = {}
+
+    def index(self, field: str, array: bool = False) -> Dict[Tuple, Set[str]]:
+        indexes = self.array_indexes if array else self.indexes
+        if field not in indexes:
+            index: Dict[Tuple, Set[str]] = {}
+            for doc_id, doc in self.docs.items():
+                for key in self._index_keys(doc, field, array):
+                    index.setdefault(key, set()).add(doc_id)
+            indexes[field] = index
+        return indexes[field]
+
+    @staticmethod
+    def _index_keys(doc: Optional[Dict[str, Any]], field: str, array: bool) -> Set[Tuple]:
+        if doc is None:
+            return set()
+        value = _get_field(doc, field)
+        if value is _MISSING:
+            return set()
+        if array:
+            return {_sort_key(v) for v in value} if isinstance(value, list) else set()
+        return {_sort_key(value)}
+
+    def put(self, doc_id: str, doc: Optional[Dict[str, Any]], now: datetime):
+        old = self.docs.get(doc_id)
+        for array, indexes in ((False, self.indexes), (True, self.array_indexes)):
+            for field, index in indexes.items():
+                before, after = self._index_keys(old, field, array), self._index_keys(doc, field, array)
+                for key in before - after:
+                    index[key].discard(doc_id)
+                for key in after - before:
+                    index.setdefault(key, set()).add(doc_id)
+        for key, (fields, _, _) in list(self.cache.items()):
+            if old is None or doc is None or any(_get_field(old, f) != _get_field(doc, f) for f in fields):
+                del self.cache[key]
+        if doc is None:
+            self.docs.pop(doc_id, None)
+            self.times.pop(doc_id, None)
+        else:
+            self.docs[doc_id] = doc
+            self.times[doc_id] = (self.times.get(doc_id, (now,))[0], now)
+
+
+class MemoryFirestore:
+    """
+    Thread-safe stand-in for google.cloud.firestore.Client.
+
+    Supports document get/set/update/delete, write batches, get_all, and queries
+    with equality, range, in and array-contains filters, order-by, select,
+    cursors, limit and count. Equality and array-contains filters are served
+    from per-field indexes built on first use and maintained on every write.
+    """
+
+    def __init__(self, project: str = "demo-debattle"):
+        self.project = project
+        self._collections: Dict[str, _Collection] = {}
+        self._lock = threading.RLock()
+
+    def _collection(self, path: str) -> _Collection:
+        if path not in self._collections:
+            self._collections[path] = _Collection()
+        return self._collections[path]
+
+    def collection(self, path: str) -> "CollectionReference":
+        return CollectionReference(self, path)
+
+    def document(self, path: str) -> "DocumentReference":
+        parent, _, doc_id = path.rpartition("/")
+        return DocumentReference(self, parent, doc_id)
+
+    def collections(self) -> List["CollectionReference"]:
+        return [CollectionReference(self, path) for path, coll in self._collections.items()
+                if "/" not in path and coll.docs]
+
+    def batch(self) -> "WriteBatch":
+        return WriteBatch(self)
+
+    def get_all(self, references, field_paths: Optional[List[str]] = None, transaction=None) -> Iterator["DocumentSnapshot"]:
+        for ref in references:
+            yield ref.get(field_paths)
+
+    def async_client(self) -> "AsyncMemoryFirestore":
+        """Async view over the same data, for the asyncio seeding mode"""
+        return AsyncMemoryFirestore(self)
+
+    def close(self):
+        pass
+
+    def _commit(self, ops: List[Tuple[str, "DocumentReference", Any, bool]]) -> List["WriteResult"]:
+        with self._lock:
+            now = datetime.now(timezone.utc)
+            for kind, ref, data, merge in ops:
+                coll = self._collection(ref.parent_path)
+                old = coll.docs.get(ref.id)
+                if kind == "create" and old is not None:
+                    raise AlreadyExists(f"Document already exists: {ref.path}")
+                if kind == "update" and old is None:
+                    raise NotFound(f"No document to update: {ref.path}")
+            # Validated up front so a failing batch leaves the store untouched
+            for kind, ref, data, merge in ops:
+                coll = self._collection(ref.parent_path)
+                if kind == "delete":
+                    coll.put(ref.id, None, now)
+                    continue
+                old = coll.docs.get(ref.id)
+                if kind == "update":
+                    doc = _copy(old)
+                    for path, value in data.items():
+                        _apply(doc, path.split("."), value, now)
+                elif merge:
+                    doc = _copy(old) if old is not None else {}
+                    _merge(doc, data, now)
+                else:
+                    doc = {}
+                    _write(doc, data, now)
+                coll.put(ref.id, doc, now)
+            return [WriteResult(now) for _ in ops]
+
+
+class WriteResult:
+    def __init__(self, update_time: datetime):
+        self.update_time = update_time
+
+
+class WriteBatch:
+    def __init__(self, client: MemoryFirestore):
+        self._client = client
+        self._ops: List[Tuple[str, DocumentReference, Any, bool]] = []
+
+    def _add(self, kind: str, ref: "DocumentReference", data: Any = None, merge: bool = False):
+        if len(self._ops) >= MAX_BATCH_WRITES:
+            raise ValueError(f"A write batch can contain at most {MAX_BATCH_WRITES} writes")
+        self._ops.append((kind, ref, data, merge))
+
+    def set(self, reference, document_data: Dict[str, Any], merge: bool = False):
+        self._add("set", reference, document_data, bool(merge))
+
+    def create(self, reference, document_data: Dict[str, Any]):
+        self._add("create", reference, document_data)
+
+    def update(self, reference, field_updates: Dict[str, Any]):
+        self._add("update", reference, field_updates)
+
+    def delete(self, reference):
+        self._add("delete", reference)
+
+    def commit(self) -> List[WriteResult]:
+        ops, self._ops = self._ops, []
+        return self._client._commit(ops)
+
+    def __len__(self):
+        return len(self._ops)
+
+
+class DocumentSnapshot:
+    def __init__(self, reference: "DocumentReference", data: Optional[Dict[str, Any]],
+                 times: Optional[Tuple[datetime, datetime]] = None, field_paths: Optional[List[str]] = None):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self._field_paths = field_paths
+        self.create_time, self.update_time = times or (None, None)
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        if self._data is None:
+            return None
+        if self._field_paths is None:
+            return _copy(self._data)
+        projected: Dict[str, Any] = {}
+        for path in self._field_paths:
+            value = _get_field(self._data, path)
+            if value is not _MISSING:
+                _apply(projected, path.split("."), _copy(value), self.update_time)
+        return projected
+
+    def get(self, field_path: str) -> Any:
+        value = _get_field(self._data or {}, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return _copy(value)
+
+
+class DocumentReference:
+    def __init__(self, client: MemoryFirestore, parent_path: str, doc_id: str):
+        self._client = client
+        self.parent_path = parent_path
+        self.id = doc_id
+
+    @property
+    def path(self) -> str:
+        return f"{self.parent_path}/{self.id}"
+
+    @property
+    def parent(self) -> "CollectionReference":
+        return CollectionReference(self._client, self.parent_path)
+
+    def collection(self, name: str) -> "CollectionReference":
+        return CollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self, field_paths: Optional[List[str]] = None, transaction=None) -> DocumentSnapshot:
+        with self._client._lock:
+            coll = self._client._collection(self.parent_path)
+            return DocumentSnapshot(self, coll.docs.get(self.id), coll.times.get(self.id),
+                                    list(field_paths) if field_paths is not None else None)
+
+    def set(self, document_data: Dict[str, Any], merge: bool = False) -> WriteResult:
+        return self._client._commit([("set", self, document_data, bool(merge))])[0]
+
+    def create(self, document_data: Dict[str, Any]) -> WriteResult:
+        return self._client._commit([("create", self, document_data, False)])[0]
+
+    def update(self, field_updates: Dict[str, Any]) -> WriteResult:
+        return self._client._commit([("update", self, field_updates, False)])[0]
+
+    def delete(self) -> WriteResult:
+        return self._client._commit([("delete", self, None, False)])[0]
+
+    def __eq__(self, other):
+        return isinstance(other, DocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def __repr__(self):
+        return f"DocumentReference({self.path!r})"
+
+
+class AggregationResult:
+    def __init__(self, alias: str, value: int):
+        self.alias = alias
+        self.value = value
+
+
+class AggregationQuery:
+    def __init__(self, query: "Query", alias: str):
+        self._query = query
+        self._alias = alias
+
+    def get(self, transaction=None) -> List[List[AggregationResult]]:
+        return [[AggregationResult(self._alias, self._query._count())]]
+
+    def stream(self, transaction=None) -> Iterator[List[AggregationResult]]:
+        return iter(self.get())
+
+
+class Query:
+    """Immutable query; every builder method returns a new one, like the real client"""
+
+    ASCENDING = ASCENDING
+    DESCENDING = DESCENDING
+
+    def __init__(self, client: MemoryFirestore, path: str, filters: Tuple = (), orders: Tuple = (),
+                 limit: Optional[int] = None, offset: int = 0, projection: Optional[Tuple[str, ...]] = None,
+                 start: Optional[Tuple[Any, bool]] = None, end: Optional[Tuple[Any, bool]] = None):
+        self._client = client
+        self._path = path
+        self._filters = filters
+        self._orders = orders
+        self._limit = limit
+        self._offset = offset
+        self._projection = projection
+        self._start = start
+        self._end = end
+
+    def _copy_with(self, **changes) -> "Query":
+        fields = dict(filters=self._filters, orders=self._orders, limit=self._limit, offset=self._offset,
+                      projection=self._projection, start=self._start, end=self._end)
+        fields.update(changes)
+        return Query(self._client, self._path, **fields)
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value: Any = None,
+              filter=None) -> "Query":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if field_path == DOCUMENT_ID:
+            value = [v.id if isinstance(v, DocumentReference) else v for v in value] \
+                if op_string in ("in", "not-in") else (value.id if isinstance(value, DocumentReference) else value)
+        else:
+            value = _stored(value)
+        return self._copy_with(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path: str, direction: str = ASCENDING) -> "Query":
+        if direction not in (ASCENDING, DESCENDING):
+            raise ValueError(f"Invalid direction: {direction}")
+        return self._copy_with(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count: int) -> "Query":
+        return self._copy_with(limit=count)
+
+    def offset(self, num_to_skip: int) -> "Query":
+        return self._copy_with(offset=num_to_skip)
+
+    def select(self, field_paths) -> "Query":
+        return self._copy_with(projection=tuple(field_paths))
+
+    def start_at(self, document_fields_or_snapshot) -> "Query":
+        return self._copy_with(start=(document_fields_or_snapshot, True))
+
+    def start_after(self, document_fields_or_snapshot) -> "Query":
+        return self._copy_with(start=(document_fields_or_snapshot, False))
+
+    def end_at(self, document_fields_or_snapshot) -> "Query":
+        return self._copy_with(end=(document_fields_or_snapshot, True))
+
+    def end_before(self, document_fields_or_snapshot) -> "Query":
+        return self._copy_with(end=(document_fields_or_snapshot, False))
+
+    def count(self, alias: Optional[str] = None) -> AggregationQuery:
+        return AggregationQuery(self, alias or "field_1")
+
+    def stream(self, transaction=None) -> Iterator[DocumentSnapshot]:
+        return iter(self.get())
+
+    def get(self, transaction=None) -> List[DocumentSnapshot]:
+        with self._client._lock:
+            coll = self._client._collection(self._path)
+            projection = list(self._projection) if self._projection is not None else None
+            return [DocumentSnapshot(DocumentReference(self._client, self._path, doc_id), coll.docs[doc_id],
+                                     coll.times[doc_id], projection)
+                    for doc_id in self._result_ids(coll)]
+
+    # Execution
+
+    def _effective_orders(self) -> List[Tuple[str, str]]:
+        orders = list(self._orders)
+        ordered = {f for f, _ in orders}
+        # An inequality filter implicitly orders by its field first
+        for f, op, _ in self._filters:
+            if (op in RANGE_OPS or op in ("!=", "not-in")) and f not in ordered and not orders:
+                orders.append((f, ASCENDING))
+                ordered.add(f)
+        if DOCUMENT_ID not in ordered:
+            orders.append((DOCUMENT_ID, orders[-1][1] if orders else ASCENDING))
+        return orders
+
+    @staticmethod
+    def _matches(doc_id: str, doc: Dict[str, Any], field: str, op: str, value: Any) -> bool:
+        actual = doc_id if field == DOCUMENT_ID else _get_field(doc, field)
+        if actual is _MISSING:
+            return False
+        if op == "==":
+            return _sort_key(actual) == _sort_key(value)
+        if op == "!=":
+            return actual is not None and _sort_key(actual) != _sort_key(value)
+        if op == "in":
+            return _sort_key(actual) in {_sort_key(v) for v in value}
+        if op == "not-in":
+            return actual is not None and _sort_key(actual) not in {_sort_key(v) for v in value}
+        if op == "array-contains":
+            return isinstance(actual, list) and _sort_key(value) in {_sort_key(v) for v in actual}
+        if op == "array-contains-any":
+            return isinstance(actual, list) and bool({_sort_key(v) for v in value} & {_sort_key(v) for v in actual})
+        if op in RANGE_OPS:
+            a, b = _sort_key(actual), _sort_key(value)
+            if a[0] != b[0]:
+                return False
+            return {"<": a < b, "<=": a <= b, ">": a > b, ">=": a >= b}[op]
+        raise ValueError(f"Unsupported operator: {op}")
+
+    def _matching_ids(self, coll: _Collection) -> List[str]:
+        """Ids passing every filter; equality-style filters are answered from indexes"""
+        candidates: Optional[Set[str]] = None
+        rest = []
+        for f, op, value in self._filters:
+            if f != DOCUMENT_ID and op in ("==", "in", "array-contains", "array-contains-any"):
+                array = op.startswith("array")
+                index = coll.index(f, array)
+                values = value if op in ("in", "array-contains-any") else [value]
+                ids: Set[str] = set()
+                for v in values:
+                    ids |= index.get(_sort_key(v), set())
+                candidates = ids if candidates is None else candidates & ids
+            else:
+                rest.append((f, op, value))
+        pool = coll.docs.keys() if candidates is None else candidates
+        return [doc_id for doc_id in pool
+                if all(self._matches(doc_id, coll.docs[doc_id], f, op, v) for f, op, v in rest)]
+
+    @staticmethod
+    def _row_key(doc_id: str, doc: Dict[str, Any], orders: List[Tuple[str, str]]) -> Optional[Tuple]:
+        key = []
+        for f, direction in orders:
+            value = doc_id if f == DOCUMENT_ID else _get_field(doc, f)
+            if value is _MISSING:
+                return None
+            part = _sort_key(value)
+            key.append(_Desc(part) if direction == DESCENDING else part)
+        return tuple(key)
+
+    def _cursor_key(self, cursor: Any, orders: List[Tuple[str, str]]) -> Tuple:
+        if isinstance(cursor, DocumentSnapshot):
+            values = [cursor.id if f == DOCUMENT_ID else _get_field(cursor._data or {}, f) for f, _ in orders]
+        elif isinstance(cursor, dict):
+            values = []
+            for f, _ in orders:
+                value = _get_field(cursor, f)
+                if value is _MISSING:
+                    break
+                values.append(value)
+        else:
+            values = list(cursor)
+        key = []
+        for value, (f, direction) in zip(values, orders):
+            if isinstance(value, DocumentReference):
+                value = value.id
+            part = _sort_key(_stored(value))
+            key.append(_Desc(part) if direction == DESCENDING else part)
+        return tuple(key)
+
+    def _sorted(self, coll: _Collection, orders: List[Tuple[str, str]]) -> Tuple[List[Tuple], List[str]]:
+        cache_key = (tuple((f, op, _sort_key(v)) for f, op, v in self._filters), tuple(orders))
+        cached = coll.cache.get(cache_key)
+        if cached is None:
+            rows = []
+            for doc_id in self._matching_ids(coll):
+                key = self._row_key(doc_id, coll.docs[doc_id], orders)
+                if key is not None:
+                    rows.append((key, doc_id))
+            rows.sort(key=itemgetter(0))
+            fields = {f for f, _, _ in self._filters} | {f for f, _ in orders}
+            fields.discard(DOCUMENT_ID)
+            cached = (fields, [key for key, _ in rows], [doc_id for _, doc_id in rows])
+            if len(coll.cache) >= QUERY_CACHE_SIZE:
+                coll.cache.pop(next(iter(coll.cache)))
+            coll.cache[cache_key] = cached
+        return cached[1], cached[2]
+
+    def _result_ids(self, coll: _Collection) -> List[str]:
+        orders = self._effective_orders()
+        keys, ids = self._sorted(coll, orders)
+        lo, hi = 0, len(ids)
+        if self._start is not None:
+            cursor, inclusive = self._start
+            target = self._cursor_key(cursor, orders)
+            prefix = len(target)
+            search = bisect.bisect_left if inclusive else bisect.bisect_right
+            lo = search(keys, target, key=lambda k: k[:prefix])
+        if self._end is not None:
+            cursor, inclusive = self._end
+            target = self._cursor_key(cursor, orders)
+            prefix = len(target)
+            search = bisect.bisect_right if inclusive else bisect.bisect_left
+            hi = search(keys, target, key=lambda k: k[:prefix])
+        lo += self._offset
+        if self._limit is not None:
+            hi = min(hi, lo + self._limit)
+        return ids[lo:hi]
+
+    def _count(self) -> int:
+        with self._client._lock:
+            coll = self._client._collection(self._path)
+            if self._start is None and self._end is None and not self._orders:
+                matched = len(self._matching_ids(coll)) - self._offset
+                return max(0, matched if self._limit is None else min(matched, self._limit))
+            return len(self._result_ids(coll))
+
+
+class CollectionReference(Query):
+    def __init__(self, client: MemoryFirestore, path: str):
+        super().__init__(client, path)
+
+    @property
+    def id(self) -> str:
+        return self._path.rpartition("/")[2]
+
+    @property
+    def parent(self) -> Optional[DocumentReference]:
+        if "/" not in self._path:
+            return None
+        return self._client.document(self._path.rpartition("/")[0])
+
+    def document(self, document_id: Optional[str] = None) -> DocumentReference:
+        if document_id is None:
+            document_id = "".join(random.choices(string.ascii_letters + string.digits, k=20))
+        return DocumentReference(self._client, self._path, document_id)
+
+    def add(self, document_data: Dict[str, Any], document_id: Optional[str] = None) -> Tuple[datetime, DocumentReference]:
+        ref = self.document(document_id)
+        return ref.create(document_data).update_time, ref
+
+    def list_documents(self) -> List[DocumentReference]:
+        with self._client._lock:
+            return [DocumentReference(self._client, self._path, doc_id)
+                    for doc_id in sorted(self._client._collection(self._path).docs)]
+
+
+class _AsyncWriteBatch(WriteBatch):
+    async def commit(self) -> List[WriteResult]:
+        return WriteBatch.commit(self)
+
+
+class AsyncMemoryFirestore:
+    """Async batch writes over a MemoryFirestore; references and queries stay synchronous"""
+
+    def __init__(self, client: MemoryFirestore):
+        self._client = client
+
+    def collection(self, path: str) -> CollectionReference:
+        return self._client.collection(path)
+
+    def batch(self) -> _AsyncWriteBatch:
+        return _AsyncWriteBatch(self._client)
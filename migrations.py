@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Checkpointed data migrations for Debattle.
+Runs per-document transforms over a collection in parallel, rate-limited batches and resumes from the last saved cursor.
+"""
+
+import argparse
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from firestore_io import BatchWriter, RateLimiter, Throughput, count_documents, format_eta, iter_pages
+
+STATE_COLLECTION = "system"
+STATE_DOC = "migrations"
+
+# Returned by a transform to delete the document
+DELETE = object()
+
+# transform(doc_id, data) -> None to leave the document alone, DELETE, or a dict of field updates
+Transform = Callable[[str, Dict[str, Any]], Any]
+
+
+@dataclass(frozen=True)
+class Migration:
+    name: str
+    collection: str
+    transform: Transform
+    description: str = ""
+    # Fields the transform reads; None reads whole documents
+    field_paths: Optional[List[str]] = None
+    # Narrows the scan, e.g. lambda q: q.where("status", "==", "completed"); must not add an order_by
+    where: Optional[Callable[[Any], Any]] = None
+
+    def scan(self, db):
+        """The narrowed, projected collection without an order"""
+        query = db.collection(self.collection)
+        if self.field_paths is not None:
+            query = query.select(self.field_paths)
+        if self.where is not None:
+            query = self.where(query)
+        return query
+
+    def query(self, db):
+        return self.scan(db).order_by("__name__")
+
+
+MIGRATIONS: Dict[str, Migration] = {}
+
+
+def migration(name: str, collection: str, description: str = "", field_paths: Optional[List[str]] = None,
+              where: Optional[Callable[[Any], Any]] = None):
+    """Register a transform as a named migration"""
+    def register(transform: Transform) -> Transform:
+        MIGRATIONS[name] = Migration(name, collection, transform, description, field_paths, where)
+        return transform
+    return register
+
+
+@migration("cleanup_old_queue_entries", "matchmakingQueue",
+           "delete queue entries written before username and matchFound existed (cleanupOldQueueEntries)",
+           field_paths=["username", "matchFound"])
+def cleanup_old_queue_entries(doc_id: str, data: Dict[str, Any]):
+    if not data.get("username") or "matchFound" not in data:
+        return DELETE
+    return None
+
+
+def load_states(db) -> Dict[str, Dict[str, Any]]:
+    snap = db.collection(STATE_COLLECTION).document(STATE_DOC).get()
+    return (snap.to_dict() or {}) if snap.exists else {}
+
+
+def save_state(db, name: str, state: Dict[str, Any]):
+    db.collection(STATE_COLLECTION).document(STATE_DOC).set({name: state}, merge=True)
+
+
+def run_migration(db, m: Migration, page_size: int = 1000, batch_size: int = 250, max_in_flight: int = 4,
+                  writes_per_sec: float = 500.0, dry_run: bool = False, restart: bool = False) -> Dict[str, Any]:
+    """
+    Apply a migration from its saved cursor to the end of the collection.
+
+    Each page's writes are committed before the cursor (the page's last document
+    id) is saved, so a crash repeats at most one page of idempotent writes. The
+    remaining count comes from a count aggregation and drives the ETA.
+    """
+    state = {} if restart else load_states(db).get(m.name, {})
+    if state.get("status") == "done":
+        print(f"    ℹ️  {m.name} already applied on {state.get('finishedAt')}")
+        return state
+
+    query = m.query(db)
+    cursor = state.get("cursor")
+    start_after = {"__name__": db.collection(m.collection).document(cursor)} if cursor else None
+    remaining = count_documents(query.start_after(start_after) if start_after else query)
+    print(f"🔧 Migrating {m.collection}: {m.name} ({remaining:,} documents to scan"
+          + (f", resuming after {cursor})" if cursor else ")"))
+
+    state = {"status": "running", "processed": state.get("processed", 0), "changed": state.get("changed", 0),
+             "cursor": cursor, "startedAt": state.get("startedAt") or datetime.now(timezone.utc)}
+    limiter = RateLimiter(writes_per_sec)
+    progress = Throughput(m.name)
+    last_report = time.perf_counter()
+    writer = None if dry_run else BatchWriter(db, batch_size=batch_size, max_in_flight=max_in_flight, label=m.name)
+    try:
+        for page in iter_pages(query, page_size, start_after):
+            for snap in page:
+                result = m.transform(snap.id, snap.to_dict() or {})
+                if result is None:
+                    continue
+                state["changed"] += 1
+                if writer:
+                    limiter.acquire()
+                    if result is DELETE:
+                        writer.delete(m.collection, snap.id)
+                    else:
+                        writer.update(m.collection, snap.id, result)
+            if writer:
+                writer.flush()
+            state["processed"] += len(page)
+            state["cursor"] = page[-1].id
+            if not dry_run:
+                save_state(db, m.name, state)
+            progress.add(len(page))
+            if time.perf_counter() - last_report >= 5.0:
+                last_report = time.perf_counter()
+                print(f"    … {progress.count:,}/{remaining:,} docs, {state['changed']:,} changed "
+                      f"({progress.rate:,.0f} docs/sec, ETA {format_eta(remaining - progress.count, progress.rate)})")
+    finally:
+        if writer:
+            writer.close()
+
+    state.update({"status": "done", "finishedAt": datetime.now(timezone.utc)})
+    if not dry_run:
+        save_state(db, m.name, state)
+    action = "Would change" if dry_run else "Changed"
+    print(f"    ✓ {action} {state['changed']:,} of {state['processed']:,} documents "
+          f"({progress.rate:,.0f} docs/sec)")
+    return state
+
+
+def run_pending(db, names: Optional[List[str]] = None, **options) -> List[Dict[str, Any]]:
+    """Run the named migrations (all registered ones by default) that have not finished"""
+    unknown = [name for name in names or [] if name not in MIGRATIONS]
+    if unknown:
+        raise ValueError(f"Unknown migration {', '.join(unknown)}; expected one of {', '.join(MIGRATIONS)}")
+    return [run_migration(db, MIGRATIONS[name], **options) for name in names or sorted(MIGRATIONS)]
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Run checkpointed Debattle data migrations")
+    parser.add_argument("names", nargs="*", help="migrations to run (default: every pending one)")
+    parser.add_argument("--list", action="store_true", help="show registered migrations and their status")
+    parser.add_argument("--restart", action="store_true", help="ignore saved progress and scan from the start")
+    parser.add_argument("--dry-run", action="store_true", help="count changes without writing")
+    parser.add_argument("--writes-per-sec", type=float, default=500.0, help="write rate limit (0 for none)")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=250)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    args = parser.parse_args(argv)
+
+    from initialize_firestore import connect
+    db = connect(args.emulator)
+    if args.list:
+        states = load_states(db)
+        for name, m in sorted(MIGRATIONS.items()):
+            state = states.get(name, {})
+            print(f"    • {name} [{state.get('status', 'pending')}] {m.collection}: {m.description}")
+        return
+    run_pending(db, args.names, page_size=args.page_size, batch_size=args.batch_size,
+                max_in_flight=args.max_in_flight, writes_per_sec=args.writes_per_sec,
+                dry_run=args.dry_run, restart=args.restart)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Rating history and head-to-head index for Debattle.
+Keeps one delta-encoded rating series per user and one record per pair of opponents, so profile and rivalry pages need one read.
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from firestore_io import (BatchWriter, DEFAULT_PAGE_SIZE, Throughput, Through, advance_through, get_documents,
+                          is_new, iter_pages)
+from ratings import debate_winner
+
+STATE_COLLECTION = "system"
+STATE_DOC = "ratingIndex"
+HISTORY_COLLECTION = "ratingHistory"
+HEAD_TO_HEAD_COLLECTION = "headToHead"
+
+DEBATE_FIELDS = ["status", "participants", "winner", "judgment.winner", "ended_at", "ratingChanges"]
+
+# Results are kept as one character per game, from the document owner's (or first player's) side
+WIN, LOSS, TIE = "W", "L", "D"
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def encode_varints(values: Iterable[int]) -> bytes:
+    """Zigzag LEB128 varints: small magnitudes of either sign take one byte"""
+    out = bytearray()
+    for value in values:
+        n = value * 2 if value >= 0 else -value * 2 - 1
+        while n >= 0x80:
+            out.append(n & 0x7F | 0x80)
+            n >>= 7
+        out.append(n)
+    return bytes(out)
+
+
+def decode_varints(data: bytes) -> List[int]:
+    values, n, shift = [], 0, 0
+    for byte in data:
+        n |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            values.append(n >> 1 if not n & 1 else -(n >> 1) - 1)
+            n, shift = 0, 0
+    return values
+
+
+def encode_deltas(values: Iterable[int], previous: int = 0) -> bytes:
+    """Varints of the differences between consecutive values, starting from `previous`"""
+    deltas = []
+    for value in values:
+        deltas.append(value - previous)
+        previous = value
+    return encode_varints(deltas)
+
+
+def decode_deltas(data: bytes) -> List[int]:
+    values, total = [], 0
+    for delta in decode_varints(data):
+        total += delta
+        values.append(total)
+    return values
+
+
+def pair_id(uid_a: str, uid_b: str) -> str:
+    """Head-to-head document id: the two user ids sorted, so both players map to the same document"""
+    return "__".join(sorted((uid_a, uid_b)))
+
+
+class Game(NamedTuple):
+    key: Tuple[datetime, str]
+    # (user id, rating before, rating after, result) for each participant
+    players: List[Tuple[str, int, int, str]]
+
+
+def game_from(debate_id: str, debate: Dict[str, Any]) -> Optional[Game]:
+    """The rating-relevant facts of a completed 1v1 debate"""
+    participants = debate.get("participants") or []
+    if debate.get("status") != "completed" or len(participants) != 2 or not debate.get("ended_at"):
+        return None
+    winner = debate_winner(debate)
+    changes = debate.get("ratingChanges") or {}
+    players = []
+    for p in participants:
+        uid, before = p.get("userId"), int(p.get("rating", 0))
+        result = TIE if winner is None else WIN if winner == uid else LOSS
+        players.append((uid, before, before + int(changes.get(uid, 0)), result))
+    return Game((_utc(debate["ended_at"]), debate_id), players)
+
+
+def append_history(doc: Dict[str, Any], uid: str, games: List[Game]) -> Optional[Dict[str, Any]]:
+    """
+    The user's ratingHistory document with these games appended, or None if all were folded before.
+
+    `ratings` decodes to the rating before the first game followed by the rating
+    after each game, `times` to each game's end in epoch seconds and `results`
+    holds one W/L/D per game. New games are appended as bytes without decoding.
+    """
+    mark = Through.from_stored(doc.get("through"))
+    games = [g for g in games if is_new(g.key, mark)]
+    if not games:
+        return None
+    doc = dict(doc) if doc.get("games") else {"userId": uid, "games": 0, "ratings": b"", "times": b"", "results": ""}
+    ratings, times = [], []
+    for game in games:
+        _, before, after, result = next(p for p in game.players if p[0] == uid)
+        if not doc["games"] and not ratings:
+            ratings.append(before)
+        ratings.append(after)
+        times.append(int(game.key[0].timestamp()))
+        doc["results"] += result
+    doc["ratings"] = bytes(doc["ratings"]) + encode_deltas(ratings, doc.get("rating", 0))
+    doc["times"] = bytes(doc["times"]) + encode_deltas(times, doc.get("lastPlayed", 0))
+    doc.update({"games": doc["games"] + len(games), "rating": ratings[-1], "lastPlayed": times[-1],
+                "through": advance_through(mark, (g.key for g in games))})
+    return doc
+
+
+def append_head_to_head(doc: Dict[str, Any], pid: str, games: List[Game]) -> Optional[Dict[str, Any]]:
+    """The pair's headToHead document with these games added, or None if all were folded before"""
+    mark = Through.from_stored(doc.get("through"))
+    games = [g for g in games if is_new(g.key, mark)]
+    if not games:
+        return None
+    if doc.get("games"):
+        doc = {**doc, "wins": dict(doc["wins"]), "ratingChange": dict(doc["ratingChange"])}
+    else:
+        players = sorted(p[0] for p in games[0].players)
+        doc = {"players": players, "games": 0, "draws": 0, "results": "",
+               "wins": {uid: 0 for uid in players}, "ratingChange": {uid: 0 for uid in players}}
+    first = doc["players"][0]
+    for game in games:
+        for uid, before, after, result in game.players:
+            doc["ratingChange"][uid] = doc["ratingChange"].get(uid, 0) + after - before
+            if result == WIN:
+                doc["wins"][uid] = doc["wins"].get(uid, 0) + 1
+            if uid == first:
+                doc["results"] += result
+        doc["draws"] += all(p[3] == TIE for p in game.players)
+    doc.update({"games": doc["games"] + len(games), "lastPlayed": games[-1].key[0],
+                "through": advance_through(mark, (g.key for g in games))})
+    return doc
+
+
+def decode_history(doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """A ratingHistory document as the app's RatingPoint list (date, rating, change, reason)"""
+    ratings, times = decode_deltas(doc.get("ratings") or b""), decode_deltas(doc.get("times") or b"")
+    reasons = {WIN: "win", LOSS: "loss", TIE: "draw"}
+    return [{"date": datetime.fromtimestamp(t, timezone.utc), "rating": after, "change": after - before,
+             "reason": reasons.get(result, "")}
+            for t, before, after, result in zip(times, ratings, ratings[1:], doc.get("results", ""))]
+
+
+def load_watermark(db) -> Tuple[Optional[datetime], List[str]]:
+    """Stored watermark and the ids of the debates already folded at exactly that time"""
+    snap = db.collection(STATE_COLLECTION).document(STATE_DOC).get()
+    state = (snap.to_dict() or {}) if snap.exists else {}
+    watermark = state.get("watermark")
+    return (_utc(watermark) if watermark else None), state.get("watermarkIds", [])
+
+
+def save_watermark(db, watermark: datetime, ids: List[str], debates: int):
+    db.collection(STATE_COLLECTION).document(STATE_DOC).set({
+        "watermark": watermark,
+        "watermarkIds": sorted(ids),
+        "lastRun": datetime.now(timezone.utc),
+        "lastRunDebates": debates
+    }, merge=True)
+
+
+def update_index(db, rebuild: bool = False, page_size: int = DEFAULT_PAGE_SIZE, dry_run: bool = False,
+                 max_in_flight: int = 8) -> Dict[str, Any]:
+    """
+    Fold debates that ended since the watermark into ratingHistory and headToHead.
+
+    With rebuild every completed debate is read and the documents are written from
+    scratch, which is also how the index is backfilled. Each document records its
+    newest game time and every debate folded at that time, so a run interrupted
+    before the watermark moves never appends a game twice and a debate written
+    late at the same time is still appended.
+    """
+    since, seen = (None, []) if rebuild else load_watermark(db)
+    if since is None and not rebuild:
+        raise ValueError("the rating index has not been built yet; run with --rebuild first")
+
+    query = db.collection("debates").select(DEBATE_FIELDS)
+    if since:
+        query = query.where("ended_at", ">=", since)
+        print(f"📉 Indexing debates that ended since {since.isoformat()}...")
+    else:
+        print("📉 Rebuilding the rating history and head-to-head index from every debate...")
+    query = query.order_by("ended_at").order_by("__name__")
+    progress = Throughput("debates", report_every=5.0)
+    users: Dict[str, List[Game]] = {}
+    pairs: Dict[str, List[Game]] = {}
+    skip = set(seen)
+    watermark, at_watermark = since, list(seen)
+    debates = 0
+    for page in iter_pages(query, page_size):
+        for snap in page:
+            if snap.id in skip:
+                continue
+            game = game_from(snap.id, snap.to_dict() or {})
+            if game is None:
+                continue
+            if watermark is None or game.key[0] > watermark:
+                watermark, at_watermark = game.key[0], []
+            at_watermark.append(snap.id)
+            for uid, *_ in game.players:
+                users.setdefault(uid, []).append(game)
+            pairs.setdefault(pair_id(game.players[0][0], game.players[1][0]), []).append(game)
+            debates += 1
+        progress.add(len(page))
+
+    def stored(collection: str, ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        if rebuild:
+            return {}
+        return {s.id: s.to_dict() or {} for s in get_documents(db, collection, sorted(ids)) if s.exists}
+
+    written = {"histories": 0, "pairs": 0}
+    writer = None if dry_run else BatchWriter(db, max_in_flight=max_in_flight, label="rating index")
+    for collection, groups, append, count in ((HISTORY_COLLECTION, users, append_history, "histories"),
+                                              (HEAD_TO_HEAD_COLLECTION, pairs, append_head_to_head, "pairs")):
+        existing = stored(collection, groups)
+        for doc_id, games in groups.items():
+            doc = append(existing.get(doc_id, {}), doc_id, games)
+            if doc is None:
+                continue
+            written[count] += 1
+            if writer:
+                writer.set(collection, doc_id, {**doc, "updatedAt": datetime.now(timezone.utc)})
+    if writer:
+        writer.close()
+        if watermark:
+            save_watermark(db, watermark, at_watermark, debates)
+
+    action = "Would write" if dry_run else "Wrote"
+    print(f"    ✓ Folded {debates:,} debates; {action.lower()} {written['histories']:,} rating histories and "
+          f"{written['pairs']:,} head-to-head records ({progress.rate:,.0f} debates/sec)")
+    return {"debates": debates, **written, "watermark": watermark}
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Maintain Debattle rating histories and head-to-head records")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild (or backfill) from every debate")
+    parser.add_argument("--show", nargs="+", metavar="UID", help="print one user's history, or two users' record")
+    parser.add_argument("--dry-run", action="store_true", help="count what would change without writing")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    args = parser.parse_args(argv)
+
+    from initialize_firestore import connect
+    db = connect(args.emulator)
+    if args.show:
+        if len(args.show) == 1:
+            snap = db.collection(HISTORY_COLLECTION).document(args.show[0]).get()
+            for point in decode_history((snap.to_dict() or {}) if snap.exists else {}):
+                print(f"    • {point['date']:%Y-%m-%d %H:%M} {point['rating']:>5} ({point['change']:+d}, {point['reason']})")
+        else:
+            snap = db.collection(HEAD_TO_HEAD_COLLECTION).document(pair_id(*args.show[:2])).get()
+            record = (snap.to_dict() or {}) if snap.exists else {}
+            print(f"    • {record.get('games', 0)} games: {record.get('wins', {})}, {record.get('draws', 0)} draws")
+        return
+    update_index(db, args.rebuild, args.page_size, args.dry_run, args.max_in_flight)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Rating index update failed: {e}")
+        sys.exit(1)
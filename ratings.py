@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Rating rules shared by the Debattle data scripts.
+Mirrors src/services/debate/elo-calculator.ts and the tier mapping in src/stores/leaderboardStore.ts.
+"""
+
+import math
+from typing import Optional, Tuple
+
+K_FACTOR = 32
+
+# Lower bound of each tier, highest first (see getTierFromRating)
+TIER_THRESHOLDS = [
+    (2000, "master"),
+    (1800, "diamond"),
+    (1600, "platinum"),
+    (1400, "gold"),
+    (1200, "silver"),
+    (0, "bronze"),
+]
+
+DRAW = "Draw"
+
+
+def tier_for_rating(rating: float) -> str:
+    """Map a rating to its leaderboard tier"""
+    for threshold, tier in TIER_THRESHOLDS:
+        if rating >= threshold:
+            return tier
+    return TIER_THRESHOLDS[-1][1]
+
+
+def js_round(value: float) -> int:
+    """Round half up like Math.round so results match the TypeScript client"""
+    return math.floor(value + 0.5)
+
+
+def expected_score(player_rating: float, opponent_rating: float) -> float:
+    """Expected score between 0 and 1 for a player against an opponent"""
+    return 1 / (1 + 10 ** ((opponent_rating - player_rating) / 400))
+
+
+def rating_changes(player_rating: int, opponent_rating: int, player_score: float,
+                   k_factor: float = K_FACTOR) -> Tuple[int, int]:
+    """Rating deltas for both sides of a 1v1 debate (score: 1 win, 0.5 draw, 0 loss)"""
+    expected = expected_score(player_rating, opponent_rating)
+    new_player = max(0, js_round(player_rating + k_factor * (player_score - expected)))
+    new_opponent = max(0, js_round(opponent_rating + k_factor * ((1 - player_score) - (1 - expected))))
+    return new_player - player_rating, new_opponent - opponent_rating
+
+
+def debate_winner(debate: dict) -> Optional[str]:
+    """Winner user id of a debate, or None for a draw or an unjudged debate"""
+    winner = debate.get("winner") or (debate.get("judgment") or {}).get("winner")
+    if not winner or winner == DRAW:
+        return None
+    return winner
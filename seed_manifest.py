@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Seed manifest for incremental Debattle seeding.
+Keeps a content hash per seeded document in the system collection so re-runs only write what changed.
+"""
+
+import hashlib
+import json
+import math
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+MANIFEST_COLLECTION = "system"
+MANIFEST_DOC = "seedManifest"
+
+# Hashes per shard document; ~45 bytes per entry keeps shards well under the 1 MiB limit
+SHARD_CAPACITY = 15000
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Cannot hash value of type {type(value).__name__}")
+
+
+def content_hash(doc: Dict[str, Any]) -> str:
+    """Stable hash of a document's content, independent of key order"""
+    encoded = json.dumps(doc, sort_keys=True, separators=(",", ":"), default=_canonical, ensure_ascii=False)
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _shard_of(doc_id: str, shards: int) -> int:
+    return zlib.crc32(doc_id.encode("utf-8")) % shards
+
+
+def _shard_doc_id(collection: str, shard: int) -> str:
+    return f"{MANIFEST_DOC}_{collection}_{shard:04d}"
+
+
+class SeedManifest:
+    """
+    Content hashes of everything the initializer wrote, split into shard docs.
+
+    Loading costs one read per shard; a re-run compares each desired document
+    against its stored hash and only new or changed documents are written.
+    """
+
+    def __init__(self, anchor: Optional[datetime] = None,
+                 hashes: Optional[Dict[str, Dict[str, str]]] = None,
+                 shards: Optional[Dict[str, int]] = None):
+        # Reference time the fixtures are generated relative to, so timestamps are stable across runs
+        self.anchor = anchor or datetime.utcnow()
+        self.previous = hashes or {}
+        self.previous_shards = shards or {}
+        self.current: Dict[str, Dict[str, str]] = {}
+
+    @classmethod
+    def load(cls, db) -> "SeedManifest":
+        header = db.collection(MANIFEST_COLLECTION).document(MANIFEST_DOC).get()
+        if not header.exists:
+            return cls()
+        data = header.to_dict()
+        anchor = data.get("anchor")
+        if isinstance(anchor, datetime) and anchor.tzinfo is not None:
+            anchor = anchor.replace(tzinfo=None)
+        shards = data.get("shards", {})
+        hashes: Dict[str, Dict[str, str]] = {}
+        for collection, count in shards.items():
+            hashes[collection] = {}
+            refs = [db.collection(MANIFEST_COLLECTION).document(_shard_doc_id(collection, k)) for k in range(count)]
+            for snap in db.get_all(refs):
+                if snap.exists:
+                    hashes[collection].update(snap.to_dict().get("hashes", {}))
+        return cls(anchor, hashes, shards)
+
+    def needs_write(self, collection: str, doc_id: str, doc: Dict[str, Any]) -> bool:
+        """Record the desired document and report whether it differs from what was seeded"""
+        digest = content_hash(doc)
+        self.current.setdefault(collection, {})[doc_id] = digest
+        return self.previous.get(collection, {}).get(doc_id) != digest
+
+    def removed(self, collection: str) -> List[str]:
+        """Documents seeded last time that are no longer in the desired state"""
+        wanted = self.current.get(collection, {})
+        return [doc_id for doc_id in self.previous.get(collection, {}) if doc_id not in wanted]
+
+    def forget(self, collection: str, doc_ids: List[str]):
+        """Keep pruned-away documents out of the saved manifest"""
+        for doc_id in doc_ids:
+            self.current.get(collection, {}).pop(doc_id, None)
+
+    def keep_removed(self, collection: str, doc_ids: List[str]):
+        """Keep documents that were not pruned in the manifest so a later --prune still sees them"""
+        previous = self.previous.get(collection, {})
+        current = self.current.setdefault(collection, {})
+        for doc_id in doc_ids:
+            current[doc_id] = previous[doc_id]
+
+    def _shards(self, hashes: Dict[str, Dict[str, str]], shards: Dict[str, int]) -> Iterator[Tuple[str, int, Dict[str, str]]]:
+        for collection, entries in hashes.items():
+            count = shards[collection]
+            split: List[Dict[str, str]] = [{} for _ in range(count)]
+            for doc_id, digest in entries.items():
+                split[_shard_of(doc_id, count)][doc_id] = digest
+            for shard, content in enumerate(split):
+                yield collection, shard, content
+
+    def save(self, writer) -> int:
+        """Queue the shard docs that changed plus the header; returns the number of shard writes"""
+        shards = {collection: max(1, math.ceil(len(entries) / SHARD_CAPACITY))
+                  for collection, entries in self.current.items()}
+        old = {(c, k): content for c, k, content in self._shards(self.previous, self.previous_shards)}
+        written = 0
+        for collection, shard, content in self._shards(self.current, shards):
+            if old.pop((collection, shard), None) != content:
+                writer.set(MANIFEST_COLLECTION, _shard_doc_id(collection, shard), {"hashes": content})
+                written += 1
+        for collection, shard in old:
+            writer.delete(MANIFEST_COLLECTION, _shard_doc_id(collection, shard))
+        header = {"anchor": self.anchor, "shards": shards}
+        if written or old or shards != self.previous_shards:
+            writer.set(MANIFEST_COLLECTION, MANIFEST_DOC, header)
+        return written
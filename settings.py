@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Typed, cached access to Debattle's system/settings document.
+Validates the document into frozen dataclasses and serves them from an in-process cache refreshed by TTL or listener.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Optional
+
+from ratings import K_FACTOR
+
+SETTINGS_COLLECTION = "system"
+SETTINGS_DOC = "settings"
+VERSION_FIELD = "settings_version"
+
+# Longest time a cached value is served before the document is read again
+DEFAULT_TTL = 60.0
+
+
+def _coerce(section: str, name: str, kind: type, value: Any) -> Any:
+    if kind is bool:
+        if not isinstance(value, bool):
+            raise ValueError(f"{section}.{name} must be true or false, got {value!r}")
+        return value
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{section}.{name} must be a number, got {value!r}")
+    if kind is int:
+        if value != int(value):
+            raise ValueError(f"{section}.{name} must be a whole number, got {value!r}")
+        return int(value)
+    return float(value)
+
+
+class _Section:
+    """Frozen dataclass built from one map of the settings document over the field defaults"""
+
+    SECTION = ""
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]):
+        data = data or {}
+        return cls(**{f.name: _coerce(cls.SECTION, f.name, f.type, data[f.name])
+                      for f in fields(cls) if f.name in data})
+
+    def _check(self, ok: bool, message: str):
+        if not ok:
+            raise ValueError(f"{self.SECTION}.{message}")
+
+
+@dataclass(frozen=True)
+class EloSettings(_Section):
+    SECTION = "elo_settings"
+    starting_rating: int = 1200
+    k_factor: int = K_FACTOR
+    min_rating: int = 100
+    max_rating: int = 3000
+    provisional_games: int = 10
+
+    def __post_init__(self):
+        self._check(self.k_factor > 0, f"k_factor must be positive, got {self.k_factor}")
+        self._check(self.min_rating < self.max_rating, "min_rating must be below max_rating")
+        self._check(self.min_rating <= self.starting_rating <= self.max_rating,
+                    "starting_rating must lie between min_rating and max_rating")
+        self._check(self.provisional_games >= 0, "provisional_games cannot be negative")
+
+
+@dataclass(frozen=True)
+class DebateSettings(_Section):
+    SECTION = "debate_settings"
+    max_argument_length: int = 1000
+    max_arguments_per_side: int = 5
+    debate_time_limit: int = 3600
+    auto_judge_enabled: bool = True
+    max_spectators: int = 50
+
+    def __post_init__(self):
+        for name in ("max_argument_length", "max_arguments_per_side", "debate_time_limit"):
+            self._check(getattr(self, name) > 0, f"{name} must be positive")
+        self._check(self.max_spectators >= 0, "max_spectators cannot be negative")
+
+
+@dataclass(frozen=True)
+class GamificationSettings(_Section):
+    SECTION = "gamification"
+    xp_per_win: int = 100
+    xp_per_loss: int = 25
+    xp_per_draw: int = 50
+    level_multiplier: float = 1.5
+    streak_bonus: float = 0.1
+
+    def __post_init__(self):
+        for name in ("xp_per_win", "xp_per_loss", "xp_per_draw", "streak_bonus"):
+            self._check(getattr(self, name) >= 0, f"{name} cannot be negative")
+        self._check(self.level_multiplier > 0, "level_multiplier must be positive")
+
+
+@dataclass(frozen=True)
+class Settings:
+    elo: EloSettings = field(default_factory=EloSettings)
+    debate: DebateSettings = field(default_factory=DebateSettings)
+    gamification: GamificationSettings = field(default_factory=GamificationSettings)
+    version: int = 0
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "Settings":
+        """Validate a system/settings document; missing sections and fields take their defaults"""
+        data = data or {}
+        return cls(EloSettings.from_dict(data.get("elo_settings")),
+                   DebateSettings.from_dict(data.get("debate_settings")),
+                   GamificationSettings.from_dict(data.get("gamification")),
+                   int(data.get(VERSION_FIELD) or 0))
+
+
+class SettingsCache:
+    """
+    Serves Settings from memory, reading system/settings at most once per TTL.
+
+    When the TTL runs out the document is read again and re-validated if its
+    update time moved, so any edit is seen within one TTL whether or not
+    settings_version was bumped. With listen=True a snapshot listener replaces
+    the value as soon as the document changes (clients without listeners fall
+    back to the TTL). An invalid document never replaces a valid one.
+    """
+
+    def __init__(self, db, ttl: float = DEFAULT_TTL, listen: bool = False):
+        self.db = db
+        self.ttl = ttl
+        self._settings: Optional[Settings] = None
+        self._update_time = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._watch = None
+        if listen and hasattr(self._ref(), "on_snapshot"):
+            self._watch = self._ref().on_snapshot(self._on_snapshot)
+
+    def _ref(self):
+        return self.db.collection(SETTINGS_COLLECTION).document(SETTINGS_DOC)
+
+    def _on_snapshot(self, snapshots, changes, read_time):
+        for snap in snapshots:
+            try:
+                self._store(snap)
+            except ValueError as e:
+                # Runs on the listener's thread: keep serving the last good value (get() reports it if none)
+                print(f"    ℹ️  Ignoring invalid system/settings: {e}")
+
+    def _store(self, snap) -> Settings:
+        update_time = snap.update_time if snap.exists else None
+        try:
+            settings = Settings.from_dict((snap.to_dict() or {}) if snap.exists else {})
+        except ValueError as e:
+            if self._settings is None:
+                raise
+            print(f"    ℹ️  Ignoring invalid system/settings: {e}")
+            with self._lock:
+                self._update_time, self._checked = update_time, time.monotonic()
+            return self._settings
+        with self._lock:
+            self._settings, self._update_time, self._checked = settings, update_time, time.monotonic()
+        return settings
+
+    def get(self) -> Settings:
+        settings = self._settings
+        if settings is not None and (self._watch is not None or time.monotonic() - self._checked < self.ttl):
+            return settings
+        snap = self._ref().get()
+        if (settings is not None and snap.exists and snap.update_time is not None
+                and snap.update_time == self._update_time):
+            with self._lock:
+                self._checked = time.monotonic()
+            return settings
+        return self._store(snap)
+
+    def invalidate(self):
+        """Force a full re-read on the next get()"""
+        with self._lock:
+            self._settings = None
+
+    def close(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+
+# Keyed by id(client); each cache holds its client, so an id is never reused while cached
+_caches: Dict[int, SettingsCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_settings(db, ttl: float = DEFAULT_TTL) -> Settings:
+    """Settings for a client from its process-wide cache"""
+    with _caches_lock:
+        cache = _caches.get(id(db))
+        if cache is None:
+            cache = _caches[id(db)] = SettingsCache(db, ttl)
+    return cache.get()
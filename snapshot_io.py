@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Snapshot export/import for the Debattle seed dataset.
+Streams collections to gzip-compressed NDJSON one page at a time and bulk-loads them back.
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from firestore_io import BatchWriter, DEFAULT_PAGE_SIZE, MAX_BATCH_OPS, iter_documents, keyed_records
+
+SNAPSHOT_COLLECTIONS = ['users', 'topics', 'achievements', 'debates', 'leaderboard', 'system']
+SNAPSHOT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+def _encode_default(value: Any) -> Any:
+    """Tag values JSON cannot represent so they survive the round trip"""
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if isinstance(value, (bytes, bytearray)):
+        return {"$bytes": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"Cannot snapshot value of type {type(value).__name__}")
+
+
+def _decode_hook(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1:
+        if "$date" in obj:
+            return datetime.fromisoformat(obj["$date"])
+        if "$bytes" in obj:
+            return base64.b64decode(obj["$bytes"])
+    return obj
+
+
+_encoder = json.JSONEncoder(default=_encode_default, ensure_ascii=False, separators=(",", ":"))
+_decoder = json.JSONDecoder(object_hook=_decode_hook)
+
+
+def encode_record(doc_id: str, data: Dict[str, Any]) -> str:
+    """One NDJSON line for a document"""
+    return _encoder.encode({"id": doc_id, "data": data})
+
+
+def decode_record(line: str) -> Tuple[str, Dict[str, Any]]:
+    record = _decoder.decode(line)
+    return record["id"], record["data"]
+
+
+def collection_path(snapshot_dir: str, collection: str) -> str:
+    return os.path.join(snapshot_dir, f"{collection}.ndjson.gz")
+
+
+def write_collection(snapshot_dir: str, collection: str, records: Iterable[Tuple[str, Dict[str, Any]]],
+                     compresslevel: int = 6) -> int:
+    """Stream (id, data) records of one collection into its snapshot file"""
+    count = 0
+    with gzip.open(collection_path(snapshot_dir, collection), "wt", encoding="utf-8",
+                   compresslevel=compresslevel) as out:
+        for doc_id, data in records:
+            out.write(encode_record(doc_id, data))
+            out.write("\n")
+            count += 1
+    return count
+
+
+def read_collection(snapshot_dir: str, collection: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Stream (id, data) records of one collection back out of its snapshot file"""
+    with gzip.open(collection_path(snapshot_dir, collection), "rt", encoding="utf-8") as src:
+        for line in src:
+            if line.strip():
+                yield decode_record(line)
+
+
+def write_manifest(snapshot_dir: str, counts: Dict[str, int]):
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": datetime.utcnow().isoformat(),
+        "format": "ndjson.gz",
+        "collections": counts
+    }
+    with open(os.path.join(snapshot_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def read_manifest(snapshot_dir: str) -> Dict[str, Any]:
+    with open(os.path.join(snapshot_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {manifest.get('version')}")
+    return manifest
+
+
+def export_snapshot(db, snapshot_dir: str, collections: Optional[List[str]] = None,
+                    page_size: int = DEFAULT_PAGE_SIZE, compresslevel: int = 6) -> Dict[str, int]:
+    """Export collections from Firestore, holding at most one page of documents in memory"""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    counts = {}
+    for collection in collections or SNAPSHOT_COLLECTIONS:
+        print(f"  📤 Exporting {collection}...")
+        records = ((snap.id, snap.to_dict()) for snap in iter_documents(db, collection, page_size))
+        counts[collection] = write_collection(snapshot_dir, collection, records, compresslevel)
+        print(f"    ✓ {counts[collection]:,} documents")
+    write_manifest(snapshot_dir, counts)
+    return counts
+
+
+def export_dataset(dataset: Dict[str, Iterable[Tuple[str, Dict[str, Any]]]],
+                   snapshot_dir: str, compresslevel: int = 6) -> Dict[str, int]:
+    """Write (id, data) records per collection straight to a snapshot without touching Firestore"""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    counts = {}
+    for collection, records in dataset.items():
+        counts[collection] = write_collection(snapshot_dir, collection, records, compresslevel)
+        print(f"    ✓ {collection}: {counts[collection]:,} documents")
+    write_manifest(snapshot_dir, counts)
+    return counts
+
+
+def import_snapshot(db, snapshot_dir: str, collections: Optional[List[str]] = None,
+                    batch_size: int = MAX_BATCH_OPS, max_in_flight: int = 16) -> Dict[str, Any]:
+    """Bulk-load a snapshot; memory is bounded by the batches in flight"""
+    manifest = read_manifest(snapshot_dir)
+    selected = collections or list(manifest["collections"])
+    with BatchWriter(db, batch_size=batch_size, max_in_flight=max_in_flight, label="import") as writer:
+        for collection in selected:
+            print(f"  📥 Importing {collection}...")
+            for doc_id, data in read_collection(snapshot_dir, collection):
+                writer.set(collection, doc_id, data)
+    stats = writer.summary()
+    print(f"    ✓ Imported {stats['docs']:,} documents ({stats['docs_per_sec']:,.0f} docs/sec)")
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    from synthetic_data import SCALES
+    parser = argparse.ArgumentParser(description="Export or import Debattle Firestore snapshots")
+    parser.add_argument("command", choices=["export", "import", "generate"])
+    parser.add_argument("snapshot_dir")
+    parser.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    parser.add_argument("--collections", nargs="+", help="limit to these collections")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    parser.add_argument("--compresslevel", type=int, default=6)
+    parser.add_argument("--scale", default="small", choices=list(SCALES), help="dataset scale for 'generate'")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Imported here so the snapshot helpers above stay usable without firebase_admin
+    import initialize_firestore as init
+
+    if args.command == "generate":
+        users, topics, debates = SCALES[args.scale]
+        print(f"🧪 Writing generated '{args.scale}' dataset to {args.snapshot_dir}")
+        dataset = init.create_synthetic_dataset(users, topics, debates, args.seed)
+        records = {collection: keyed_records(dataset[collection], id_field)
+                   for collection, id_field in init.SEED_COLLECTIONS}
+        records['system'] = [('settings', init.create_system_settings(users, topics))]
+        export_dataset(records, args.snapshot_dir, args.compresslevel)
+        return
+
+    db = init.connect(args.emulator)
+    if args.command == "export":
+        print(f"📦 Exporting snapshot to {args.snapshot_dir}")
+        export_snapshot(db, args.snapshot_dir, args.collections, args.page_size, args.compresslevel)
+    else:
+        print(f"📦 Importing snapshot from {args.snapshot_dir}")
+        import_snapshot(db, args.snapshot_dir, args.collections, max_in_flight=args.max_in_flight)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"\n❌ Snapshot failed: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Incremental user stats aggregator for Debattle.
+Folds debates completed since a stored watermark into the denormalized user counters with batched field increments.
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from firestore_io import (BatchWriter, DEFAULT_PAGE_SIZE, Increment, Throughput, Through, advance_through, get_documents,
+                          is_new, iter_pages)
+from ratings import debate_winner
+from xp_levels import Progression, load_gamification
+
+STATE_COLLECTION = "system"
+STATE_DOC = "statsAggregator"
+
+DEBATE_FIELDS = ["status", "participants", "winner", "judgment.winner", "arguments", "started_at",
+                 "created_at", "ended_at"]
+USER_FIELDS = ["gamesPlayed", "wins", "draws", "winStreak", "bestWinStreak", "xp", "stats.totalArgumentsPosted",
+               "stats.averageResponseTime", "stats.responseTimeSamples", "stats.aggregatedThrough"]
+
+# Scores as in ratings.rating_changes
+WIN, DRAW_RESULT, LOSS = 1.0, 0.5, 0.0
+
+# (ended_at, debate id): the order debates are folded in
+DebateKey = Tuple[datetime, str]
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class RunningMean:
+    """Count and mean that can absorb single values or whole other means without keeping samples"""
+
+    def __init__(self, count: int = 0, mean: float = 0.0):
+        self.count = count
+        self.mean = mean
+
+    def add(self, value: float):
+        self.count += 1
+        self.mean += (value - self.mean) / self.count
+
+    def merge(self, other: "RunningMean"):
+        total = self.count + other.count
+        if total:
+            self.mean += (other.mean - self.mean) * other.count / total
+            self.count = total
+
+
+class DebateFold:
+    """One debate's contribution to one user"""
+    __slots__ = ("key", "result", "arguments", "response_time")
+
+    def __init__(self, key: DebateKey, result: float):
+        self.key = key
+        self.result = result
+        self.arguments = 0
+        self.response_time = RunningMean()
+
+
+def fold_debate(debate_id: str, debate: Dict[str, Any]) -> Dict[str, DebateFold]:
+    """Per-participant outcome, argument count and response times of one completed debate"""
+    participants = [p.get("userId") for p in debate.get("participants") or [] if p.get("userId")]
+    if debate.get("status") != "completed" or not participants:
+        return {}
+    key = (_utc(debate["ended_at"]), debate_id)
+    winner = debate_winner(debate)
+    folds = {uid: DebateFold(key, DRAW_RESULT if winner is None else WIN if winner == uid else LOSS)
+             for uid in participants}
+    # A response time is the gap since the previous argument (or the start for the first one)
+    previous = debate.get("started_at") or debate.get("created_at")
+    for argument in sorted(debate.get("arguments") or [], key=lambda a: a.get("timestamp") or key[0]):
+        fold = folds.get(argument.get("userId"))
+        timestamp = argument.get("timestamp")
+        if fold is not None:
+            fold.arguments += 1
+            if isinstance(timestamp, datetime) and isinstance(previous, datetime):
+                fold.response_time.add((_utc(timestamp) - _utc(previous)).total_seconds())
+        if isinstance(timestamp, datetime):
+            previous = timestamp
+    return folds
+
+
+def user_update(user: Dict[str, Any], folds: List[DebateFold], progression: Progression) -> Optional[Dict[str, Any]]:
+    """Field updates for one user from the debates it has not absorbed yet, in order"""
+    marker = Through.from_stored((user.get("stats") or {}).get("aggregatedThrough"))
+    folds = sorted((f for f in folds if is_new(f.key, marker)), key=lambda f: f.key)
+    if not folds:
+        return None
+    stats = user.get("stats") or {}
+    games = user.get("gamesPlayed", 0)
+    wins, draws = user.get("wins", 0), user.get("draws", 0)
+    streak, best = user.get("winStreak", 0), user.get("bestWinStreak", 0)
+    results = [f.result for f in folds]
+    xp = user.get("xp", 0) + progression.fold(streak, results)
+
+    for result in results:
+        streak = streak + 1 if result == WIN else 0
+        best = max(best, streak)
+
+    response = RunningMean(stats.get("responseTimeSamples", stats.get("totalArgumentsPosted", 0)),
+                           stats.get("averageResponseTime", 0.0))
+    for fold in folds:
+        response.merge(fold.response_time)
+
+    new_wins, new_draws = results.count(WIN), results.count(DRAW_RESULT)
+    new_games, new_arguments = len(results), sum(f.arguments for f in folds)
+    total_games, total_wins = games + new_games, wins + new_wins
+    samples = sum(f.response_time.count for f in folds)
+    update: Dict[str, Any] = {
+        "gamesPlayed": Increment(new_games),
+        "win_rate": round(total_wins / total_games * 100, 1) if total_games else 0.0,
+        "bestWinStreak": best,
+        "xp": Increment(xp - user.get("xp", 0)),
+        "level": progression.level(xp),
+        # An unbroken run of wins extends the stored streak, anything else replaces it
+        "winStreak": Increment(new_wins) if new_wins == new_games else streak,
+        "stats.aggregatedThrough": advance_through(marker, (f.key for f in folds)),
+    }
+    for field, delta in (("wins", new_wins), ("losses", results.count(LOSS)), ("draws", new_draws),
+                         ("stats.totalArgumentsPosted", new_arguments)):
+        if delta:
+            update[field] = Increment(delta)
+    if samples:
+        update["stats.responseTimeSamples"] = response.count
+        update["stats.averageResponseTime"] = round(response.mean, 1)
+    return update
+
+
+def load_watermark(db) -> Tuple[Optional[datetime], List[str]]:
+    """Stored watermark and the ids of the debates already folded at exactly that time"""
+    snap = db.collection(STATE_COLLECTION).document(STATE_DOC).get()
+    state = (snap.to_dict() or {}) if snap.exists else {}
+    watermark = state.get("watermark")
+    return (_utc(watermark) if watermark else None), state.get("watermarkIds", [])
+
+
+def save_watermark(db, watermark: datetime, ids: List[str], debates: int):
+    db.collection(STATE_COLLECTION).document(STATE_DOC).set({
+        "watermark": watermark,
+        "watermarkIds": sorted(ids),
+        "lastRun": datetime.now(timezone.utc),
+        "lastRunDebates": debates
+    }, merge=True)
+
+
+def newest_debates(db) -> Tuple[Optional[datetime], List[str]]:
+    """End time of the newest debate and every debate that ended at that instant"""
+    snaps = list(db.collection("debates").select(["ended_at"])
+                 .order_by("ended_at", direction="DESCENDING").limit(1).stream())
+    if not snaps:
+        return None, []
+    newest = snaps[0].to_dict()["ended_at"]
+    return _utc(newest), [s.id for s in db.collection("debates").where("ended_at", "==", newest).stream()]
+
+
+def aggregate(db, since: Optional[datetime] = None, page_size: int = DEFAULT_PAGE_SIZE,
+              dry_run: bool = False, max_in_flight: int = 8) -> Dict[str, Any]:
+    """
+    Fold debates that ended at or after the watermark into their players' counters.
+
+    Debates ending exactly at the watermark are re-read and skipped by id. Each user's
+    stats.aggregatedThrough marker is written in the same update as its increments,
+    so a run interrupted before the watermark moves never folds a debate twice.
+    """
+    if since:
+        since, seen = _utc(since), []
+    else:
+        since, seen = load_watermark(db)
+    if since is None:
+        baseline, ids = newest_debates(db)
+        if baseline and not dry_run:
+            save_watermark(db, baseline, ids, 0)
+        print(f"    ℹ️  No watermark yet; counters are taken as current up to {baseline}")
+        return {"debates": 0, "users": 0, "updated": 0, "watermark": baseline}
+
+    progression = Progression(load_gamification(db))
+    print(f"📈 Aggregating debates that ended since {since.isoformat()}...")
+    progress = Throughput("debates", report_every=5.0)
+    query = (db.collection("debates").select(DEBATE_FIELDS).where("ended_at", ">=", since)
+             .order_by("ended_at").order_by("__name__"))
+    pending: Dict[str, List[DebateFold]] = {}
+    skip = set(seen)
+    watermark, at_watermark = since, list(seen)
+    debates = 0
+    for page in iter_pages(query, page_size):
+        for snap in page:
+            if snap.id in skip:
+                continue
+            debate = snap.to_dict() or {}
+            ended = _utc(debate["ended_at"])
+            if ended > watermark:
+                watermark, at_watermark = ended, []
+            at_watermark.append(snap.id)
+            for uid, fold in fold_debate(snap.id, debate).items():
+                pending.setdefault(uid, []).append(fold)
+            debates += 1
+        progress.add(len(page))
+
+    updated = 0
+    writer = None if dry_run else BatchWriter(db, max_in_flight=max_in_flight, label="user stats")
+    for snap in get_documents(db, "users", sorted(pending), USER_FIELDS):
+        if not snap.exists:
+            continue
+        update = user_update(snap.to_dict() or {}, pending[snap.id], progression)
+        if update is None:
+            continue
+        updated += 1
+        if writer:
+            writer.update("users", snap.id, update)
+    if writer:
+        writer.close()
+        save_watermark(db, watermark, at_watermark, debates)
+
+    print(f"    ✓ Folded {debates:,} debates into {updated:,} of {len(pending):,} players "
+          f"({progress.rate:,.0f} debates/sec)")
+    return {"debates": debates, "users": len(pending), "updated": updated, "watermark": watermark}
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Fold new Debattle debates into user stats")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="override the stored watermark (ISO timestamp)")
+    parser.add_argument("--dry-run", action="store_true", help="count what would change without writing")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    args = parser.parse_args(argv)
+
+    from initialize_firestore import connect
+    aggregate(connect(args.emulator), args.since, args.page_size, args.dry_run, args.max_in_flight)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Stats aggregation failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for Debattle load tests.
+Scales the create_sample_* fixtures to millions of deterministic, internally consistent records.
+"""
+
+import random
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from ratings import DRAW, rating_changes, tier_for_rating
+from xp_levels import Progression
+
+# users, topics, debates
+SCALES = {
+    "tiny": (100, 20, 500),
+    "small": (1_000, 100, 5_000),
+    "medium": (100_000, 1_000, 500_000),
+    "large": (1_000_000, 5_000, 5_000_000),
+    "xl": (10_000_000, 10_000, 50_000_000),
+}
+
+MIN_RATING = 100
+MAX_RATING = 3000
+
+# Seeded users follow the default gamification settings
+_PROGRESSION = Progression()
+
+CATEGORIES = ["technology", "business", "education", "society", "science",
+              "politics", "environment", "sports", "philosophy", "ethics"]
+DEBATE_STYLES = ["analytical", "persuasive", "logical", "emotional", "evidence-based"]
+THEMES = ["auto", "dark", "light"]
+FORMATS = ["oxford", "lincoln-douglas", "parliamentary"]
+ARGUMENT_TYPES = ["opening", "rebuttal", "rebuttal", "closing"]
+
+FIRST_NAMES = ["Alice", "Bob", "Charlie", "Dana", "Eli", "Fatima", "Grace", "Hiro",
+               "Ines", "Jamal", "Kai", "Lena", "Mateo", "Nia", "Omar", "Priya",
+               "Quinn", "Rosa", "Sami", "Tara", "Uma", "Victor", "Wen", "Yara", "Zane"]
+LAST_NAMES = ["Johnson", "Smith", "Brown", "Garcia", "Nguyen", "Okafor", "Khan", "Silva",
+              "Kowalski", "Tanaka", "Haddad", "Rossi", "Murphy", "Schmidt", "Patel"]
+
+TOPIC_SUBJECTS = {
+    "technology": ["artificial intelligence", "social media", "self-driving cars", "cryptocurrency"],
+    "business": ["remote work", "a four-day work week", "gig economy platforms", "unpaid internships"],
+    "education": ["free university tuition", "standardized testing", "homework", "school uniforms"],
+    "society": ["universal basic income", "voting at sixteen", "mandatory national service", "tipping"],
+    "science": ["human genetic engineering", "space colonization", "animal testing", "nuclear power"],
+    "politics": ["term limits", "compulsory voting", "lobbying", "ranked-choice voting"],
+    "environment": ["a carbon tax", "banning single-use plastics", "lab-grown meat", "fast fashion"],
+    "sports": ["esports in the Olympics", "video review in football", "athlete salary caps", "boxing"],
+    "philosophy": ["free will", "moral realism", "utilitarian policy making", "the simulation hypothesis"],
+    "ethics": ["euthanasia", "zoos", "genetic privacy", "predictive policing"],
+}
+TOPIC_TEMPLATES = [
+    "Should {subject} be banned?",
+    "Is {subject} doing more harm than good?",
+    "Should governments invest more in {subject}?",
+    "Is {subject} the future?",
+    "Should {subject} be regulated more strictly?",
+]
+WORDS = ["evidence", "shows", "that", "policy", "outcomes", "improve", "when", "incentives",
+         "align", "with", "public", "interest", "however", "costs", "remain", "significant",
+         "research", "suggests", "long-term", "benefits", "outweigh", "short-term", "risks",
+         "critics", "argue", "the", "data", "is", "incomplete", "and", "biased"]
+# Argument text is sliced out of one fixed word stream instead of drawing every word
+_CORPUS = random.Random(0).choices(WORDS, k=4096)
+STRENGTHS = ["Clear reasoning", "Good evidence", "Strong rebuttals", "Engaging delivery"]
+WEAKNESSES = ["Could use more examples", "Limited evidence", "Missed key rebuttals"]
+
+_KIND_USER, _KIND_TOPIC, _KIND_DEBATE = 1, 2, 3
+
+
+def _rng(seed: int, kind: int, index: int) -> random.Random:
+    """Independent random stream per record so any record can be regenerated on its own"""
+    return random.Random((seed << 44) | (kind << 40) | index)
+
+
+def user_id(index: int) -> str:
+    return f"user{index + 1}"
+
+
+def topic_id(index: int) -> str:
+    return f"topic{index + 1}"
+
+
+def _user_identity(rng: random.Random, index: int) -> Tuple[str, str, int]:
+    """uid, display name and rating; always the first draws from a user's stream"""
+    first = rng.choice(FIRST_NAMES)
+    last = rng.choice(LAST_NAMES)
+    rating = int(min(MAX_RATING, max(MIN_RATING, rng.gauss(1200, 180))))
+    return user_id(index), f"{first} {last}", rating
+
+
+def user_identity(index: int, seed: int = 0) -> Tuple[str, str, int]:
+    """Cheaply regenerate a user's uid, display name and rating"""
+    return _user_identity(_rng(seed, _KIND_USER, index), index)
+
+
+def generate_user(index: int, seed: int = 0, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Generate one user with the same schema as create_sample_users"""
+    now = now or datetime.utcnow()
+    rng = _rng(seed, _KIND_USER, index)
+    uid, display_name, rating = _user_identity(rng, index)
+
+    # Stronger players have played more and win more often
+    games = int(rng.lognormvariate(2.5 + max(0, rating - 1200) / 400, 0.9))
+    win_p = 1 / (1 + 10 ** ((1200 - rating) / 400))
+    draws = int(games * rng.uniform(0, 0.12))
+    wins = int(round((games - draws) * min(0.95, max(0.05, rng.gauss(win_p, 0.05)))))
+    losses = games - draws - wins
+    best_streak = min(wins, int(rng.expovariate(1 / (1 + 4 * win_p)))) if wins else 0
+    win_streak = rng.randint(0, best_streak) if best_streak else 0
+    win_rate = round(wins / games * 100, 1) if games else 0.0
+
+    achievements = []
+    if wins >= 1:
+        achievements.append("first_win")
+    if games >= 10:
+        achievements.append("debate_veteran")
+    if games >= 15 and win_rate >= 70:
+        achievements.append("logic_master")
+    if best_streak >= 5:
+        achievements.append("persuasion_expert")
+
+    rules = _PROGRESSION.settings
+    xp = wins * rules["xp_per_win"] + losses * rules["xp_per_loss"] + draws * rules["xp_per_draw"]
+    preferred = rng.sample(CATEGORIES, 3)
+    created_at = now - timedelta(days=rng.uniform(1, 730))
+    last_active = now - timedelta(minutes=rng.expovariate(1 / 2880))
+    name = display_name.lower().replace(" ", ".")
+
+    return {
+        "uid": uid,
+        "email": f"{name}.{index + 1}@example.com",
+        "displayName": display_name,
+        "username": f"{name.replace('.', '_')}_{index + 1}",
+        "photoURL": "",
+        "rating": rating,
+        "provisionalRating": games < 10,
+        "gamesPlayed": games,
+        "wins": wins,
+        "losses": losses,
+        "draws": draws,
+        "winStreak": win_streak,
+        "bestWinStreak": best_streak,
+        "win_rate": win_rate,
+        "achievements": achievements,
+        "xp": xp,
+        "level": _PROGRESSION.level(xp),
+        "tier": tier_for_rating(rating),
+        "created_at": created_at,
+        "last_active": max(created_at, last_active),
+        "preferred_topics": preferred,
+        "debate_style": rng.choice(DEBATE_STYLES),
+        "bio": "",
+        "preferences": {
+            "theme": rng.choice(THEMES),
+            "notifications": {
+                "email": rng.random() < 0.6,
+                "push": rng.random() < 0.8,
+                "debate_invites": True,
+                "achievements": True
+            },
+            "privacy": {
+                "profile_visible": rng.random() < 0.95,
+                "show_rating": True,
+                "show_stats": rng.random() < 0.8
+            }
+        },
+        "stats": {
+            "totalArgumentsPosted": games * rng.randint(2, 5),
+            "averageResponseTime": int(rng.uniform(45, 300)),
+            "favoriteTopics": preferred[:2],
+            "strongestCategories": rng.sample(preferred, 2)
+        }
+    }
+
+
+def generate_topic(index: int, seed: int = 0, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Generate one topic with the same schema as create_sample_topics"""
+    now = now or datetime.utcnow()
+    rng = _rng(seed, _KIND_TOPIC, index)
+    category = rng.choice(CATEGORIES)
+    subject = rng.choice(TOPIC_SUBJECTS[category])
+    title = rng.choice(TOPIC_TEMPLATES).format(subject=subject)
+    return {
+        "id": topic_id(index),
+        "title": title,
+        "description": f"Debate the arguments for and against {subject}.",
+        "category": category,
+        "difficulty": rng.randint(1, 10),
+        "tags": [category] + rng.sample(subject.split() + ["policy", "society", "ethics"], 2),
+        "trending": rng.random() < 0.1,
+        "usageCount": int(rng.paretovariate(1.2)),
+        "averageRating": round(rng.uniform(3.0, 5.0), 1),
+        "isOfficial": rng.random() < 0.3,
+        "created_at": now - timedelta(days=rng.uniform(1, 365))
+    }
+
+
+def _argument(rng: random.Random, number: int, user: str, side: str, kind: str,
+              skill: float, timestamp: datetime, round_no: int) -> Dict[str, Any]:
+    length = rng.randint(15, 120)
+    start = rng.randrange(len(_CORPUS) - length)
+    words = _CORPUS[start:start + length]
+    content = " ".join(words).capitalize() + "."
+
+    def score() -> float:
+        return round(min(10.0, max(1.0, rng.gauss(skill, 1.0))) * 2) / 2
+
+    return {
+        "id": f"arg{number}",
+        "userId": user,
+        "type": kind,
+        "side": side,
+        "content": content,
+        "timestamp": timestamp,
+        "round": round_no,
+        "wordCount": len(words),
+        "ai_feedback": {
+            "strength_score": score(),
+            "clarity_score": score(),
+            "evidence_score": score(),
+            "feedback": rng.choice(STRENGTHS) + "."
+        }
+    }
+
+
+def _criteria(rng: random.Random, base: float) -> Dict[str, int]:
+    scores = {key: int(min(100, max(0, rng.gauss(base, 5))))
+              for key in ("logic", "evidence", "clarity", "rebuttal", "engagement")}
+    scores["total"] = round(sum(scores.values()) / len(scores))
+    return scores
+
+
+def generate_debate(index: int, num_users: int, num_topics: int, seed: int = 0,
+                    now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Generate one completed debate whose arguments, judgment and ratingChanges agree"""
+    if num_users < 2:
+        raise ValueError(f"debates need at least 2 users, got {num_users}")
+    now = now or datetime.utcnow()
+    rng = _rng(seed, _KIND_DEBATE, index)
+    a = rng.randrange(num_users)
+    b = rng.randrange(num_users - 1)
+    b = b + 1 if b >= a else b
+    topic = generate_topic(rng.randrange(num_topics), seed, now)
+
+    players = []
+    for stance, user_index in (("pro", a), ("con", b)):
+        uid, name, rating = user_identity(user_index, seed)
+        players.append({"userId": uid, "displayName": name, "rating": rating, "stance": stance})
+
+    started_at = now - timedelta(days=rng.uniform(0, 730))
+    skills = [5 + (p["rating"] - 1200) / 200 + rng.gauss(0, 1) for p in players]
+
+    arguments = []
+    timestamp = started_at
+    rounds = rng.randint(2, 4)
+    for round_no in range(1, rounds + 1):
+        kind = ARGUMENT_TYPES[min(round_no - 1, 1)] if round_no < rounds else "closing"
+        for side, player in enumerate(players):
+            timestamp += timedelta(seconds=rng.uniform(30, 300))
+            arguments.append(_argument(rng, len(arguments) + 1, player["userId"], player["stance"],
+                                       kind, skills[side], timestamp, round_no))
+    ended_at = timestamp + timedelta(seconds=rng.uniform(10, 120))
+
+    # Judgment follows the argument quality; the higher total wins
+    scores = {}
+    for player in players:
+        own = [arg["ai_feedback"] for arg in arguments if arg["userId"] == player["userId"]]
+        quality = sum(f["strength_score"] + f["clarity_score"] + f["evidence_score"] for f in own) / (3 * len(own))
+        scores[player["userId"]] = _criteria(rng, quality * 10)
+    pro, con = players[0]["userId"], players[1]["userId"]
+    margin = scores[pro]["total"] - scores[con]["total"]
+    winner = pro if margin > 0 else con if margin < 0 else DRAW
+    pro_score = 1.0 if winner == pro else 0.0 if winner == con else 0.5
+    pro_change, con_change = rating_changes(players[0]["rating"], players[1]["rating"], pro_score)
+
+    return {
+        "id": f"debate{index + 1}",
+        "topic": topic["title"],
+        "topicId": topic["id"],
+        "format": rng.choice(FORMATS),
+        "participants": players,
+        "status": "completed",
+        "created_at": started_at,
+        "started_at": started_at,
+        "ended_at": ended_at,
+        "winner": winner,
+        "arguments": arguments,
+        "judgment": {
+            "winner": winner,
+            "confidence": round(min(0.99, 0.5 + abs(margin) / 40), 2),
+            "reasoning": "Decided on the combined logic, evidence, clarity, rebuttal and engagement scores.",
+            "scores": scores,
+            "feedback": {
+                player["userId"]: {
+                    "strengths": rng.sample(STRENGTHS, 2),
+                    "weaknesses": rng.sample(WEAKNESSES, 1),
+                    "improvement_suggestions": ["Add more specific case studies"]
+                } for player in players
+            },
+            "fallacies": [],
+            "highlights": [],
+            "overall_analysis": "Generated debate.",
+            "debate_quality": round(sum(s["total"] for s in scores.values()) / 20, 1),
+            "entertainment_value": round(rng.uniform(5, 9), 1)
+        },
+        "ratingChanges": {pro: pro_change, con: con_change},
+        "metadata": {
+            "total_arguments": len(arguments),
+            "debate_duration": int((ended_at - started_at).total_seconds()),
+            "audience_votes": {pro: rng.randint(0, 10), con: rng.randint(0, 10)}
+        }
+    }
+
+
+def generate_users(n: int, seed: int = 0, now: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+    now = now or datetime.utcnow()
+    for i in range(n):
+        yield generate_user(i, seed, now)
+
+
+def generate_topics(m: int, seed: int = 0, now: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+    now = now or datetime.utcnow()
+    for i in range(m):
+        yield generate_topic(i, seed, now)
+
+
+def generate_debates(k: int, num_users: int, num_topics: int, seed: int = 0,
+                     now: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+    # Checked here rather than on first use, since the debates are generated lazily
+    if k and num_users < 2:
+        raise ValueError(f"debates need at least 2 users, got {num_users}")
+    now = now or datetime.utcnow()
+    return (generate_debate(i, num_users, num_topics, seed, now) for i in range(k))
+
+
+def generate_leaderboard(n: int, seed: int = 0, now: Optional[datetime] = None,
+                         limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Leaderboard rows in rank order.
+
+    Ratings are integers in [MIN_RATING, MAX_RATING], so users are ordered with a
+    counting sort over two flat arrays instead of a list of n Python objects.
+    """
+    now = now or datetime.utcnow()
+    ratings = array("H", (user_identity(i, seed)[2] for i in range(n)))
+    buckets = MAX_RATING - MIN_RATING + 1
+    starts = array("q", [0]) * (buckets + 1)
+    for rating in ratings:
+        starts[MAX_RATING - rating + 1] += 1
+    for slot in range(1, buckets + 1):
+        starts[slot] += starts[slot - 1]
+    order = array("I", [0]) * n
+    for i, rating in enumerate(ratings):
+        slot = MAX_RATING - rating
+        order[starts[slot]] = i
+        starts[slot] += 1
+    del ratings, starts
+
+    for rank, index in enumerate(order[:limit] if limit else order, start=1):
+        user = generate_user(index, seed, now)
+        yield {
+            "userId": user["uid"],
+            "displayName": user["displayName"],
+            "rating": user["rating"],
+            "rank": rank,
+            "change": 0,
+            "gamesPlayed": user["gamesPlayed"],
+            "tier": user["tier"],
+            "wins": user["wins"],
+            "losses": user["losses"],
+            "winRate": user["win_rate"]
+        }
+
+
+def generate_dataset(num_users: int, num_topics: int, num_debates: int, seed: int = 0,
+                     now: Optional[datetime] = None) -> Dict[str, Iterator[Dict[str, Any]]]:
+    """Lazily generated collections keyed by collection name (achievements are not generated)"""
+    now = now or datetime.utcnow()
+    return {
+        "users": generate_users(num_users, seed, now),
+        "topics": generate_topics(num_topics, seed, now),
+        "debates": generate_debates(num_debates, num_users, num_topics, seed, now),
+        "leaderboard": generate_leaderboard(num_users, seed, now),
+    }
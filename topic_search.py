@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Topic search index for Debattle.
+Builds a BM25 inverted index over topics and src/data/practiceTopics.json, persisted as a memory-mapped file.
+"""
+
+import argparse
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+PRACTICE_TOPICS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "data", "practiceTopics.json")
+# Practice topic ids are "1", "2", ...; the prefix keeps them apart from Firestore topic ids
+PRACTICE_PREFIX = "practice:"
+
+# PracticePage sends beginner/intermediate/advanced as difficulty 2/5/8
+DIFFICULTY_LEVELS = {"beginner": 2, "intermediate": 5, "advanced": 8, "expert": 10}
+DIFFICULTY_RANGES = {"beginner": (1, 3), "intermediate": (4, 6), "advanced": (7, 8), "expert": (9, 10)}
+
+TITLE_WEIGHT = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Cap on the vocabulary terms one prefix may expand to
+MAX_PREFIX_TERMS = 64
+
+MAGIC = b"DBTSRCH1"
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def difficulty_value(value: Any) -> int:
+    """Numeric difficulty for Firestore topics (1-10) and practice topics (level names)"""
+    if isinstance(value, str):
+        return DIFFICULTY_LEVELS.get(value.lower(), 0)
+    return int(value or 0)
+
+
+def topic_document(topic_id: str, topic: Dict[str, Any]) -> Dict[str, Any]:
+    """Searchable form of a topic: weighted term counts plus the filter fields"""
+    terms = Counter()
+    for token in tokenize(topic.get("title", "")):
+        terms[token] += TITLE_WEIGHT
+    text = [topic.get("description", "")] + list(topic.get("tags") or []) + list(topic.get("tips") or [])
+    for token in tokenize(" ".join(text)):
+        terms[token] += 1
+    return {
+        "id": topic_id,
+        "title": topic.get("title", ""),
+        "category": (topic.get("category") or "").lower(),
+        "difficulty": difficulty_value(topic.get("difficulty")),
+        "terms": terms
+    }
+
+
+def practice_documents(path: str = PRACTICE_TOPICS_PATH) -> Iterable[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for topic in json.load(f):
+            yield topic_document(PRACTICE_PREFIX + str(topic["id"]), topic)
+
+
+class SearchIndex:
+    """
+    Inverted index with one posting list per term, stored as flat row/term-frequency arrays.
+
+    A loaded index keeps its postings in the memory-mapped file. Updates go to an
+    in-memory delta and replaced rows are tombstoned until the next save compacts them.
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.titles: List[str] = []
+        self.categories: List[str] = []
+        self.category = np.zeros(0, dtype=np.int16)
+        self.difficulty = np.zeros(0, dtype=np.int8)
+        self.length = np.zeros(0, dtype=np.float32)
+        self.live = np.zeros(0, dtype=np.bool_)
+        self.vocab: List[str] = []
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.rows = np.zeros(0, dtype=np.uint32)
+        self.tfs = np.zeros(0, dtype=np.uint16)
+        self.delta: Dict[str, List[Tuple[int, int]]] = {}
+        # (category, difficulty, length) of rows added since the arrays were last extended
+        self._pending: List[Tuple[int, int, float]] = []
+        self._row_of: Dict[str, int] = {}
+        self._delta_vocab: Optional[List[str]] = None
+        self._mmap = None
+
+    def __len__(self) -> int:
+        self._extend()
+        return int(self.live.sum())
+
+    @classmethod
+    def build(cls, documents: Iterable[Dict[str, Any]]) -> "SearchIndex":
+        index = cls()
+        for doc in documents:
+            index.upsert(doc)
+        index.compact()
+        return index
+
+    def _category_code(self, category: str) -> int:
+        if category not in self.categories:
+            self.categories.append(category)
+        return self.categories.index(category)
+
+    def upsert(self, doc: Dict[str, Any]):
+        """Add or replace one topic_document()"""
+        self.remove(doc["id"])
+        row = len(self.ids)
+        self._row_of[doc["id"]] = row
+        self.ids.append(doc["id"])
+        self.titles.append(doc["title"])
+        self._pending.append((self._category_code(doc["category"]), doc["difficulty"], sum(doc["terms"].values())))
+        for term, tf in doc["terms"].items():
+            self.delta.setdefault(term, []).append((row, tf))
+        self._delta_vocab = None
+
+    def _extend(self):
+        """Append the pending rows to the column arrays in one step, so a build stays linear"""
+        if not self._pending:
+            return
+        category, difficulty, length = zip(*self._pending)
+        self.category = np.concatenate([self.category, np.array(category, dtype=np.int16)])
+        self.difficulty = np.concatenate([self.difficulty, np.array(difficulty, dtype=np.int8)])
+        self.length = np.concatenate([self.length, np.array(length, dtype=np.float32)])
+        self.live = np.concatenate([self.live, np.ones(len(self._pending), dtype=np.bool_)])
+        self._pending = []
+
+    def title(self, topic_id: str) -> Optional[str]:
+        row = self._row_of.get(topic_id)
+        return None if row is None else self.titles[row]
+
+    def remove(self, topic_id: str) -> bool:
+        row = self._row_of.pop(topic_id, None)
+        if row is None:
+            return False
+        self._extend()
+        self.live[row] = False
+        return True
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        rows, tfs = [], []
+        i = bisect_left(self.vocab, term)
+        if i < len(self.vocab) and self.vocab[i] == term:
+            rows.append(self.rows[self.offsets[i]:self.offsets[i + 1]])
+            tfs.append(self.tfs[self.offsets[i]:self.offsets[i + 1]])
+        if term in self.delta:
+            extra = np.array(self.delta[term], dtype=np.int64)
+            rows.append(extra[:, 0])
+            tfs.append(extra[:, 1])
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        rows = np.concatenate(rows).astype(np.int64)
+        tfs = np.concatenate(tfs).astype(np.float64)
+        keep = self.live[rows]
+        return rows[keep], tfs[keep]
+
+    def expand(self, prefix: str) -> List[str]:
+        """Vocabulary terms starting with prefix, shortest first"""
+        if self._delta_vocab is None:
+            self._delta_vocab = sorted(self.delta)
+        terms = set()
+        for vocab in (self.vocab, self._delta_vocab):
+            start = bisect_left(vocab, prefix)
+            for term in vocab[start:start + MAX_PREFIX_TERMS]:
+                if not term.startswith(prefix):
+                    break
+                terms.add(term)
+        return sorted(terms, key=lambda t: (len(t), t))[:MAX_PREFIX_TERMS]
+
+    def search(self, query: str, k: int = 10, category: Optional[str] = None,
+               difficulty: Optional[Tuple[int, int]] = None, prefix: bool = True) -> List[Tuple[str, float]]:
+        """
+        Top k (topic id, BM25 score) for a query.
+
+        With prefix on, the last query word also matches longer words (search as you
+        type); each topic scores by its best-matching expansion.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        self._extend()
+        live = self.live
+        n = int(live.sum())
+        if n == 0:
+            return []
+        avgdl = float(self.length[live].mean())
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.length.astype(np.float64) / avgdl)
+        scores = np.zeros(len(self.ids), dtype=np.float64)
+
+        groups = [[token] for token in tokens]
+        if prefix:
+            groups[-1] = self.expand(tokens[-1]) or groups[-1]
+        for group in groups:
+            best = np.zeros(len(self.ids), dtype=np.float64) if len(group) > 1 else scores
+            for term in group:
+                rows, tfs = self._postings(term)
+                if not len(rows):
+                    continue
+                idf = math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+                term_scores = idf * tfs * (BM25_K1 + 1) / (tfs + norm[rows])
+                if best is scores:
+                    scores[rows] += term_scores
+                else:
+                    np.maximum.at(best, rows, term_scores)
+            if best is not scores:
+                scores += best
+
+        mask = live & (scores > 0)
+        if category is not None:
+            code = self.categories.index(category.lower()) if category.lower() in self.categories else -1
+            mask &= self.category == code
+        if difficulty is not None:
+            mask &= (self.difficulty >= difficulty[0]) & (self.difficulty <= difficulty[1])
+        candidates = np.flatnonzero(mask)
+        if len(candidates) > k:
+            # Keep everything tied with the k-th score so ties always break by id
+            kth = -np.partition(-scores[candidates], k - 1)[k - 1]
+            candidates = candidates[scores[candidates] >= kth]
+        ranked = sorted(candidates.tolist(), key=lambda r: (-scores[r], self.ids[r]))[:k]
+        return [(self.ids[r], float(scores[r])) for r in ranked]
+
+    def compact(self):
+        """Fold the delta into the main arrays and drop tombstoned rows"""
+        self._extend()
+        counts = np.diff(self.offsets)
+        base_terms = np.repeat(np.arange(len(self.vocab)), counts)
+        vocab = sorted(set(self.vocab) | set(self.delta))
+        code = {term: i for i, term in enumerate(vocab)}
+        remap = np.array([code[t] for t in self.vocab], dtype=np.int64)
+        delta = [(code[term], row, tf) for term, postings in self.delta.items() for row, tf in postings]
+        delta = np.array(delta, dtype=np.int64).reshape(-1, 3)
+        terms = np.concatenate([remap[base_terms], delta[:, 0]])
+        rows = np.concatenate([self.rows.astype(np.int64), delta[:, 1]])
+        tfs = np.concatenate([self.tfs.astype(np.int64), delta[:, 2]])
+
+        keep = self.live[rows]
+        new_row = np.cumsum(self.live) - 1
+        terms, rows, tfs = terms[keep], new_row[rows[keep]], tfs[keep]
+        order = np.lexsort((rows, terms))
+        terms, rows, tfs = terms[order], rows[order], tfs[order]
+        per_term = np.bincount(terms, minlength=len(vocab))
+        used = per_term > 0
+
+        live_rows = np.flatnonzero(self.live)
+        self.ids = [self.ids[r] for r in live_rows]
+        self.titles = [self.titles[r] for r in live_rows]
+        self.category = self.category[live_rows]
+        self.difficulty = self.difficulty[live_rows]
+        self.length = self.length[live_rows]
+        self.live = np.ones(len(live_rows), dtype=np.bool_)
+        self._row_of = {topic_id: r for r, topic_id in enumerate(self.ids)}
+        self.vocab = [term for term, u in zip(vocab, used.tolist()) if u]
+        self.offsets = np.concatenate([[0], np.cumsum(per_term[used])]).astype(np.int64)
+        self.rows = rows.astype(np.uint32)
+        self.tfs = np.minimum(tfs, np.iinfo(np.uint16).max).astype(np.uint16)
+        self.delta = {}
+        self._delta_vocab = None
+
+    def save(self, path: str):
+        """Compact and write the index; arrays are 8-byte aligned so load() can map them in place"""
+        self.compact()
+        arrays = {"category": self.category, "difficulty": self.difficulty, "length": self.length,
+                  "offsets": self.offsets, "rows": self.rows, "tfs": self.tfs}
+        layout, position = {}, 0
+        for name, values in arrays.items():
+            layout[name] = {"dtype": values.dtype.str, "count": len(values), "offset": position}
+            position += -(-values.nbytes // 8) * 8
+        header = json.dumps({"ids": self.ids, "titles": self.titles, "categories": self.categories,
+                             "vocab": self.vocab, "arrays": layout}).encode("utf-8")
+        header += b" " * (-(len(MAGIC) + 8 + len(header)) % 8)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            for values in arrays.values():
+                data = values.tobytes()
+                f.write(data + b"\0" * (-len(data) % 8))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SearchIndex":
+        index = cls()
+        with open(path, "rb") as f:
+            index._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = index._mmap
+        if mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a topic search index")
+        (header_len,) = struct.unpack_from("<Q", mm, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(mm[start:start + header_len].decode("utf-8"))
+        base = start + header_len
+        arrays = {name: np.frombuffer(mm, dtype=spec["dtype"], count=spec["count"], offset=base + spec["offset"])
+                  for name, spec in header["arrays"].items()}
+        index.ids, index.titles = header["ids"], header["titles"]
+        index.categories, index.vocab = header["categories"], header["vocab"]
+        # Per-topic columns are small and change on upsert, so they are copied out of the map
+        index.category = arrays["category"].copy()
+        index.difficulty = arrays["difficulty"].copy()
+        index.length = arrays["length"].copy()
+        index.live = np.ones(len(index.ids), dtype=np.bool_)
+        index.offsets, index.rows, index.tfs = arrays["offsets"], arrays["rows"], arrays["tfs"]
+        index._row_of = {topic_id: r for r, topic_id in enumerate(index.ids)}
+        return index
+
+
+def firestore_documents(db, topic_ids: Optional[List[str]] = None) -> Iterable[Tuple[str, Optional[Dict[str, Any]]]]:
+    """(topic id, searchable document or None when the topic is gone) from the topics collection"""
+    from firestore_io import get_documents, iter_pages
+    fields = ["title", "description", "tags", "category", "difficulty"]
+    if topic_ids is None:
+        for page in iter_pages(db.collection("topics").select(fields).order_by("__name__")):
+            for snap in page:
+                yield snap.id, topic_document(snap.id, snap.to_dict() or {})
+        return
+    for snap in get_documents(db, "topics", topic_ids, fields):
+        yield snap.id, topic_document(snap.id, snap.to_dict() or {}) if snap.exists else None
+
+
+def parse_difficulty(value: str) -> Tuple[int, int]:
+    """A level name, a single number or a range like 4-7"""
+    if value.lower() in DIFFICULTY_RANGES:
+        return DIFFICULTY_RANGES[value.lower()]
+    low, _, high = value.partition("-")
+    return int(low), int(high or low)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Build and query the Debattle topic search index")
+    parser.add_argument("--index", default="topic_search.idx", help="index file")
+    parser.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="index every topic and practice topic")
+    build.add_argument("--snapshot", metavar="DIR", help="read topics from a snapshot_io snapshot")
+    build.add_argument("--practice", default=PRACTICE_TOPICS_PATH, help="practiceTopics.json to include")
+
+    update = sub.add_parser("update", help="re-read the given topics from Firestore into an existing index")
+    update.add_argument("topic_ids", nargs="+")
+
+    search = sub.add_parser("search", help="query the index")
+    search.add_argument("query")
+    search.add_argument("--category")
+    search.add_argument("--difficulty", type=parse_difficulty, help="beginner, intermediate, advanced, expert, N or N-M")
+    search.add_argument("--top", type=int, default=10)
+    search.add_argument("--exact", action="store_true", help="do not prefix-match the last word")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        print("🔎 Building topic search index...")
+        if args.snapshot:
+            from snapshot_io import read_collection
+            topics = (topic_document(doc_id, data) for doc_id, data in read_collection(args.snapshot, "topics"))
+        else:
+            from initialize_firestore import connect
+            topics = (doc for _, doc in firestore_documents(connect(args.emulator)))
+        practice = practice_documents(args.practice) if args.practice else []
+        index = SearchIndex.build(list(topics) + list(practice))
+        index.save(args.index)
+        print(f"    ✓ Indexed {len(index):,} topics, {len(index.vocab):,} terms → {args.index} "
+              f"({os.path.getsize(args.index) / 1024:,.0f} KiB)")
+    elif args.command == "update":
+        from initialize_firestore import connect
+        index = SearchIndex.load(args.index)
+        changed = removed = 0
+        for topic_id, doc in firestore_documents(connect(args.emulator), args.topic_ids):
+            if doc is None:
+                removed += index.remove(topic_id)
+            else:
+                index.upsert(doc)
+                changed += 1
+        index.save(args.index)
+        print(f"    ✓ Updated {changed:,} and removed {removed:,} topics in {args.index}")
+    else:
+        index = SearchIndex.load(args.index)
+        started = time.perf_counter()
+        results = index.search(args.query, args.top, args.category, args.difficulty, prefix=not args.exact)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"🔎 {len(results)} results in {elapsed:.3f} ms")
+        for topic_id, score in results:
+            print(f"    • {score:6.2f}  {topic_id}: {index.title(topic_id)}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Topic search failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Topic trending job for Debattle.
+Keeps time-decayed usage scores per topic from new debates and flips the trending flag on the top-k topics.
+"""
+
+import argparse
+import heapq
+import math
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from firestore_io import BatchWriter, DEFAULT_PAGE_SIZE, Throughput, get_documents, iter_pages
+
+STATE_COLLECTION = "system"
+STATE_DOC = "topicTrending"
+
+HALF_LIFE_HOURS = 48.0
+TOP_K = 10
+# A topic needs at least this much decayed usage to trend, so quiet periods clear the list
+MIN_TRENDING_SCORE = 1.0
+# Scores that have decayed below this are dropped to keep the state document small
+PRUNE_BELOW = 0.01
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class DecayedCounts:
+    """Exponentially decayed usage per topic, all expressed as of the same instant"""
+
+    def __init__(self, half_life_hours: float = HALF_LIFE_HOURS, scores: Optional[Dict[str, float]] = None,
+                 as_of: Optional[datetime] = None):
+        self.rate = math.log(2) / (half_life_hours * 3600)
+        self.scores = dict(scores or {})
+        self.as_of = as_of
+
+    def _weight(self, at: datetime, now: datetime) -> float:
+        return math.exp(-self.rate * max(0.0, (now - at).total_seconds()))
+
+    def decay_to(self, now: datetime):
+        """Move every score forward to now, dropping the ones that faded out"""
+        if self.as_of is not None and now > self.as_of:
+            factor = self._weight(self.as_of, now)
+            self.scores = {t: s * factor for t, s in self.scores.items() if s * factor >= PRUNE_BELOW}
+        self.as_of = max(now, self.as_of) if self.as_of else now
+
+    def add(self, topic_id: str, at: datetime):
+        """Count one use at a time no later than as_of"""
+        self.scores[topic_id] = self.scores.get(topic_id, 0.0) + self._weight(at, self.as_of)
+
+    def top(self, k: int, min_score: float = MIN_TRENDING_SCORE) -> List[Tuple[str, float]]:
+        candidates = ((t, s) for t, s in self.scores.items() if s >= min_score)
+        return heapq.nlargest(k, candidates, key=lambda item: (item[1], item[0]))
+
+
+def load_state(db, half_life_hours: float) -> Tuple[DecayedCounts, Optional[datetime], List[str]]:
+    """Stored scores, the watermark, and the debates already counted at exactly the watermark"""
+    snap = db.collection(STATE_COLLECTION).document(STATE_DOC).get()
+    state = (snap.to_dict() or {}) if snap.exists else {}
+    as_of = _utc(state["asOf"]) if state.get("asOf") else None
+    watermark = _utc(state["watermark"]) if state.get("watermark") else None
+    counts = DecayedCounts(state.get("halfLifeHours", half_life_hours), state.get("scores"), as_of)
+    return counts, watermark, state.get("watermarkIds", [])
+
+
+def save_state(db, counts: DecayedCounts, watermark: Optional[datetime], ids: List[str], trending: List[str]):
+    db.collection(STATE_COLLECTION).document(STATE_DOC).set({
+        "scores": {t: round(s, 4) for t, s in counts.scores.items()},
+        "asOf": counts.as_of,
+        "halfLifeHours": math.log(2) / counts.rate / 3600,
+        "watermark": watermark,
+        "watermarkIds": sorted(ids),
+        "trending": trending
+    })
+
+
+def refresh_trending(db, now: Optional[datetime] = None, k: int = TOP_K, half_life_hours: float = HALF_LIFE_HOURS,
+                     lookback_hours: Optional[float] = None, page_size: int = DEFAULT_PAGE_SIZE,
+                     dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Fold debates created since the watermark into the decayed scores and update trending flags.
+
+    The first run has no watermark and reads lookback_hours (default four half-lives)
+    of history; after that only new debates are read. usageCount is left alone
+    because the app increments it when a debate is created.
+    """
+    now = _utc(now) if now else datetime.now(timezone.utc)
+    counts, watermark, seen = load_state(db, half_life_hours)
+    if watermark is None:
+        hours = lookback_hours if lookback_hours is not None else 4 * half_life_hours
+        watermark = datetime.fromtimestamp(now.timestamp() - hours * 3600, timezone.utc)
+    counts.decay_to(now)
+
+    print(f"🔥 Counting topic usage since {watermark.isoformat()}...")
+    progress = Throughput("debates", report_every=5.0)
+    query = (db.collection("debates").select(["topicId", "created_at"]).where("created_at", ">=", watermark)
+             .order_by("created_at").order_by("__name__"))
+    skip = set(seen)
+    at_watermark = list(seen)
+    counted = 0
+    for page in iter_pages(query, page_size):
+        for snap in page:
+            if snap.id in skip:
+                continue
+            debate = snap.to_dict() or {}
+            created = _utc(debate["created_at"])
+            if created > watermark:
+                watermark, at_watermark = created, []
+            at_watermark.append(snap.id)
+            counted += 1
+            if debate.get("topicId"):
+                counts.add(debate["topicId"], min(created, counts.as_of))
+        progress.add(len(page))
+
+    current = {snap.id for snap in db.collection("topics").where("trending", "==", True).select([]).stream()}
+    while True:
+        top = counts.top(k)
+        wanted = {topic_id for topic_id, _ in top}
+        # Debates can name topics that were deleted or never seeded; drop those and pick again
+        missing = [snap.id for snap in get_documents(db, "topics", sorted(wanted - current), []) if not snap.exists]
+        if not missing:
+            break
+        for topic_id in missing:
+            del counts.scores[topic_id]
+    flips = [(t, True) for t in sorted(wanted - current)] + [(t, False) for t in sorted(current - wanted)]
+    if not dry_run:
+        with BatchWriter(db, label="topic trending") as writer:
+            for topic_id, trending in flips:
+                writer.update("topics", topic_id, {"trending": trending})
+        save_state(db, counts, watermark, at_watermark, [t for t, _ in top])
+
+    print(f"    ✓ Counted {counted:,} debates; {len(counts.scores):,} topics scored, "
+          f"{len(flips):,} trending flags changed")
+    for topic_id, score in top:
+        print(f"    • {topic_id}: {score:.2f}")
+    return {"debates": counted, "scored": len(counts.scores), "trending": [t for t, _ in top],
+            "changed": len(flips)}
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Refresh trending Debattle topics from recent debates")
+    parser.add_argument("--top", type=int, default=TOP_K, help="number of trending topics")
+    parser.add_argument("--half-life", type=float, default=HALF_LIFE_HOURS, help="usage half-life in hours")
+    parser.add_argument("--lookback", type=float, help="hours of history to read on the first run")
+    parser.add_argument("--dry-run", action="store_true", help="show the new trending list without writing")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    args = parser.parse_args(argv)
+
+    from initialize_firestore import connect
+    refresh_trending(connect(args.emulator), k=args.top, half_life_hours=args.half_life,
+                     lookback_hours=args.lookback, page_size=args.page_size, dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Trending refresh failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+XP and level rules for Debattle.
+Derives xp, level and tier from the debates history using the gamification block of system/settings.
+"""
+
+import argparse
+import os
+import sys
+from bisect import bisect_right
+from dataclasses import asdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from firestore_io import BatchWriter, DEFAULT_PAGE_SIZE, iter_pages
+from ratings import js_round, tier_for_rating
+from settings import GamificationSettings, get_settings
+
+DEFAULT_GAMIFICATION = asdict(GamificationSettings())
+
+# Level n starts at LEVEL_BASE_XP * (n - 1) ** level_multiplier xp
+LEVEL_BASE_XP = 100
+MAX_LEVEL = 100
+# Each win after the first in a streak adds streak_bonus of xp_per_win, up to this many times
+STREAK_BONUS_CAP = 10
+
+USER_FIELDS = ["xp", "level", "tier", "rating", "achievements"]
+
+
+def load_gamification(db) -> Dict[str, Any]:
+    """Validated gamification from the cached system/settings, over the defaults"""
+    return asdict(get_settings(db).gamification)
+
+
+class Progression:
+    """XP awards and the level-threshold table for one set of gamification settings"""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, max_level: int = MAX_LEVEL):
+        self.settings = {**DEFAULT_GAMIFICATION, **(settings or {})}
+        exponent = self.settings["level_multiplier"]
+        self.thresholds = [js_round(LEVEL_BASE_XP * n ** exponent) for n in range(max_level)]
+
+    def level(self, xp: float) -> int:
+        return max(1, bisect_right(self.thresholds, xp))
+
+    def levels(self, xp):
+        """Vectorized level() over an array of xp totals"""
+        import numpy as np
+        return np.maximum(1, np.searchsorted(np.asarray(self.thresholds), xp, side="right"))
+
+    def debate_xp(self, score: float, streak: int = 0) -> int:
+        """XP for one result (1 win, 0.5 draw, 0 loss); streak is the win streak including this win"""
+        s = self.settings
+        if score == 1:
+            bonus = s["streak_bonus"] * min(max(streak - 1, 0), STREAK_BONUS_CAP)
+            return js_round(s["xp_per_win"] * (1 + bonus))
+        return s["xp_per_draw"] if score == 0.5 else s["xp_per_loss"]
+
+    def fold(self, streak: int, scores: Iterable[float]) -> int:
+        """XP earned by a run of results played in order, starting from the stored win streak"""
+        gained = 0
+        for score in scores:
+            streak = streak + 1 if score == 1 else 0
+            gained += self.debate_xp(score, streak)
+        return gained
+
+    def recompute(self, history):
+        """
+        Debate XP of every player in an elo_engine.DebateHistory, vectorized.
+
+        Each game becomes one event per player; sorting by player then game turns
+        every win streak into a contiguous run whose offset is the streak length.
+        """
+        import numpy as np
+        s = self.settings
+        games = np.arange(len(history))
+        player = np.concatenate([history.player_a, history.player_b])
+        score = np.concatenate([history.score_a, 1 - history.score_a])
+        order = np.lexsort((np.concatenate([games, games]), player))
+        player, score = player[order], score[order]
+
+        index = np.arange(len(player))
+        win = score == 1
+        first = np.ones(len(player), dtype=bool)
+        first[1:] = player[1:] != player[:-1]
+        # Position of the last non-win before each event, or just before the player's first game
+        blocker = np.where(~win, index, -1)
+        blocker[first & win] = index[first & win] - 1
+        streak = np.where(win, index - np.maximum.accumulate(blocker), 0)
+
+        bonus = s["streak_bonus"] * np.minimum(np.maximum(streak - 1, 0), STREAK_BONUS_CAP)
+        xp = np.where(win, np.floor(s["xp_per_win"] * (1 + bonus) + 0.5),
+                      np.where(score == 0.5, s["xp_per_draw"], s["xp_per_loss"]))
+        return np.bincount(player, weights=xp, minlength=len(history.user_ids)).astype(np.int64)
+
+
+def achievement_rewards(db) -> Dict[str, int]:
+    """xpReward of every achievement, including inactive ones users may still hold"""
+    return {snap.id: (snap.to_dict() or {}).get("xpReward", 0) for snap in db.collection("achievements").stream()}
+
+
+def recompute_users(db, progression: Progression, history, page_size: int = DEFAULT_PAGE_SIZE,
+                    apply: bool = False) -> Dict[str, int]:
+    """Recompute xp, level and tier for every user and write back the ones that drifted"""
+    debate_xp = dict(zip(history.user_ids, progression.recompute(history).tolist()))
+    rewards = achievement_rewards(db)
+    drifted = level_ups = 0
+    writer = BatchWriter(db, label="xp repair") if apply else None
+    query = db.collection("users").select(USER_FIELDS).order_by("__name__")
+    for page in iter_pages(query, page_size):
+        for snap in page:
+            user = snap.to_dict() or {}
+            xp = debate_xp.get(snap.id, 0) + sum(rewards.get(a, 0) for a in user.get("achievements") or [])
+            wanted = {"xp": xp, "level": progression.level(xp), "tier": tier_for_rating(user.get("rating", 0))}
+            if all(user.get(field) == value for field, value in wanted.items()):
+                continue
+            drifted += 1
+            level_ups += wanted["level"] > user.get("level", 1)
+            if writer:
+                writer.update("users", snap.id, wanted)
+    if writer:
+        writer.close()
+    return {"drifted": drifted, "level_ups": level_ups}
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Recompute Debattle xp, levels and tiers from debate history")
+    parser.add_argument("--emulator", metavar="HOST:PORT", default=os.environ.get("FIRESTORE_EMULATOR_HOST"))
+    parser.add_argument("--apply", action="store_true", help="write drifted xp, level and tier back")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    args = parser.parse_args(argv)
+
+    from elo_engine import DebateHistory
+    from initialize_firestore import connect
+    db = connect(args.emulator)
+    progression = Progression(load_gamification(db))
+    print("🏆 Recomputing xp and levels...")
+    history = DebateHistory.from_firestore(db, args.page_size)
+    print(f"    ✓ Loaded {len(history):,} completed debates between {len(history.user_ids):,} users")
+    result = recompute_users(db, progression, history, args.page_size, args.apply)
+    action = "Repaired" if args.apply else "Found"
+    print(f"    ✓ {action} {result['drifted']:,} drifted users ({result['level_ups']:,} level-ups)")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ XP recompute failed: {e}")
+        sys.exit(1)